@@ -32,13 +32,19 @@ visualize_endpoint_markers = True #if you want to actually create markers for th
 marker_radius = 0.25 #radius in meters of the endpoint markers
 
 use_soft_tissue_constraint = False #if you want to distinguish between skeletally viable but soft tissue non viable
-#ligament_name = "CranCruciateLig_r" #the ligament (implemented as MuSkeMo MUSCLE) that we will use as a soft tissue constraint, by using its length as a cut off
-#lig_length_threshold = 0.055 # in meters. If the length is longer than this, we treat the pose as not viable.
+#soft_tissue_constraints = {"CranCruciateLig_r": 0.055} #ligaments (implemented as MuSkeMo MUSCLE) that we will use as soft tissue constraints: name: maximum length in meters.
+#If the length is longer than this, we treat the pose as not viable. Add more entries to use more constraints.
 
 export_results_as_CSV = True #If you want to export the results of the analysis as a CSV. Requires saving the blend file first.
 output_filename = 'screw_pose_sample_test_v1' #careful that it can overwrite previous results
 
-only_keyframe_viable = True #or False, if you want to keyframe all poses. False gives a performance hit.
+#Results are streamed to disk in chunks, in a folder next to the blend file. Requires saving the blend file first.
+#If the script is interrupted, rerunning it with the same settings resumes where it stopped. Delete the folder to start over.
+#Results of a run that is still going can be inspected with pose_sample_store.load_results(store_path), which only reads the store
+store_folder_name = output_filename + '_results'
+chunk_size = 1000 #number of poses per chunk that is written to disk
+
+#Poses are not keyframed. To look at a sampled pose afterwards, use ViewPoseSample.py
 
 print_each_pose_to_console = False #or False. Gives a minor performance hit if true.
 #system console is accessible via Window>toggle system console
@@ -64,6 +70,11 @@ zpos_range = [-6, 6]# meters, z-position range. Second number has to be bigger t
 if export_results_as_CSV and not bpy.data.filepath:
     raise ValueError("Cannot export results as CSV because the Blender file has not been saved. Save the Blend file first and try again")
 
+if not bpy.data.filepath:
+    raise ValueError("Cannot store the results because the Blender file has not been saved. Save the Blend file first and try again")
+
+store_path = os.path.join(os.path.dirname(bpy.data.filepath), store_folder_name)
+
 csv_output_path = os.path.join(os.path.dirname(bpy.data.filepath), output_filename + ".csv")
 
 
@@ -78,6 +89,10 @@ sys.path.append(scripts) #append the muskemo scripts folder to sys, so we can di
 from compute_curve_length import compute_curve_length #from the .py file import the function
 from euler_XYZ_body import matrix_from_euler_XYZbody
 from two_object_intersection_func import check_bvh_intersection
+from pose_sample_store import (open_pose_sample_store, pending_chunks, chunk_indices, poses_from_flat_indices, write_chunk, open_results, situation_names)
+from pose_sampling_workers import pose_transforms
+from pose_sampling_geometry_func import export_soft_tissue_constraint
+from soft_tissue_constraints import evaluate_constraints
 
 
 # ------------------------
@@ -195,18 +210,13 @@ target_joint = bpy.data.objects.get(target_joint_name)
 if not target_joint:
     raise ValueError(f"Target joint '{target_joint_name}' not found.")
 
-target_joint_original_wm = target_joint.matrix_world.copy() #copy the transformation matrix
-target_joint_original_gRb = target_joint_original_wm.to_3x3()
-target_joint_original_pos = target_joint_original_wm.translation
+target_landmark = bpy.data.objects.get(target_landmark_name) #landmark positions are stored for every pose
+if not target_landmark:
+    raise ValueError(f"Target landmark '{target_landmark_name}' not found.")
 
 if visualize_endpoint_markers: #If we want to visualize the endpoints
-    target_landmark = bpy.data.objects.get(target_landmark_name)
-    if not target_landmark:
-        raise ValueError(f"Target joint '{target_landmark_name}' not found.")
-    
     
-    ##  Names for subcollections and materials
-    situation_names = ["viable", "soft_tissue_non_viable", "skeletally_non_viable"]
+    ##  Names for subcollections and materials are the situation_names from pose_sample_store
     colors = [(0, 0, 1, 1),    # blue
               ( 1, 0.5, 0, 1), # orange
               (1, 0, 0, 1)]     # red
@@ -241,9 +251,9 @@ if visualize_endpoint_markers: #If we want to visualize the endpoints
         mat.diffuse_color = col
        
 if use_soft_tissue_constraint:
-    ligament = bpy.data.objects.get(ligament_name)
-    if not ligament:
-        raise ValueError(f"Soft tissue constraint '{ligament}' not found.")
+    for ligament_name in soft_tissue_constraints:
+        if not bpy.data.objects.get(ligament_name):
+            raise ValueError(f"Soft tissue constraint '{ligament_name}' not found.")
     
 
 
@@ -257,15 +267,9 @@ bpy.context.scene.frame_set(0) #set the frame to 0, assuming we have a base post
 target_joint.keyframe_insert(data_path="rotation_euler", frame=0) 
 target_joint.keyframe_insert(data_path="location", frame=0) 
 
-# Store results
-rom_data = [] 
-
-# Store positions for deferred visualization
-all_marker_positions = {
-    "viable": [],
-    "soft_tissue_non_viable": [],
-    "skeletally_non_viable": []
-}
+target_joint_original_wm = target_joint.matrix_world.copy() #copy the transformation matrix after setting frame 0, so it's the base posture (and not the pose an interrupted run left behind)
+target_joint_original_gRb = target_joint_original_wm.to_3x3()
+target_joint_original_pos = target_joint_original_wm.translation
 
 #ensure that if start and end range are the same, we still test the start range
 ranges = [x_range, y_range, z_range]
@@ -274,136 +278,134 @@ angles = [[np.deg2rad(a) for a in np.arange(r[0], r[1] + d_phi, d_phi)]  for r i
 pos_ranges =  [xpos_range, ypos_range, zpos_range]
 positions = [[a for a in np.arange(r[0], r[1] + d_pos, d_pos)]  for r in pos_ranges]
 
-x_euler, y_euler, z_euler = angles #lists of euler angles
 
-x_pos, y_pos, z_pos = positions #lists of positions
+depsgraph = bpy.context.evaluated_depsgraph_get() #Blender's dependency graph
 
+### Open the on-disk result store. Every setting that affects the results is part of the grid definition,
+### so the run is only resumed if nothing has changed.
+### Axis order is the same as the original nested loops: positions outermost, then x, y, z euler angles
+grid_definition = {
+    'axis_names': ["X pos (m)", "Y pos (m)", "Z pos (m)", "X (rad)", "Y (rad)", "Z (rad)"],
+    'axis_values': positions + angles,
+    'target_joint_name': target_joint_name,
+    'target_landmark_name': target_landmark_name,
+    'soft_tissue_constraints': soft_tissue_constraints if use_soft_tissue_constraint else {},
+    'joint_base_matrix': [list(row) for row in target_joint_original_wm], #needed to show stored poses again, with apply_pose_sample
+    'pose_relative_to_base': True, #euler angles and positions are applied in the joint base frame
+}
 
-depsgraph = bpy.context.evaluated_depsgraph_get() #Blender's dependency graph
+### Soft tissue constraints are evaluated analytically from the hooked points, for a whole chunk of poses at once
+constraints = [export_soft_tissue_constraint(bpy.data.objects[name], target_joint, depsgraph, max_length = max_length)
+               for name, max_length in grid_definition['soft_tissue_constraints'].items()]
+
+manifest = open_pose_sample_store(store_path, grid_definition, chunk_size)
+chunks_to_do = pending_chunks(manifest)
+
+print(f"{manifest['n_chunks'] - len(chunks_to_do)} of {manifest['n_chunks']} chunks already completed in {store_path}")
+
+
+n_evaluated = 0 #poses evaluated in this session, not in earlier (interrupted) runs
 
+# sample the pose grid one chunk at a time. Each completed chunk is written to disk immediately
+for chunk_id in chunks_to_do:
 
+    pose_indices = chunk_indices(manifest, chunk_id)
+    n_evaluated += len(pose_indices)
+    chunk_poses = poses_from_flat_indices(grid_definition, pose_indices)
 
-frame = 2
-# clean nested loop
-
-
-
-for xp in x_pos:
-    for yp in y_pos:
-        for zp in z_pos:
-            for x in x_euler:
-                for y in y_euler:
-                    for z in z_euler:
-                        
-                        euler_angles = [x, y, z]
-                        euler_string = f"{x:.3f}_{y:.3f}_{z:.3f}"
-                        
-                        #construct rotation matrix from euler angles
-                        gRj, jRg = matrix_from_euler_XYZbody(euler_angles)
-                        
-                        
-                        trial_position = Vector([xp, yp, zp])
-                        position_string = f"{xp:.3f}_{yp:.3f}_{zp:.3f}"
-                        
-                        #construct a new temporary world matrix, by post-multiplying the base transformation matrix for a local space rotation
-                        temp_wm = (target_joint_original_gRb @ gRj).to_4x4()
-                        temp_wm.translation = target_joint_original_pos + target_joint_original_gRb @ trial_position #position offset from base position, in local frame of reference
-                        
-                        target_joint.matrix_world = temp_wm #
-                        
-                        #update dependency graph before intersection checking
-                        
-                        depsgraph.update()
-                        bpy.context.view_layer.update()
-                        
-                        ### check for intersections
-                        intersect_found = False
-                        constrained_by_soft_tissue = False
-                        
-                        
-                        for parent_geom_name in parent_geometry_names:
-                            for child_geom_name in child_geometry_names:
-                                intersections = check_bvh_intersection(parent_geom_name, child_geom_name, depsgraph)
-                                if intersections:
-                                    intersect_found = True
-                        
-                        if use_soft_tissue_constraint:
-                            lig_ev = ligament.evaluated_get(depsgraph) #
-                            lig_ev_mesh = lig_ev.to_mesh()
-                            length = lig_ev_mesh.attributes['length'].data[0].value  #muscle length is stored as an attribute via the muscle geometry nodes.
-                            lig_ev.to_mesh_clear()
-                            
-                            if length > lig_length_threshold:
-                                constrained_by_soft_tissue = True
-                            
-                            lig_length_value = length
-                            
-                        else:
-                            lig_length_value = None        
-                        
-                        if not intersect_found: #if no intersections
-                            
-                            
-                            if constrained_by_soft_tissue: 
-                                if print_each_pose_to_console:
-                                    print(f"Pose at euler: {euler_angles} and position: {trial_position} is non viable due to soft tissue constraint")
-                                
-                                if visualize_endpoint_markers: #if we visualize endpoint markers, check what situation we'e dealing with (viable, soft non viable, skeleton non viable)
-                                    situation = situation_names[1] #meaning soft tissue non viable
-                            else: #if not constrained by soft tissue
-                                if print_each_pose_to_console:
-                                    print(f"Pose at euler: {euler_angles} and position: {trial_position} has no skeletal intersections")
-                                
-                                if visualize_endpoint_markers: #if we visualize endpoint markers, check what situation we'e dealing with (viable, soft non viable, skeleton non viable)
-                                    situation = situation_names[0] #meaning viable
-                                
-                                                                
-                        else: #if there are soft tissue intersections
-                            if print_each_pose_to_console:
-                                    print(f"Pose at euler: {euler_angles} and position: {trial_position} has skeletal intersections")    
-                            
-                            if visualize_endpoint_markers: #if we visualize endpoint markers, check what situation we'e dealing with (viable, soft non viable, skeleton non viable)
-                                situation = situation_names[2] #meaning skeletally non viable
-                        
-                        ## get the endpoint marker position
-                        endpointmarker_pos = target_landmark.matrix_world.translation.copy()
-                        
-                        # >>> STORE RESULTS for CSV here <<<
-                        rom_data.append([
-                            x,   # radians
-                            y,
-                            z,
-                            xp, # meters
-                            yp,
-                            zp,
-                            situation,
-                            lig_length_value,
-                            endpointmarker_pos.x,
-                            endpointmarker_pos.y,
-                            endpointmarker_pos.z                            
-                        ])
-                                
-                        
-                        if visualize_endpoint_markers:
-                            all_marker_positions[situation].append(endpointmarker_pos)
-                        
-                        
-                        if ((not only_keyframe_viable) or (situation == 'viable')): #skip non-viable keyframes if user wants to only keyframe viable   
-                            #keyframe the pose
-                            target_joint.keyframe_insert(data_path="rotation_euler", frame=frame)        
-                            target_joint.keyframe_insert(data_path="location", frame=frame)    
-                            frame += 1
-                        
-                        ### Restore original world matrix
-                            
-                        target_joint.matrix_world = target_joint_original_wm
+    chunk_situations = np.zeros(len(pose_indices), dtype = np.int8)
+
+    #rigid transforms of the joint for all poses in the chunk (euler angles first, then positions), and the soft tissue lengths
+    R, t = pose_transforms(chunk_poses[:, [3, 4, 5, 0, 1, 2]], grid_definition['joint_base_matrix'], grid_definition['pose_relative_to_base'])
+    chunk_lengths, chunk_violated = evaluate_constraints(constraints, R, t)
+    chunk_landmarks = np.zeros((len(pose_indices), 3))
+
+    for i, (pose_index, pose) in enumerate(zip(pose_indices, chunk_poses)):
+
+        xp, yp, zp, x, y, z = pose
+
+        euler_angles = [x, y, z]
+        
+        #construct rotation matrix from euler angles
+        gRj, jRg = matrix_from_euler_XYZbody(euler_angles)
+        
+        
+        trial_position = Vector([xp, yp, zp])
+        
+        #construct a new temporary world matrix, by post-multiplying the base transformation matrix for a local space rotation
+        temp_wm = (target_joint_original_gRb @ gRj).to_4x4()
+        temp_wm.translation = target_joint_original_pos + target_joint_original_gRb @ trial_position #position offset from base position, in local frame of reference
+        
+        target_joint.matrix_world = temp_wm #
+        
+        #update dependency graph before intersection checking
+        
+        depsgraph.update()
+        bpy.context.view_layer.update()
+        
+        ### check for intersections
+        intersect_found = False
+        constrained_by_soft_tissue = False
+        
+        
+        for parent_geom_name in parent_geometry_names:
+            for child_geom_name in child_geometry_names:
+                intersections = check_bvh_intersection(parent_geom_name, child_geom_name, depsgraph)
+                if intersections:
+                    intersect_found = True
+        
+        if chunk_violated[i].any(): #non viable if any of the soft tissue constraints is violated
+            constrained_by_soft_tissue = True
+        
+        if not intersect_found: #if no intersections
+            
+            if constrained_by_soft_tissue: 
+                if print_each_pose_to_console:
+                    print(f"Pose at euler: {euler_angles} and position: {trial_position} is non viable due to soft tissue constraint")
+                situation = situation_names[1] #meaning soft tissue non viable
+
+            else: #if not constrained by soft tissue
+                if print_each_pose_to_console:
+                    print(f"Pose at euler: {euler_angles} and position: {trial_position} has no skeletal intersections")
+                situation = situation_names[0] #meaning viable
+                                            
+        else: #if there are soft tissue intersections
+            if print_each_pose_to_console:
+                    print(f"Pose at euler: {euler_angles} and position: {trial_position} has skeletal intersections")    
+            situation = situation_names[2] #meaning skeletally non viable
+        
+        chunk_situations[i] = situation_names.index(situation)
+
+        ## get the endpoint marker position
+        chunk_landmarks[i] = target_landmark.matrix_world.translation
+        
+        ### Restore original world matrix
+            
+        target_joint.matrix_world = target_joint_original_wm
+
+    write_chunk(store_path, manifest, chunk_id, {'pose': chunk_poses,
+                                                 'situation': chunk_situations,
+                                                 'soft_tissue_lengths': chunk_lengths,
+                                                 'landmark': chunk_landmarks})
+
+    print(f"Chunk {chunk_id + 1} of {manifest['n_chunks']} written to disk")
+
+
+### Open all results (including those of previous, interrupted runs) as compact, memory-mapped columns.
+### Individual poses are not keyframed, show them on demand with apply_pose_sample(store_path, pose_index)
+results, manifest = open_results(store_path)
+n_results = len(results['index'])
+
+# Store positions for deferred visualization
+all_marker_positions = {situation: np.asarray(results['landmark'][results['situation'] == code])
+                        for code, situation in enumerate(situation_names)}
 
 if visualize_endpoint_markers:
     
     # --- Create fast marker meshes ---
     print("Creating endpoint marker meshes")
     for situation in situation_names:
-        points = list(all_marker_positions[situation])  # positions only
+        points = all_marker_positions[situation].tolist()  # positions only
         if not points:
             continue
 
@@ -444,7 +446,7 @@ if visualize_endpoint_markers:
             
 end_time = time.time()
 time_elapsed = end_time-start_time
-time_per_pose = time_elapsed/(len(rom_data)) #
+time_per_pose = time_elapsed/max(n_evaluated, 1)
 
 print(f"time elapsed: {time_elapsed} seconds")
 print(f"time per pose: {time_per_pose} seconds")
@@ -466,7 +468,11 @@ if export_results_as_CSV:
 
     with open(csv_output_path, mode='w', newline='') as file:
         writer = csv.writer(file)
-        writer.writerow(["X (rad)", "Y (rad)", "Z (rad)",  "Xpos (m)", "Ypos (m)", "Zpos (m)", "Pose viability", "Ligament length (m)", "Markerpos_x (m)", "Markerpos_y (m)", "Markerpos_z (m)"])
-        writer.writerows(rom_data)
+        writer.writerow(["X (rad)", "Y (rad)", "Z (rad)",  "Xpos (m)", "Ypos (m)", "Zpos (m)", "Pose viability"] +
+                        [name + " length (m)" for name in grid_definition['soft_tissue_constraints']] +
+                        ["Markerpos_x (m)", "Markerpos_y (m)", "Markerpos_z (m)"])
+        #rows are generated from the memory-mapped columns, in the same column order as before (euler angles first, then positions)
+        writer.writerows(list(pose[3:6]) + list(pose[0:3]) + [situation_names[code]] + list(lengths) + list(landmark)
+                         for pose, code, lengths, landmark in zip(results['pose'], results['situation'], results['soft_tissue_lengths'], results['landmark']))
 
     print(f"Exported ROM data to {csv_output_path}")
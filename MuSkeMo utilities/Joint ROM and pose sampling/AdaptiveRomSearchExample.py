@@ -0,0 +1,308 @@
+# Download the blend file from sample dataset 2 to try out this script: https://github.com/PashavanBijlert/MuSkeMo/releases/tag/v0.x-sampledataset2
+#
+
+#Adaptive version of PoseSampleExample.py.
+#Instead of checking every pose on a regular grid of euler angles, the script starts from the viable base pose,
+#marches outward along rays in pose space and bisects each ray to the boundary between viable and non-viable poses.
+#The boundary is found to within 'resolution_deg' along each euler angle, at a small fraction of the evaluations of a grid with the same resolution.
+#Pose viability is defined the same way as in PoseSampleExample.py (no intersections between parent and child geometry, and optionally a ligament length threshold).
+#For 6DOF searches (see 6DOFPoseSampleTest.py), add the translation ranges to lower/upper, and set the joint location in set_pose.
+
+import bpy
+import addon_utils
+import bmesh
+import numpy as np
+import csv
+import os
+import sys
+import time
+
+start_time = time.time()
+
+# ------------------------
+# SETTINGS
+# ------------------------
+
+target_joint_name = "knee_r"  #the joint you would like to move
+target_landmark_name = 'shank_dist_marker' #The landmark position that we will use for the ROM visualization
+
+visualize_endpoint_markers = True #if you want to actually create markers for the segment endpoints
+marker_radius = 0.01 #radius in meters of the endpoint markers
+
+use_soft_tissue_constraint = True #if you want to distinguish between skeletally viable but soft tissue non viable
+ligament_name = "CranCruciateLig_r" #the ligament (implemented as MuSkeMo MUSCLE) that we will use as a soft tissue constraint, by using its length as a cut off
+lig_length_threshold = 0.055 # in meters. If the length is longer than this, we treat the pose as not viable.
+
+export_results_as_CSV = True #If you want to export the results of the analysis as a CSV. Requires saving the blend file first.
+output_filename = 'joint_adaptive_rom_v1' #careful that it can overwrite previous results
+
+resolution_deg = 1 #the boundary between viable and non viable poses is found to within this many degrees, along each euler angle
+n_directions = 64 #number of rays that are cast from the base pose. More rays give a denser description of the boundary
+march_step_deg = 10 #step size while marching outward along a ray. Non-viable regions thinner than this can be stepped over
+
+x_range = [-20, 20]# degrees, x-rotation range. Second number has to be bigger than the first number, or the same
+y_range = [-30, 10]# degrees, y-rotation range. Second number has to be bigger than the first number, or the same
+z_range = [-100, 0]# degrees, z-rotation range. Second number has to be bigger than the first number, or the same
+
+
+# If export requested but no saved file, stop immediately
+if export_results_as_CSV and not bpy.data.filepath:
+    raise ValueError("Cannot export results as CSV because the Blender file has not been saved. Save the Blend file first and try again")
+
+
+### import scripts and functions we will need
+
+muskemo_module = next((mod for mod in addon_utils.modules() if mod.__name__ == 'MuSkeMo'), None) #assumes MuSkeMo addon is installed
+MuSkeMo_folder =  os.path.dirname(muskemo_module.__file__) #parent folder of MuSkeMo, which also includes the 'MuSkeMo utilities' folder
+scripts = os.path.join(MuSkeMo_folder, 'scripts')
+sys.path.append(scripts) #append the muskemo scripts folder to sys, so we can directly import from the folder
+
+## now we can import from the muskemo scripts folder
+from euler_XYZ_body import matrix_from_euler_XYZbody
+from two_object_intersection_func import check_bvh_intersection
+from adaptive_rom_search import (adaptive_boundary_search, grid_evaluation_count)
+
+
+# ------------------------
+# HELPER FUNCTIONS
+# ------------------------
+
+def collect_parent_and_child_geometry_names(joint_obj):
+    """
+    From the given JOINT object, finds GEOMETRY attached to the parent and child bodies, only.
+    """
+    parent_geometry_names = []
+    child_geometry_names = []
+
+    for body_key, name_list in zip(['parent_body', 'child_body'], [parent_geometry_names, child_geometry_names]):
+        body = bpy.data.objects.get(joint_obj.get(body_key, ''))
+        if not body:
+            continue
+
+        # Collect only direct children of the body with MuSkeMo_type == 'GEOMETRY'
+        for child in body.children:
+            if child.get('MuSkeMo_type') == 'GEOMETRY':
+                name_list.append(child.name)
+
+    if (len(parent_geometry_names)==0) or (len(child_geometry_names)==0):
+        print('Parent or child body has no GEOMETRY to compare intersections with')
+
+    return parent_geometry_names, child_geometry_names
+
+
+# ------------------------
+# MAIN SCRIPT
+# ------------------------
+
+target_joint = bpy.data.objects.get(target_joint_name)
+if not target_joint:
+    raise ValueError(f"Target joint '{target_joint_name}' not found.")
+
+target_landmark = bpy.data.objects.get(target_landmark_name)
+if not target_landmark:
+    raise ValueError(f"Target landmark '{target_landmark_name}' not found.")
+
+if use_soft_tissue_constraint:
+    ligament = bpy.data.objects.get(ligament_name)
+    if not ligament:
+        raise ValueError(f"Soft tissue constraint '{ligament_name}' not found.")
+
+bpy.context.scene.frame_set(0) #set the frame to 0, assuming we have a base posture at frame 0
+
+target_joint_original_wm = target_joint.matrix_world.copy() #copy the transformation matrix
+
+parent_geometry_names, child_geometry_names = collect_parent_and_child_geometry_names(target_joint)
+
+print(parent_geometry_names)
+print(child_geometry_names)
+
+situation_names = ["viable", "soft_tissue_non_viable", "skeletally_non_viable"]
+
+depsgraph = bpy.context.evaluated_depsgraph_get() #Blender's dependency graph
+
+# Store results of every evaluated pose
+rom_data = []
+
+
+def classify_pose(euler_angles):
+
+    #construct rotation matrix from euler angles, and a new temporary world matrix
+    gRj, jRg = matrix_from_euler_XYZbody(euler_angles)
+    temp_wm = gRj.to_4x4()
+    temp_wm.translation = target_joint_original_wm.translation
+
+    target_joint.matrix_world = temp_wm
+    depsgraph.update() #update dependency graph before intersection checking
+
+    intersect_found = any(check_bvh_intersection(parent_geom_name, child_geom_name, depsgraph)
+                          for parent_geom_name in parent_geometry_names
+                          for child_geom_name in child_geometry_names)
+
+    lig_length_value = None
+    constrained_by_soft_tissue = False
+
+    if use_soft_tissue_constraint:
+        lig_ev = ligament.evaluated_get(depsgraph)
+        lig_length_value = lig_ev.to_mesh().attributes['length'].data[0].value #muscle length is stored as an attribute via the muscle geometry nodes.
+        lig_ev.to_mesh_clear()
+        constrained_by_soft_tissue = lig_length_value > lig_length_threshold
+
+    if intersect_found:
+        situation = situation_names[2] #skeletally non viable
+    elif constrained_by_soft_tissue:
+        situation = situation_names[1] #soft tissue non viable
+    else:
+        situation = situation_names[0] #viable
+
+    endpointmarker_pos = target_landmark.matrix_world.translation.copy()
+
+    rom_data.append([euler_angles[0], euler_angles[1], euler_angles[2], situation, lig_length_value,
+                     endpointmarker_pos.x, endpointmarker_pos.y, endpointmarker_pos.z])
+
+    return situation == situation_names[0]
+
+
+def is_viable(poses):
+    #the adaptive search hands over batches of poses, and expects one boolean per pose
+    return np.array([classify_pose(pose) for pose in poses])
+
+
+lower = np.deg2rad([x_range[0], y_range[0], z_range[0]])
+upper = np.deg2rad([x_range[1], y_range[1], z_range[1]])
+
+span = np.max(upper - lower)
+
+result = adaptive_boundary_search(is_viable, lower, upper,
+                                  resolution = np.deg2rad(resolution_deg),
+                                  seed_poses = [[0, 0, 0]], #the base pose at frame 0
+                                  n_directions = n_directions,
+                                  march_step = np.deg2rad(march_step_deg) / span if span > 0 else 1)
+
+target_joint.matrix_world = target_joint_original_wm ### Restore original world matrix
+
+grid_count = grid_evaluation_count(lower, upper, np.deg2rad(resolution_deg))
+
+print(f"Evaluated {result['n_evaluations']} poses. A grid with the same resolution would evaluate {grid_count} poses.")
+print(f"Boundary found along {len(result['boundary_inner'])} rays, to within {resolution_deg} degrees per euler angle.")
+
+
+if visualize_endpoint_markers:
+
+    # Check if node group exists
+    node_group_name = "CustomInstanceGroup"
+    node_group = bpy.data.node_groups.get(node_group_name)
+
+    if node_group is None:
+        geo_group = bpy.data.node_groups.new(node_group_name, 'GeometryNodeTree')
+
+        group_input = geo_group.nodes.new('NodeGroupInput')
+        group_input.location = (-600, 0)
+        group_output = geo_group.nodes.new('NodeGroupOutput')
+        group_output.location = (600, 0)
+
+        geo_group.interface.new_socket(name='Points', in_out='INPUT', socket_type='NodeSocketGeometry')
+        geo_group.interface.new_socket(name='Radius', in_out='INPUT', socket_type='NodeSocketFloat')
+        geo_group.interface.new_socket(name='Material', in_out='INPUT', socket_type='NodeSocketMaterial')
+        geo_group.interface.new_socket(name='Geometry', in_out='OUTPUT', socket_type='NodeSocketGeometry')
+
+        ico_sphere = geo_group.nodes.new('GeometryNodeMeshIcoSphere')
+        ico_sphere.location = (-200, 0)
+
+        instance_node = geo_group.nodes.new('GeometryNodeInstanceOnPoints')
+        instance_node.location = (0, 0)
+
+        set_material = geo_group.nodes.new('GeometryNodeSetMaterial')
+        set_material.location = (300, 0)
+
+        geo_group.links.new(group_input.outputs['Points'], instance_node.inputs['Points'])
+        geo_group.links.new(ico_sphere.outputs['Mesh'], instance_node.inputs['Instance'])
+        geo_group.links.new(group_input.outputs['Radius'], ico_sphere.inputs['Radius'])
+        geo_group.links.new(instance_node.outputs['Instances'], set_material.inputs['Geometry'])
+        geo_group.links.new(group_input.outputs['Material'], set_material.inputs['Material'])
+        geo_group.links.new(set_material.outputs['Geometry'], group_output.inputs['Geometry'])
+
+        node_group = geo_group
+
+    colors = [(0, 0, 1, 1),    # blue
+              ( 1, 0.5, 0, 1), # orange
+              (1, 0, 0, 1)]     # red
+
+    # Parent collection
+    parent_name = "endpoint_markers"
+    parent_coll = bpy.data.collections.get(parent_name)
+    if parent_coll is None:
+        parent_coll = bpy.data.collections.new(parent_name)
+        bpy.context.scene.collection.children.link(parent_coll)
+
+    print("Creating endpoint marker meshes")
+    for situation, col in zip(situation_names, colors):
+
+        mat = bpy.data.materials.get(situation)
+        if mat is None:
+            mat = bpy.data.materials.new(name=situation)
+
+        if mat.node_tree is None: #blender <5 safe
+            mat.use_nodes = True  # creates the node tree
+
+        bsdf = mat.node_tree.nodes.get("Principled BSDF")
+        if bsdf:
+            bsdf.inputs['Base Color'].default_value = col
+        mat.diffuse_color = col
+
+        points = [row[5:8] for row in rom_data if row[3] == situation]
+        if not points:
+            continue
+
+        mesh_name = f"{situation}_endpoint_mesh"
+        mesh = bpy.data.meshes.new(mesh_name)
+        mesh.from_pydata(vertices=points, edges=[], faces=[])
+
+        obj = bpy.data.objects.new(f"{situation}_endpoint_markers", mesh)
+        parent_coll.objects.link(obj)
+        obj.data.materials.append(mat)
+
+        # Add geometry nodes modifier
+        mod = obj.modifiers.new(name="EndpointInstancer", type='NODES')
+        mod.node_group = node_group
+
+        for item in mod.node_group.interface.items_tree:
+            if item.item_type == 'SOCKET':
+                if item.name == 'Radius':
+                    mod[item.identifier] = marker_radius
+                elif item.name == 'Material':
+                    mod[item.identifier] = mat
+
+    print("Endpoint marker meshes created.")
+
+
+end_time = time.time()
+time_elapsed = end_time-start_time
+
+print(f"time elapsed: {time_elapsed} seconds")
+print(f"time per pose: {time_elapsed/max(len(rom_data), 1)} seconds")
+
+
+# ------------------------
+# EXPORT TO CSV
+# ------------------------
+
+if export_results_as_CSV:
+
+    csv_output_path = os.path.join(os.path.dirname(bpy.data.filepath), output_filename + ".csv")
+
+    with open(csv_output_path, mode='w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(["X (rad)", "Y (rad)", "Z (rad)", "Pose viability", "Ligament length (m)",
+                         "Landmark x (m)", "Landmark y (m)", "Landmark z (m)"])
+        writer.writerows(rom_data)
+
+    boundary_output_path = os.path.join(os.path.dirname(bpy.data.filepath), output_filename + "_boundary.csv")
+
+    with open(boundary_output_path, mode='w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(["Inner X (rad)", "Inner Y (rad)", "Inner Z (rad)",
+                         "Outer X (rad)", "Outer Y (rad)", "Outer Z (rad)", "Reached range limit"])
+        for inner, outer, reached in zip(result['boundary_inner'], result['boundary_outer'], result['reached_box']):
+            writer.writerow(list(inner) + list(outer) + [bool(reached)])
+
+    print(f"Exported ROM data to {csv_output_path} and {boundary_output_path}")
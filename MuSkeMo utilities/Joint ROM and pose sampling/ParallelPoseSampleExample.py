@@ -0,0 +1,191 @@
+# Download the blend file from the pose sampling stress test dataset to try out this script: https://github.com/PashavanBijlert/MuSkeMo/releases/tag/v0.x-posesamplestresstest
+#
+
+#Multiprocess version of 6DOFPoseSampleTest.py.
+#The geometry of the parent and child body is exported once as NumPy arrays. Pose batches are then distributed over a pool of
+#worker processes, which check for skeletal intersections, evaluate soft tissue constraints and compute the landmark position without using Blender.
+#Throughput scales with the number of CPU cores. The results are brought back into the scene as the usual endpoint markers.
+#Blender's interface is unresponsive while the script runs, progress is printed to the system console (Window>toggle system console).
+#Soft tissue constraints (e.g. ligaments, implemented as MuSkeMo MUSCLES) are evaluated analytically by the workers, from the hooked points of each constraint.
+#The workspace envelope (convex hull and voxel envelope of the viable landmark positions) is updated as the batches come in, and its volume and surface area are reported.
+
+import bpy
+import addon_utils
+import numpy as np
+import csv
+import os
+import sys
+import time
+
+start_time = time.time()
+
+# ------------------------
+# SETTINGS
+# ------------------------
+
+target_joint_name = "screw_joint"  #the joint you would like to move
+target_landmark_name = 'screw_central_landmark' #The landmark position that we will use for the ROM visualization
+
+visualize_endpoint_markers = True #if you want to actually create markers for the segment endpoints
+marker_radius = 0.25 #radius in meters of the endpoint markers
+
+use_soft_tissue_constraint = False #if you want to distinguish between skeletally viable but soft tissue non viable
+soft_tissue_constraints = {"CranCruciateLig_r": 0.055} #MuSkeMo MUSCLE name: maximum length in meters. If the length is longer than this, we treat the pose as not viable. Add more entries to use more constraints
+
+export_results_as_CSV = True #If you want to export the results of the analysis as a CSV. Requires saving the blend file first.
+output_filename = 'screw_pose_sample_parallel_v1' #careful that it can overwrite previous results
+
+n_workers = None #number of worker processes. None uses all CPU cores, 0 runs everything in Blender's own process (useful for debugging)
+batch_size = 256 #number of poses that are sent to a worker at once
+
+compute_workspace_envelope = True #volume and surface area of the envelope of the viable landmark positions
+workspace_voxel_size = 0.5 #meters, edge length of the voxels of the voxel envelope
+
+sample_density_rot = 2
+sample_density_pos = 1
+
+d_phi = 60 / sample_density_rot #check intersections in steps of how many degrees?
+
+x_range = [-180, 175]# degrees, x-rotation range. Second number has to be bigger than the first number, or the same
+y_range = [-60, 80]# degrees, y-rotation range. Second number has to be bigger than the first number, or the same
+z_range = [-60, 100]# degrees, z-rotation range. Second number has to be bigger than the first number, or the same
+
+d_pos = 4/sample_density_pos # meters, check intersections in steps of how many meters?
+
+xpos_range = [-8, 8]# meters, x-position range. Second number has to be bigger than the first number, or the same
+ypos_range = [-6, 6]# meters, y-position range. Second number has to be bigger than the first number, or the same
+zpos_range = [-6, 6]# meters, z-position range. Second number has to be bigger than the first number, or the same
+
+
+# If export requested but no saved file, stop immediately
+if export_results_as_CSV and not bpy.data.filepath:
+    raise ValueError("Cannot export results as CSV because the Blender file has not been saved. Save the Blend file first and try again")
+
+
+### import scripts and functions we will need
+
+muskemo_module = next((mod for mod in addon_utils.modules() if mod.__name__ == 'MuSkeMo'), None) #assumes MuSkeMo addon is installed
+MuSkeMo_folder =  os.path.dirname(muskemo_module.__file__) #parent folder of MuSkeMo, which also includes the 'MuSkeMo utilities' folder
+scripts = os.path.join(MuSkeMo_folder, 'scripts')
+sys.path.append(scripts) #append the muskemo scripts folder to sys, so we can directly import from the folder
+
+## now we can import from the muskemo scripts folder
+from pose_sampling_workers import sample_poses_in_pool
+from pose_sampling_geometry_func import (export_joint_sampling_geometry, create_endpoint_marker_meshes, situation_names)
+from workspace_envelope import (WorkspaceEnvelope, create_hull_object)
+
+
+# ------------------------
+# MAIN SCRIPT
+# ------------------------
+
+target_joint = bpy.data.objects.get(target_joint_name)
+if not target_joint:
+    raise ValueError(f"Target joint '{target_joint_name}' not found.")
+
+if not bpy.data.objects.get(target_landmark_name):
+    raise ValueError(f"Target landmark '{target_landmark_name}' not found.")
+
+bpy.context.scene.frame_set(0) #set the frame to 0, assuming we have a base posture at frame 0
+
+parent_geometry_names = [child.name for child in bpy.data.objects[target_joint['parent_body']].children if child.get('MuSkeMo_type') == 'GEOMETRY']
+child_geometry_names = [child.name for child in bpy.data.objects[target_joint['child_body']].children if child.get('MuSkeMo_type') == 'GEOMETRY']
+
+print(parent_geometry_names)
+print(child_geometry_names)
+
+depsgraph = bpy.context.evaluated_depsgraph_get() #Blender's dependency graph
+
+#export the geometry once. Poses are applied in the joint's base frame, as in 6DOFPoseSampleTest.py
+geometry = export_joint_sampling_geometry(target_joint, parent_geometry_names, child_geometry_names, target_landmark_name,
+                                          depsgraph, pose_relative_to_base = True,
+                                          soft_tissue_constraints = soft_tissue_constraints if use_soft_tissue_constraint else None)
+
+#the full grid of poses, as one array
+ranges = [x_range, y_range, z_range]
+angles = [np.deg2rad(np.arange(r[0], r[1] + d_phi, d_phi)) for r in ranges]
+
+pos_ranges =  [xpos_range, ypos_range, zpos_range]
+positions = [np.arange(r[0], r[1] + d_pos, d_pos) for r in pos_ranges]
+
+#same order as the nested loops in 6DOFPoseSampleTest.py: positions outermost, then x, y, z euler angles
+grid = np.meshgrid(*positions, *angles, indexing = 'ij')
+poses = np.column_stack([grid[i].ravel() for i in [3, 4, 5, 0, 1, 2]]) #columns: x, y, z euler (rad), x, y, z position (m)
+
+print(f"Sampling {len(poses)} poses")
+
+intersects = np.zeros(len(poses), dtype = bool)
+landmark_positions = np.zeros((len(poses), 3))
+soft_tissue_lengths = np.zeros((len(poses), len(geometry['soft_tissue_constraints'])))
+soft_tissue_violated = np.zeros(len(poses), dtype = bool)
+
+envelope = WorkspaceEnvelope(workspace_voxel_size) if compute_workspace_envelope else None
+
+n_done = 0
+for start, batch_intersects, batch_landmarks, batch_lengths, batch_violated in sample_poses_in_pool(geometry, poses, n_workers = n_workers, batch_size = batch_size):
+    intersects[start:start + len(batch_intersects)] = batch_intersects
+    landmark_positions[start:start + len(batch_intersects)] = batch_landmarks
+    soft_tissue_lengths[start:start + len(batch_intersects)] = batch_lengths
+    soft_tissue_violated[start:start + len(batch_intersects)] = batch_violated.any(axis = 1) #non viable if any of the constraints is violated
+
+    n_done += len(batch_intersects)
+    print(f"{n_done} / {len(poses)} poses evaluated")
+
+    if envelope is not None:
+        envelope.add(batch_landmarks[~batch_intersects & ~batch_violated.any(axis = 1)]) #viable poses only
+
+situations = np.where(intersects, situation_names[2], np.where(soft_tissue_violated, situation_names[1], situation_names[0]))
+
+print(f"{int((situations == situation_names[0]).sum())} viable poses found")
+
+if visualize_endpoint_markers:
+    print("Creating endpoint marker meshes")
+    create_endpoint_marker_meshes({situation: landmark_positions[situations == situation] for situation in situation_names}, marker_radius)
+    print("Endpoint marker meshes created.")
+
+if envelope is not None:
+    workspace = envelope.summary()
+    print(f"Workspace convex hull volume: {workspace['convex_hull_volume']} m^3, surface area: {workspace['convex_hull_area']} m^2")
+    print(f"Workspace voxel envelope volume: {workspace['voxel_volume']} m^3, surface area: {workspace['voxel_area']} m^2")
+
+    if visualize_endpoint_markers and len(envelope.hull.triangles):
+        hull_obj = create_hull_object(output_filename + '_workspace_hull', envelope.hull.vertices, envelope.hull.triangles,
+                                      bpy.data.collections.get("endpoint_markers"))
+        hull_obj.display_type = 'WIRE'
+        for key, value in workspace.items():
+            hull_obj['workspace_' + key] = value
+
+
+end_time = time.time()
+time_elapsed = end_time-start_time
+
+print(f"time elapsed: {time_elapsed} seconds")
+print(f"time per pose: {time_elapsed/max(len(poses), 1)} seconds")
+
+
+# ------------------------
+# EXPORT TO CSV
+# ------------------------
+
+if export_results_as_CSV:
+
+    csv_output_path = os.path.join(os.path.dirname(bpy.data.filepath), output_filename + ".csv")
+
+    with open(csv_output_path, mode='w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(["X (rad)", "Y (rad)", "Z (rad)", "X pos (m)", "Y pos (m)", "Z pos (m)", "Pose viability"] +
+                        [constraint['name'] + " length (m)" for constraint in geometry['soft_tissue_constraints']] +
+                        ["Landmark x (m)", "Landmark y (m)", "Landmark z (m)"])
+
+        for pose, situation, lengths, landmark in zip(poses, situations, soft_tissue_lengths, landmark_positions):
+            writer.writerow(list(pose) + [situation] + list(lengths) + list(landmark))
+
+    print(f"Exported ROM data to {csv_output_path}")
+
+    if envelope is not None:
+        workspace_output_path = os.path.join(os.path.dirname(bpy.data.filepath), output_filename + "_workspace.csv")
+        with open(workspace_output_path, mode='w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerows(workspace.items())
+
+        print(f"Exported workspace envelope to {workspace_output_path}")
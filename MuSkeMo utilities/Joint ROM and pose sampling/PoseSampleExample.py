@@ -30,12 +30,19 @@ visualize_endpoint_markers = True #if you want to actually create markers for th
 marker_radius = 0.01 #radius in meters of the endpoint markers
 
 use_soft_tissue_constraint = True #if you want to distinguish between skeletally viable but soft tissue non viable
-ligament_name = "CranCruciateLig_r" #the ligament (implemented as MuSkeMo MUSCLE) that we will use as a soft tissue constraint, by using its length as a cut off
-lig_length_threshold = 0.055 # in meters. If the length is longer than this, we treat the pose as not viable.
+soft_tissue_constraints = {"CranCruciateLig_r": 0.055} #ligaments (implemented as MuSkeMo MUSCLE) that we will use as soft tissue constraints: name: maximum length in meters.
+#If the length is longer than this, we treat the pose as not viable. Add more entries to use more constraints.
+#Lengths are computed from the hooked points of each ligament, so muscle wrapping is not taken into account.
 
 export_results_as_CSV = True #If you want to export the results of the analysis as a CSV. Requires saving the blend file first.
 output_filename = 'joint_pose_sampling_v1' #careful that it can overwrite previous results
 
+#Results are streamed to disk in chunks, in a folder next to the blend file. Requires saving the blend file first.
+#If the script is interrupted, rerunning it with the same settings resumes where it stopped. Delete the folder to start over.
+store_folder_name = output_filename + '_results'
+chunk_size = 500 #number of poses per chunk that is written to disk
+#Poses are not keyframed. To look at a sampled pose afterwards, use ViewPoseSample.py
+
 
 d_phi = 5 #check intersections in steps of how many degrees? Don't make this too small or the script will take forever
 
@@ -48,6 +55,11 @@ z_range = [-100, 0]# degrees, z-rotation range. Second number has to be bigger t
 if export_results_as_CSV and not bpy.data.filepath:
     raise ValueError("Cannot export results as CSV because the Blender file has not been saved. Save the Blend file first and try again")
 
+if not bpy.data.filepath:
+    raise ValueError("Cannot store the results because the Blender file has not been saved. Save the Blend file first and try again")
+
+store_path = os.path.join(os.path.dirname(bpy.data.filepath), store_folder_name)
+
 csv_output_path = os.path.join(os.path.dirname(bpy.data.filepath), output_filename + ".csv")
 
 
@@ -61,6 +73,10 @@ sys.path.append(scripts) #append the muskemo scripts folder to sys, so we can di
 ## now we can import from the muskemo scripts folder
 from euler_XYZ_body import matrix_from_euler_XYZbody
 from two_object_intersection_func import check_bvh_intersection
+from pose_sample_store import (open_pose_sample_store, pending_chunks, chunk_indices, poses_from_flat_indices, write_chunk, open_results, situation_names)
+from pose_sampling_workers import pose_transforms
+from pose_sampling_geometry_func import export_soft_tissue_constraint
+from soft_tissue_constraints import evaluate_constraints
 
 
 # ------------------------
@@ -190,16 +206,13 @@ target_joint = bpy.data.objects.get(target_joint_name)
 if not target_joint:
     raise ValueError(f"Target joint '{target_joint_name}' not found.")
 
-target_joint_original_wm = target_joint.matrix_world.copy() #copy the transformation matrix
+target_landmark = bpy.data.objects.get(target_landmark_name) #landmark positions are stored for every pose
+if not target_landmark:
+    raise ValueError(f"Target landmark '{target_landmark_name}' not found.")
 
 if visualize_endpoint_markers: #If we want to visualize the endpoints
-    target_landmark = bpy.data.objects.get(target_landmark_name)
-    if not target_landmark:
-        raise ValueError(f"Target joint '{target_landmark_name}' not found.")
-    
     
-    ##  Names for subcollections and materials
-    situation_names = ["viable", "soft_tissue_non_viable", "skeletally_non_viable"]
+    ##  Names for subcollections and materials are the situation_names from pose_sample_store
     colors = [(0, 0, 1, 1),    # blue
               ( 1, 0.5, 0, 1), # orange
               (1, 0, 0, 1)]     # red
@@ -233,9 +246,9 @@ if visualize_endpoint_markers: #If we want to visualize the endpoints
         mat.diffuse_color = col
        
 if use_soft_tissue_constraint:
-    ligament = bpy.data.objects.get(ligament_name)
-    if not ligament:
-        raise ValueError(f"Soft tissue constraint '{ligament}' not found.")
+    for ligament_name in soft_tissue_constraints:
+        if not bpy.data.objects.get(ligament_name):
+            raise ValueError(f"Soft tissue constraint '{ligament_name}' not found.")
     
 
 
@@ -248,124 +261,120 @@ print(child_geometry_names)
 bpy.context.scene.frame_set(0) #set the frame to 0, assuming we have a base posture at frame 0
 target_joint.keyframe_insert(data_path="rotation_euler", frame=0) 
 
-# Store results
-rom_data = [] 
-
-# Store positions for deferred visualization
-all_marker_positions = {
-    "viable": [],
-    "soft_tissue_non_viable": [],
-    "skeletally_non_viable": []
-}
+target_joint_original_wm = target_joint.matrix_world.copy() #copy the transformation matrix after setting frame 0, so it's the base posture (and not the pose an interrupted run left behind)
 
 #ensure that if start and end range are the same, we still test the start range
 ranges = [x_range, y_range, z_range]
 angles = [[np.deg2rad(a) for a in range(r[0], r[1] + d_phi, d_phi)]  for r in ranges]
 
-x_euler, y_euler, z_euler = angles #lists of euler angles
-
 depsgraph = bpy.context.evaluated_depsgraph_get() #Blender's dependency graph
 
+### Open the on-disk result store. Every setting that affects the results is part of the grid definition,
+### so the run is only resumed if nothing has changed.
+grid_definition = {
+    'axis_names': ["X (rad)", "Y (rad)", "Z (rad)"],
+    'axis_values': angles,
+    'target_joint_name': target_joint_name,
+    'target_landmark_name': target_landmark_name,
+    'soft_tissue_constraints': soft_tissue_constraints if use_soft_tissue_constraint else {},
+    'joint_base_matrix': [list(row) for row in target_joint_original_wm], #needed to show stored poses again, with apply_pose_sample
+    'pose_relative_to_base': False, #euler angles are the global orientation of the joint
+}
 
+### Soft tissue constraints are evaluated analytically from the hooked points, for a whole chunk of poses at once
+constraints = [export_soft_tissue_constraint(bpy.data.objects[name], target_joint, depsgraph, max_length = max_length)
+               for name, max_length in grid_definition['soft_tissue_constraints'].items()]
 
-frame = 2
-# clean nested loop
-for x in x_euler:
-    for y in y_euler:
-        for z in z_euler:
-            
-            euler_angles = [x, y, z]
-            euler_string = f"{x:.3f}_{y:.3f}_{z:.3f}"
-            
-            #construct rotation matrix from euler angles
-            gRj, jRg = matrix_from_euler_XYZbody(euler_angles)
-            
-            #construct a new temporary world matrix, and use this to check for intersections
-            temp_wm = gRj.to_4x4()
-            temp_wm.translation = target_joint_original_wm.translation
-            
-            target_joint.matrix_world = temp_wm #
-            
-            #update dependency graph before intersection checking
-            
-            depsgraph.update()
-            
-            
-            ### check for intersections
-            intersect_found = False
-            constrained_by_soft_tissue = False
-            
-            
-            for parent_geom_name in parent_geometry_names:
-                for child_geom_name in child_geometry_names:
-                    intersections = check_bvh_intersection(parent_geom_name, child_geom_name, depsgraph)
-                    if intersections:
-                        intersect_found = True
-            
-            if use_soft_tissue_constraint:
-                lig_ev = ligament.evaluated_get(depsgraph) #
-                lig_ev_mesh = lig_ev.to_mesh()
-                length = lig_ev_mesh.attributes['length'].data[0].value  #muscle length is stored as an attribute via the muscle geometry nodes.
-                lig_ev.to_mesh_clear()
-                
-                if length > lig_length_threshold:
-                    constrained_by_soft_tissue = True
-                
-                lig_length_value = length
-                
-            else:
-                lig_length_value = None        
-            
-            if not intersect_found: #if no intersections
-                
-                
-                if constrained_by_soft_tissue: 
-                    print(f"Pose at euler: {euler_angles} is non viable due to soft tissue constraint")
-                    
-                    if visualize_endpoint_markers: #if we visualize endpoint markers, check what situation we'e dealing with (viable, soft non viable, skeleton non viable)
-                        situation = situation_names[1] #meaning soft tissue non viable
-                else: #if not constrained by soft tissue
-                    print(f"Pose at euler: {euler_angles} has no skeletal intersections")
-                    
-                    if visualize_endpoint_markers: #if we visualize endpoint markers, check what situation we'e dealing with (viable, soft non viable, skeleton non viable)
-                        situation = situation_names[0] #meaning viable
-                    
-                                                    
-            else: #if there are soft tissue intersections
-                print(f"Pose at euler: {euler_angles} has skeletal intersections")    
-                
-                if visualize_endpoint_markers: #if we visualize endpoint markers, check what situation we'e dealing with (viable, soft non viable, skeleton non viable)
-                    situation = situation_names[2] #meaning skeletally non viable
-            
+manifest = open_pose_sample_store(store_path, grid_definition, chunk_size)
+chunks_to_do = pending_chunks(manifest)
 
-            ## get the endpoint marker position
-            endpointmarker_pos = target_landmark.matrix_world.translation.copy()
-                        
-            # >>> STORE RESULTS for CSV here <<<
-            rom_data.append([
-                x,   # radians
-                y,
-                z,
-                situation,
-                lig_length_value,
-                endpointmarker_pos.x,
-                endpointmarker_pos.y,
-                endpointmarker_pos.z   
-            ])
-                    
-            
-            if visualize_endpoint_markers:
-                all_marker_positions[situation].append(endpointmarker_pos)
-                        
-                
-            #keyframe the pose
-            target_joint.keyframe_insert(data_path="rotation_euler", frame=frame)        
-                
-            ### Restore original world matrix
+print(f"{manifest['n_chunks'] - len(chunks_to_do)} of {manifest['n_chunks']} chunks already completed in {store_path}")
+
+n_evaluated = 0 #poses evaluated in this session, not in earlier (interrupted) runs
+
+# sample the pose grid one chunk at a time. Each completed chunk is written to disk immediately
+for chunk_id in chunks_to_do:
+
+    pose_indices = chunk_indices(manifest, chunk_id)
+    n_evaluated += len(pose_indices)
+    chunk_poses = poses_from_flat_indices(grid_definition, pose_indices)
+
+    chunk_situations = np.zeros(len(pose_indices), dtype = np.int8)
+
+    #rigid transforms of the joint for all poses in the chunk, and the soft tissue lengths
+    R, t = pose_transforms(chunk_poses, grid_definition['joint_base_matrix'], grid_definition['pose_relative_to_base'])
+    chunk_lengths, chunk_violated = evaluate_constraints(constraints, R, t)
+    chunk_landmarks = np.zeros((len(pose_indices), 3))
+
+    for i, (pose_index, euler_angles) in enumerate(zip(pose_indices, chunk_poses)):
+
+        #construct rotation matrix from euler angles
+        gRj, jRg = matrix_from_euler_XYZbody(euler_angles)
+        
+        #construct a new temporary world matrix, and use this to check for intersections
+        temp_wm = gRj.to_4x4()
+        temp_wm.translation = target_joint_original_wm.translation
+        
+        target_joint.matrix_world = temp_wm #
+        
+        #update dependency graph before intersection checking
+        
+        depsgraph.update()
+        
+        
+        ### check for intersections
+        intersect_found = False
+        constrained_by_soft_tissue = False
+        
+        
+        for parent_geom_name in parent_geometry_names:
+            for child_geom_name in child_geometry_names:
+                intersections = check_bvh_intersection(parent_geom_name, child_geom_name, depsgraph)
+                if intersections:
+                    intersect_found = True
+        
+        if chunk_violated[i].any(): #non viable if any of the soft tissue constraints is violated
+            constrained_by_soft_tissue = True
+        
+        if not intersect_found: #if no intersections
             
-            target_joint.matrix_world = target_joint_original_wm
+            if constrained_by_soft_tissue: 
+                print(f"Pose at euler: {list(euler_angles)} is non viable due to soft tissue constraint")
+                situation = situation_names[1] #meaning soft tissue non viable
+
+            else: #if not constrained by soft tissue
+                print(f"Pose at euler: {list(euler_angles)} has no skeletal intersections")
+                situation = situation_names[0] #meaning viable
+                                                
+        else: #if there are soft tissue intersections
+            print(f"Pose at euler: {list(euler_angles)} has skeletal intersections")    
+            situation = situation_names[2] #meaning skeletally non viable
+        
+        chunk_situations[i] = situation_names.index(situation)
+
+        ## get the endpoint marker position
+        chunk_landmarks[i] = target_landmark.matrix_world.translation
             
-            frame += 1
+        ### Restore original world matrix
+        
+        target_joint.matrix_world = target_joint_original_wm
+
+    write_chunk(store_path, manifest, chunk_id, {'pose': chunk_poses,
+                                                 'situation': chunk_situations,
+                                                 'soft_tissue_lengths': chunk_lengths,
+                                                 'landmark': chunk_landmarks})
+    
+    print(f"Chunk {chunk_id + 1} of {manifest['n_chunks']} written to disk")
+
+
+### Open all results (including those of previous, interrupted runs) as compact, memory-mapped columns.
+### Individual poses are not keyframed, show them on demand with apply_pose_sample(store_path, pose_index)
+results, manifest = open_results(store_path)
+n_results = len(results['index'])
+
+# Store positions for deferred visualization
+all_marker_positions = {situation: np.asarray(results['landmark'][results['situation'] == code])
+                        for code, situation in enumerate(situation_names)}
 
 
 
@@ -374,7 +383,7 @@ if visualize_endpoint_markers:
     # --- Create fast marker meshes ---
     print("Creating endpoint marker meshes")
     for situation in situation_names:
-        points = list(all_marker_positions[situation])  # positions only
+        points = all_marker_positions[situation].tolist()  # positions only
         if not points:
             continue
 
@@ -414,7 +423,7 @@ if visualize_endpoint_markers:
 
 end_time = time.time()
 time_elapsed = end_time-start_time
-time_per_pose = time_elapsed/(len(rom_data)) #minus 1 because we start at 2
+time_per_pose = time_elapsed/max(n_evaluated, 1)
 
 print(f"time elapsed: {time_elapsed} seconds")
 print(f"time per pose: {time_per_pose} seconds")
@@ -436,7 +445,11 @@ if export_results_as_CSV:
 
     with open(csv_output_path, mode='w', newline='') as file:
         writer = csv.writer(file)
-        writer.writerow(["X (rad)", "Y (rad)", "Z (rad)", "Pose viability", "Ligament length (m)"])
-        writer.writerows(rom_data)
+        writer.writerow(["X (rad)", "Y (rad)", "Z (rad)", "Pose viability"] +
+                        [name + " length (m)" for name in grid_definition['soft_tissue_constraints']] +
+                        ["Markerpos_x (m)", "Markerpos_y (m)", "Markerpos_z (m)"])
+        #rows are generated from the memory-mapped columns
+        writer.writerows(list(pose) + [situation_names[code]] + list(lengths) + list(landmark)
+                         for pose, code, lengths, landmark in zip(results['pose'], results['situation'], results['soft_tissue_lengths'], results['landmark']))
 
     print(f"Exported ROM data to {csv_output_path}")
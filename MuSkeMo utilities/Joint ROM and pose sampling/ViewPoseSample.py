@@ -0,0 +1,46 @@
+#Shows a single pose from the results of PoseSampleExample.py or 6DOFPoseSampleTest.py in the scene.
+#The pose sampling scripts store their results on disk instead of keyframing every pose. This script reads the stored
+#(memory-mapped) results, and moves the joint to the requested sample, without adding any keyframes.
+
+import bpy
+import addon_utils
+import os
+import sys
+
+# ------------------------
+# SETTINGS
+# ------------------------
+
+store_folder_name = 'joint_pose_sampling_v1_results' #the results folder next to the blend file, output_filename + '_results' in the sampling script
+
+sample_number = 0 #which sample to show. Counts over the samples in the chosen situation (see below)
+situation = 'viable' #'viable', 'soft_tissue_non_viable', 'skeletally_non_viable', or None to count over all samples
+
+
+### import scripts and functions we will need
+
+muskemo_module = next((mod for mod in addon_utils.modules() if mod.__name__ == 'MuSkeMo'), None) #assumes MuSkeMo addon is installed
+MuSkeMo_folder =  os.path.dirname(muskemo_module.__file__) #parent folder of MuSkeMo, which also includes the 'MuSkeMo utilities' folder
+scripts = os.path.join(MuSkeMo_folder, 'scripts')
+sys.path.append(scripts) #append the muskemo scripts folder to sys, so we can directly import from the folder
+
+from pose_sample_store import (open_results, situation_names)
+from pose_sampling_geometry_func import apply_pose_sample
+
+store_path = os.path.join(os.path.dirname(bpy.data.filepath), store_folder_name)
+
+results, manifest = open_results(store_path)
+
+if situation is None:
+    pose_indices = results['index']
+else:
+    pose_indices = results['index'][results['situation'] == situation_names.index(situation)]
+
+print(f"{len(pose_indices)} stored samples to choose from")
+
+if sample_number >= len(pose_indices):
+    raise ValueError(f"Sample number {sample_number} is out of range, there are {len(pose_indices)} samples")
+
+sample = apply_pose_sample(store_path, int(pose_indices[sample_number]))
+
+print(f"Showing pose {int(pose_indices[sample_number])}: {sample}")
@@ -127,6 +127,7 @@ from .scripts.import_panel import (VIEW3D_PT_import_panel, VIEW3D_PT_import_mode
                                    ImportContactsOperator,ImportFramesOperator,
                                    ImportOpenSimModel, ImportGaitsymModel,
                                    ImportMuJoCoModel,
+                                   VIEW3D_PT_geometry_cache_subpanel, ClearGeometryCacheOperator,
                                    )
 
 #### visualization panel
@@ -137,7 +138,11 @@ from .scripts.visualization_panel import (VIEW3D_PT_visualization_panel, VIEW3D_
                                           CreateGroundPlaneOperator, SetCompositorBackgroundGradient,
                                            ConvertMusclesToVolumetricViz,ConvertMusclesToSimpleViz,
                                     ImportTrajectory,#these are separate scripts)
+                                    BakeTrajectoryPlaybackOperator, StopTrajectoryPlaybackOperator,
+                                    BatchImportTrajectories, SwitchTrajectoryTrialOperator,
+                                    MuscleAnalysisOperator,
                                     )
+from .scripts.trajectory_playback import (register_playback_handler, unregister_playback_handler)
 #### Anatomical (local) reference frame panel
 from .scripts.frame_panel import (VIEW3D_PT_frame_panel,
                                 AssignOrLandmarkOperator, 
@@ -172,8 +177,9 @@ from .scripts.reflection_panel import (ReflectUnilateralBodiesOperator,
 #### Mesh tools panel
 
 from .scripts.mesh_tools_panel import (VIEW3D_PT_mesh_tools_panel, VIEW3D_PT_mesh_alignment_subpanel,
-                                       VIEW3D_PT_geom_primitive_fitting_subpanel,
-                                       MeshAlignnmentICPPointToPlaneOperator,MeshIntersectionCheckerOperator,
+                                       VIEW3D_PT_geom_primitive_fitting_subpanel, VIEW3D_PT_collision_proxy_subpanel,
+                                       MeshAlignnmentICPPointToPlaneOperator,MeshIntersectionCheckerOperator,ArticularSpacingOperator,WorkspaceEnvelopeOperator,
+                                       CreateCollisionProxiesOperator, RemoveCollisionProxiesOperator,
                                        MeshFromSelectionOperator,  
                                        FitSphereGeomOperator,FitSphereLSOperator,
                                       FitCylinderOperator, FitEllipsoidOperator,
@@ -194,8 +200,9 @@ classes = (  #Global settings panel
                                      ResetToDefaultPoseOperator,
     # Mesh tools panel
                                     VIEW3D_PT_mesh_tools_panel, VIEW3D_PT_mesh_alignment_subpanel,
-                                    VIEW3D_PT_geom_primitive_fitting_subpanel,
-                                    MeshAlignnmentICPPointToPlaneOperator,MeshIntersectionCheckerOperator,
+                                    VIEW3D_PT_geom_primitive_fitting_subpanel, VIEW3D_PT_collision_proxy_subpanel,
+                                    MeshAlignnmentICPPointToPlaneOperator,MeshIntersectionCheckerOperator,ArticularSpacingOperator,WorkspaceEnvelopeOperator,
+                                    CreateCollisionProxiesOperator, RemoveCollisionProxiesOperator,
                                     MeshFromSelectionOperator, FitSphereGeomOperator,FitSphereLSOperator,
                                       FitCylinderOperator, FitEllipsoidOperator,
                                       FitPlaneOperator, 
@@ -272,6 +279,7 @@ classes = (  #Global settings panel
 
                                   ImportOpenSimModel, ImportGaitsymModel, #these are separate scripts
                                   ImportMuJoCoModel,
+                                  VIEW3D_PT_geometry_cache_subpanel, ClearGeometryCacheOperator,
 
             # visualization panel
                                 VIEW3D_PT_visualization_panel, VIEW3D_PT_volumetric_muscles_subpanel,
@@ -281,6 +289,9 @@ classes = (  #Global settings panel
                                ConvertMusclesToVolumetricViz,ConvertMusclesToSimpleViz,
 
                                 ImportTrajectory, # separate script
+                                BakeTrajectoryPlaybackOperator, StopTrajectoryPlaybackOperator,
+                                BatchImportTrajectories, SwitchTrajectoryTrialOperator,
+                                MuscleAnalysisOperator,
 
             #anatomical (local) reference frames panel
                                  VIEW3D_PT_frame_panel,
@@ -323,9 +334,13 @@ def register():
         bpy.utils.register_class(c)
     
     bpy.types.Scene.muskemo = PointerProperty(type=MuSkeMoProperties)  ### this call stores all the custom properties under the property Scene.muskemo
+
+    register_playback_handler() #streamed trajectory playback (frame change handler)
     
 
 def unregister():
+    unregister_playback_handler()
+
     for c in reversed(classes):
         bpy.utils.unregister_class(c)
 
@@ -0,0 +1,321 @@
+import numpy as np
+
+# Adaptive search for the boundary of the viable region of a joint's pose space.
+# Instead of enumerating the full Cartesian grid of euler angles (and translations), we start from a few viable
+# seed poses, march outward along rays in (normalized) pose space, and bisect each ray to the boundary.
+# Rays are then added only where neighbouring boundary points are far apart, so evaluations are spent near the boundary.
+
+# This file deliberately does not import bpy or mathutils, and does not use relative imports,
+# so it can be used by the scripts in 'MuSkeMo utilities' (which append the scripts folder to sys.path), and in worker processes.
+
+
+def unit_directions(n_dims, n_directions, random_seed = 0):
+
+    #Returns a (n_directions x n_dims) array of unit vectors that cover the unit (n_dims-1)-sphere.
+    #The positive and negative coordinate axes are always included, so the extremes of each degree of freedom are found.
+    #In 2D the remaining directions are evenly spaced angles, in 3D a Fibonacci lattice (roughly uniform),
+    #and in other dimensions they are random normal samples that are normalized.
+
+    axes = np.vstack([np.eye(n_dims), -np.eye(n_dims)])
+
+    n_extra = max(n_directions - len(axes), 0)
+
+    if n_extra == 0:
+        return axes
+
+    if n_dims == 1:
+        return axes
+
+    if n_dims == 2:
+        angle = 2 * np.pi * (np.arange(n_extra) + 0.5) / n_extra
+        extra = np.column_stack([np.cos(angle), np.sin(angle)])
+
+    elif n_dims == 3:
+        i = np.arange(n_extra) + 0.5
+        polar = np.arccos(1 - 2*i/n_extra)
+        azimuth = np.pi * (1 + 5**0.5) * i
+        extra = np.column_stack([np.cos(azimuth)*np.sin(polar), np.sin(azimuth)*np.sin(polar), np.cos(polar)])
+
+    else:
+        rng = np.random.default_rng(random_seed)
+        extra = rng.normal(size = (n_extra, n_dims))
+        extra = extra / np.linalg.norm(extra, axis = 1, keepdims = True)
+
+    return np.vstack([axes, extra])
+
+
+def coarse_grid(lower, upper, points_per_dim = 3):
+
+    #Returns a (n x n_dims) array of poses on a coarse grid spanning the pose box, used to find seed poses if none are supplied.
+
+    axes = [np.linspace(lo, up, points_per_dim if up > lo else 1) for lo, up in zip(lower, upper)] #fixed degrees of freedom get a single value
+    mesh = np.meshgrid(*axes, indexing = 'ij')
+
+    return np.column_stack([m.ravel() for m in mesh])
+
+
+def adaptive_boundary_search(is_viable, lower, upper, resolution, seed_poses = None,
+                             n_directions = 64, march_step = 0.1, max_refinement_rounds = 4,
+                             refine_distance = None, coarse_points_per_dim = 3, max_seeds = 4, random_seed = 0):
+
+    '''
+    Finds the boundary of the viable region of a pose space by ray marching and bisection.
+
+    Inputs:
+    - is_viable (callable). Takes an (n x n_dims) array of poses, returns a boolean array of length n (True means viable).
+      Poses are given in the same units as lower/upper (e.g., radians for euler angles, meters for translations).
+      Batching the poses allows the viability check to be vectorized or distributed.
+    - lower, upper (lists of n_dims floats). The box that bounds the pose space.
+    - resolution (float, or list of n_dims floats). Guaranteed boundary resolution along each pose coordinate.
+      For every ray, the boundary lies between a viable and a non-viable pose that differ by no more than resolution in each coordinate.
+    - seed_poses (optional (n x n_dims) array). Poses that are expected to be viable (e.g. the rest pose). Non-viable seeds are discarded.
+      If none are supplied (or none is viable), a coarse grid is sampled and its viable poses are used.
+    - max_seeds (int). Maximum number of seeds that rays are cast from. If there are more viable seeds, a spread-out subset is used.
+    - n_directions (int). Number of initial rays per seed.
+    - march_step (float). Step size during the outward march, as a fraction of the box size.
+      Non-viable features that are thinner than this along a ray can be stepped over.
+    - max_refinement_rounds (int). Number of times new rays are added between boundary points that are too far apart.
+    - refine_distance (float, optional). Boundary points (in normalized pose space) further apart than this receive a new ray in between.
+      Defaults to 2*march_step.
+
+    Output: a dict with
+    - 'viable_poses': every evaluated pose that was viable (m x n_dims)
+    - 'non_viable_poses': every evaluated pose that was not viable
+    - 'boundary_inner': per ray, the last viable pose before the boundary
+    - 'boundary_outer': per ray, the first non-viable pose after the boundary (nan if the ray reached the box without leaving the viable region)
+    - 'reached_box': per ray, True if the ray reached the box limits while still viable
+    - 'seeds', 'ray_seed_index', 'ray_directions' (normalized pose space)
+    - 'resolution': the resolution per coordinate
+    - 'n_evaluations': total number of poses evaluated
+    '''
+
+    lower = np.asarray(lower, dtype = float)
+    upper = np.asarray(upper, dtype = float)
+    n_dims = len(lower)
+
+    span = upper - lower
+    span[span == 0] = 1.0 #degrees of freedom with a fixed value are not searched, but avoid division by zero
+
+    free_dims = (upper - lower) > 0
+
+    resolution = np.broadcast_to(np.asarray(resolution, dtype = float), (n_dims,))
+    res_norm = resolution / span #resolution in normalized coordinates
+
+    if refine_distance is None:
+        refine_distance = 2 * march_step
+
+    evaluated_poses = []
+    evaluated_viable = []
+
+    def evaluate(poses_norm):
+        poses = lower + poses_norm * span
+        viable = np.asarray(is_viable(poses), dtype = bool).reshape(-1)
+        evaluated_poses.append(poses)
+        evaluated_viable.append(viable)
+        return viable
+
+    ### seeds
+    seeds_norm = np.zeros((0, n_dims))
+
+    if seed_poses is not None:
+        seeds_norm = (np.atleast_2d(np.asarray(seed_poses, dtype = float)) - lower) / span
+        seeds_norm = seeds_norm[evaluate(seeds_norm)]
+
+    if len(seeds_norm) == 0: #no (viable) seeds, sample a coarse grid
+        grid_norm = (coarse_grid(lower, upper, coarse_points_per_dim) - lower) / span
+        seeds_norm = grid_norm[evaluate(grid_norm)]
+
+    seeds_norm = _spread_subset(seeds_norm, max_seeds)
+
+    if len(seeds_norm) == 0: #nothing viable found, return what we evaluated
+        return _search_result(evaluated_poses, evaluated_viable, lower, span, seeds_norm,
+                              np.zeros(0, dtype = int), np.zeros((0, n_dims)), np.zeros((0, n_dims)),
+                              np.zeros((0, n_dims)), np.zeros(0, dtype = bool), resolution)
+
+    ### initial rays: every direction from every seed. Only free degrees of freedom are searched.
+    n_free = int(free_dims.sum())
+    base_dirs = np.zeros((0, n_dims))
+
+    if n_free > 0:
+        free_dirs = unit_directions(n_free, n_directions, random_seed)
+        base_dirs = np.zeros((len(free_dirs), n_dims))
+        base_dirs[:, free_dims] = free_dirs
+
+    ray_seed = np.repeat(np.arange(len(seeds_norm)), len(base_dirs))
+    ray_dir = np.tile(base_dirs, (len(seeds_norm), 1))
+
+    t_in, t_out, reached_box = _march_and_bisect(evaluate, seeds_norm[ray_seed], ray_dir, march_step, res_norm)
+
+    ### refinement, add rays only where neighbouring boundary points are far apart
+    for _ in range(max_refinement_rounds):
+
+        inner = seeds_norm[ray_seed] + t_in[:, None] * ray_dir
+        new_seed, new_dir = _refinement_rays(inner, ray_seed, ray_dir, refine_distance)
+
+        if len(new_dir) == 0:
+            break
+
+        n_t_in, n_t_out, n_reached = _march_and_bisect(evaluate, seeds_norm[new_seed], new_dir, march_step, res_norm)
+
+        ray_seed = np.concatenate([ray_seed, new_seed])
+        ray_dir = np.vstack([ray_dir, new_dir])
+        t_in = np.concatenate([t_in, n_t_in])
+        t_out = np.concatenate([t_out, n_t_out])
+        reached_box = np.concatenate([reached_box, n_reached])
+
+    inner = seeds_norm[ray_seed] + t_in[:, None] * ray_dir
+    outer = seeds_norm[ray_seed] + t_out[:, None] * ray_dir #t_out is nan for rays that reached the box
+
+    return _search_result(evaluated_poses, evaluated_viable, lower, span, seeds_norm, ray_seed, ray_dir,
+                          inner, outer, reached_box, resolution)
+
+
+def _spread_subset(points, n_max):
+
+    #farthest point sampling, so the seeds cover different parts of the viable region
+
+    if len(points) <= n_max:
+        return points
+
+    chosen = [0]
+    dist = np.linalg.norm(points - points[0], axis = 1)
+
+    for _ in range(n_max - 1):
+        chosen.append(int(np.argmax(dist)))
+        dist = np.minimum(dist, np.linalg.norm(points - points[chosen[-1]], axis = 1))
+
+    return points[chosen]
+
+
+def _ray_exit(origins, directions):
+
+    #largest t >= 0 such that origins + t*directions stays inside the unit box
+
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        t_up = np.where(directions > 0, (1 - origins) / directions, np.inf)
+        t_lo = np.where(directions < 0, -origins / directions, np.inf)
+
+    return np.minimum(t_up, t_lo).min(axis = 1)
+
+
+def _march_and_bisect(evaluate, origins, directions, march_step, res_norm):
+
+    #All rays are advanced simultaneously, so each step is a single batched call to the viability function.
+    #Returns, per ray, the last viable t, the first non-viable t (nan if none), and whether the box was reached.
+
+    n_rays = len(origins)
+    t_max = _ray_exit(origins, directions)
+
+    #step along a ray such that no coordinate changes by more than march_step (in normalized units)
+    step = march_step / np.abs(directions).max(axis = 1)
+
+    #bisection tolerance along each ray, from the per-coordinate resolution
+    with np.errstate(divide = 'ignore'):
+        tol = np.min(np.where(np.abs(directions) > 0, res_norm / np.abs(directions), np.inf), axis = 1)
+
+    t_in = np.zeros(n_rays)
+    t_out = np.full(n_rays, np.nan)
+    reached_box = np.zeros(n_rays, dtype = bool)
+    active = np.ones(n_rays, dtype = bool)
+
+    ### outward march
+    while active.any():
+        idx = np.flatnonzero(active)
+        t_try = np.minimum(t_in[idx] + step[idx], t_max[idx])
+        viable = evaluate(origins[idx] + t_try[:, None] * directions[idx])
+
+        t_in[idx[viable]] = t_try[viable]
+        t_out[idx[~viable]] = t_try[~viable]
+
+        at_box = viable & (t_try >= t_max[idx])
+        reached_box[idx[at_box]] = True
+
+        active[idx[~viable | at_box]] = False
+
+    ### bisection between the last viable and first non-viable pose
+    bisecting = ~reached_box & ((t_out - t_in) > tol)
+
+    while bisecting.any():
+        idx = np.flatnonzero(bisecting)
+        t_mid = 0.5 * (t_in[idx] + t_out[idx])
+        viable = evaluate(origins[idx] + t_mid[:, None] * directions[idx])
+
+        t_in[idx[viable]] = t_mid[viable]
+        t_out[idx[~viable]] = t_mid[~viable]
+
+        bisecting[idx] = (t_out[idx] - t_in[idx]) > tol[idx]
+
+    return t_in, t_out, reached_box
+
+
+def _refinement_rays(inner, ray_seed, ray_dir, refine_distance):
+
+    #For each boundary point, find its nearest neighbour (among rays from the same seed).
+    #If they are further apart than refine_distance, add a ray in the mean direction of the two.
+
+    new_seed = []
+    new_dir = []
+
+    for seed in np.unique(ray_seed):
+        idx = np.flatnonzero(ray_seed == seed)
+        if len(idx) < 2:
+            continue
+
+        dirs = ray_dir[idx]
+        #nearest neighbour in direction space (largest cosine), excluding itself
+        cos_sim = dirs @ dirs.T
+        np.fill_diagonal(cos_sim, -np.inf)
+        neighbour = np.argmax(cos_sim, axis = 1)
+
+        pairs = np.sort(np.column_stack([np.arange(len(idx)), neighbour]), axis = 1)
+        pairs = np.unique(pairs, axis = 0)
+
+        gap = np.linalg.norm(inner[idx[pairs[:, 0]]] - inner[idx[pairs[:, 1]]], axis = 1)
+        pairs = pairs[gap > refine_distance]
+
+        if len(pairs) == 0:
+            continue
+
+        mid = dirs[pairs[:, 0]] + dirs[pairs[:, 1]]
+        norm = np.linalg.norm(mid, axis = 1)
+        mid = mid[norm > 1e-12] / norm[norm > 1e-12, None] #opposite directions have no mean direction
+
+        new_seed.append(np.full(len(mid), seed))
+        new_dir.append(mid)
+
+    if not new_dir:
+        return np.zeros(0, dtype = int), np.zeros((0, ray_dir.shape[1]))
+
+    return np.concatenate(new_seed), np.vstack(new_dir)
+
+
+def _search_result(evaluated_poses, evaluated_viable, lower, span, seeds_norm, ray_seed, ray_dir,
+                   inner, outer, reached_box, resolution):
+
+    n_dims = len(lower)
+    poses = np.vstack(evaluated_poses) if evaluated_poses else np.zeros((0, n_dims))
+    viable = np.concatenate(evaluated_viable) if evaluated_viable else np.zeros(0, dtype = bool)
+
+    return {
+        'viable_poses': poses[viable],
+        'non_viable_poses': poses[~viable],
+        'boundary_inner': lower + inner * span,
+        'boundary_outer': lower + outer * span,
+        'reached_box': reached_box,
+        'seeds': lower + seeds_norm * span,
+        'ray_seed_index': ray_seed,
+        'ray_directions': ray_dir,
+        'resolution': resolution,
+        'n_evaluations': len(poses),
+    }
+
+
+def grid_evaluation_count(lower, upper, step):
+
+    #Number of poses an exhaustive grid with the given step (per coordinate) would evaluate, to compare against n_evaluations.
+
+    lower = np.asarray(lower, dtype = float)
+    upper = np.asarray(upper, dtype = float)
+    step = np.broadcast_to(np.asarray(step, dtype = float), lower.shape)
+
+    return int(np.prod(np.floor((upper - lower) / step) + 1))
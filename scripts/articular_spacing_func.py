@@ -0,0 +1,159 @@
+import bpy
+import numpy as np
+from mathutils.bvhtree import BVHTree
+
+# Articular spacing (minimal distance between two meshes) over a range of frames, e.g. an XROMM trial.
+# Each mesh is exported and turned into a BVH tree once, in its own local coordinates. Bones move rigidly, so every frame only needs
+# the objects' world matrices: the query vertices of one mesh are transformed in bulk (NumPy) into the local frame of the other mesh,
+# and only the vertices that can still beat the current minimum are sent to the BVH nearest-point query.
+# Object scale is baked into the local coordinates, and is assumed to stay constant over the frames.
+# No relative imports, so the utility scripts can import this file after appending the scripts folder to sys.path.
+
+
+def local_mesh_arrays(obj, depsgraph):
+
+    '''
+    Evaluated mesh of obj in local coordinates, with the object's scale applied.
+
+    Output: (n x 3) vertices, (m x 3) triangle vertex indices, and the 3 scale factors that were baked into the vertices
+    '''
+
+    obj_ev = obj.evaluated_get(depsgraph)
+    mesh = obj_ev.to_mesh()
+    mesh.calc_loop_triangles()
+
+    vertices = np.empty(len(mesh.vertices) * 3, dtype = np.float32)
+    mesh.vertices.foreach_get('co', vertices)
+
+    triangles = np.empty(len(mesh.loop_triangles) * 3, dtype = np.int32)
+    mesh.loop_triangles.foreach_get('vertices', triangles)
+
+    scale = np.array(obj_ev.matrix_world.to_scale())
+    obj_ev.to_mesh_clear()
+
+    vertices = vertices.reshape(-1, 3).astype(np.float64) * scale
+
+    return vertices, triangles.reshape(-1, 3), scale
+
+
+def rigid_matrix(obj, scale):
+
+    #world matrix of obj without its (constant) scale, as a 4x4 array
+
+    return np.array(obj.matrix_world) @ np.diag([1/scale[0], 1/scale[1], 1/scale[2], 1])
+
+
+class SpacingMesh:
+
+    #local geometry and BVH tree of one mesh, built once per analysis
+
+    def __init__(self, obj, depsgraph):
+
+        self.obj = obj
+        self.vertices, triangles, self.scale = local_mesh_arrays(obj, depsgraph)
+        self.bvh = BVHTree.FromPolygons(self.vertices.tolist(), triangles.tolist())
+
+        #bounding sphere in local coordinates, used to cull query vertices that can't be the closest
+        self.center = (self.vertices.min(axis = 0) + self.vertices.max(axis = 0))/2
+        self.radius = np.linalg.norm(self.vertices - self.center, axis = 1).max()
+
+
+def nearest_from_vertices(query_points, target, best_distance):
+
+    '''
+    Closest point pair between a set of query points and a target mesh, both expressed in the target's local coordinates.
+
+    Vertices are queried in order of their distance to the target's bounding sphere (a lower bound of their nearest distance),
+    and the search stops as soon as the lower bound of the next vertex exceeds the best distance found so far.
+    The BVH query itself is also limited to the best distance so far.
+
+    Output: best distance, index of the query point, and the closest point on the target (index and point are None if nothing beat best_distance)
+    '''
+
+    lower_bound = np.linalg.norm(query_points - target.center, axis = 1) - target.radius
+    order = np.argsort(lower_bound, kind = 'stable')
+
+    best_index = None
+    best_location = None
+
+    for i in order:
+        if lower_bound[i] > best_distance: #sorted, so none of the remaining vertices can be closer
+            break
+
+        if np.isfinite(best_distance):
+            location, normal, index, distance = target.bvh.find_nearest(query_points[i], best_distance)
+        else:
+            location, normal, index, distance = target.bvh.find_nearest(query_points[i])
+
+        if location is not None and distance < best_distance:
+            best_distance = distance
+            best_index = i
+            best_location = np.array(location)
+
+    return best_distance, best_index, best_location
+
+
+def frame_spacing(mesh_1, mesh_2, M1, M2):
+
+    '''
+    Minimal distance between two meshes for one frame. Checks the vertices of mesh 1 against mesh 2, and vice versa.
+
+    Inputs: two SpacingMesh objects, and their rigid world matrices (4x4 arrays, see rigid_matrix)
+    Output: minimal distance, closest point on mesh 1, closest point on mesh 2 (global coordinates)
+    '''
+
+    M2_inv = np.linalg.inv(M2)
+    T_12 = M2_inv @ M1 #from mesh 1 local to mesh 2 local
+    T_21 = np.linalg.inv(T_12)
+
+    points_1 = mesh_1.vertices @ T_12[:3, :3].T + T_12[:3, 3] #vertices of mesh 1 in mesh 2's local frame
+    points_2 = mesh_2.vertices @ T_21[:3, :3].T + T_21[:3, 3] #vertices of mesh 2 in mesh 1's local frame
+
+    best_distance = np.inf
+    point_1 = point_2 = None
+
+    best_distance, index, location = nearest_from_vertices(points_1, mesh_2, best_distance)
+    if index is not None:
+        point_1 = M1[:3, :3] @ mesh_1.vertices[index] + M1[:3, 3]
+        point_2 = M2[:3, :3] @ location + M2[:3, 3]
+
+    best_distance, index, location = nearest_from_vertices(points_2, mesh_1, best_distance)
+    if index is not None:
+        point_1 = M1[:3, :3] @ location + M1[:3, 3]
+        point_2 = M2[:3, :3] @ mesh_2.vertices[index] + M2[:3, 3]
+
+    return best_distance, point_1, point_2
+
+
+def articular_spacing_time_series(obj_1, obj_2, frames, scene = None):
+
+    '''
+    Minimal distance and closest point pair between two meshes for a list of frames.
+
+    Output: list of rows (frame, distance, point on obj_1 (x, y, z), point on obj_2 (x, y, z)), global coordinates.
+    The scene is returned to the frame it was on.
+    '''
+
+    if scene is None:
+        scene = bpy.context.scene
+
+    current_frame = scene.frame_current
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+
+    mesh_1 = SpacingMesh(obj_1, depsgraph)
+    mesh_2 = SpacingMesh(obj_2, depsgraph)
+
+    rows = []
+
+    for frame in frames:
+        scene.frame_set(frame)
+
+        distance, point_1, point_2 = frame_spacing(mesh_1, mesh_2,
+                                                   rigid_matrix(obj_1, mesh_1.scale),
+                                                   rigid_matrix(obj_2, mesh_2.scale))
+
+        rows.append([frame, distance] + list(point_1) + list(point_2))
+
+    scene.frame_set(current_frame)
+
+    return rows
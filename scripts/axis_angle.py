@@ -21,3 +21,22 @@ def matrix_from_axis_angle(axis, angle): #Equation from Vallery & Schwab 2018, A
     return gRb
 
 
+
+
+def matrices_from_axis_angles(axis, angles):
+    #Batched version of matrix_from_axis_angle (Rodrigues' rotation formula), using NumPy
+    #input:  axis as a list [x, y, z], array of n angles in rad.
+    #output:  (n x 3 x 3) array of rotation matrices gRb (from local to global)
+
+    axis_norm = np.asarray(axis, dtype = float)
+    axis_norm = axis_norm/np.linalg.norm(axis_norm) #ensure unit vector
+
+    K = np.array([[0, -axis_norm[2], axis_norm[1]],
+                  [axis_norm[2], 0, -axis_norm[0]],
+                  [-axis_norm[1], axis_norm[0], 0]])
+
+    angles = np.asarray(angles, dtype = float).reshape(-1, 1, 1)
+
+    gRb = np.eye(3) + (1-np.cos(angles)) * (K@K) + np.sin(angles) * K
+
+    return gRb
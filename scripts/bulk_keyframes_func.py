@@ -0,0 +1,98 @@
+import bpy
+import numpy as np
+
+# Writes whole animation channels at once, instead of calling keyframe_insert for every frame.
+# The values of a channel are computed first (NumPy arrays), and then an F-curve is created and filled in one go,
+# with keyframe_points.add and foreach_set. Works with legacy actions, and with the slotted (layered) actions of Blender 4.4 and later.
+# No relative imports, so the utility scripts can import this file after appending the scripts folder to sys.path.
+
+
+def ensure_fcurves(id_data):
+
+    #returns the F-curve collection of the action of id_data (an object, material, node tree, scene, etc.), creating the action if needed
+
+    anim_data = id_data.animation_data or id_data.animation_data_create()
+
+    if anim_data.action is None:
+        anim_data.action = bpy.data.actions.new(name = id_data.name + 'Action')
+
+    action = anim_data.action
+
+    if not hasattr(action, 'slots'): #legacy actions, before Blender 4.4
+        return action.fcurves
+
+    from bpy_extras import anim_utils
+
+    slot = anim_data.action_slot
+    if slot is None:
+        slot = action.slots.new(id_data.id_type, id_data.name)
+        anim_data.action_slot = slot
+
+    return anim_utils.action_ensure_channelbag_for_slot(action, slot).fcurves
+
+
+def write_fcurve(id_data, data_path, index, frames, values, interpolation = 'LINEAR', fcurves = None):
+
+    '''
+    Replaces the F-curve of one animation channel with keyframes at the given frames.
+
+    Inputs:
+    - id_data: the ID block that owns the property (object, material, node tree, scene...)
+    - data_path (string) and index (int, array index of the property, 0 for non-array properties)
+    - frames, values: 1D arrays of equal length
+    - interpolation: keyframe interpolation ('LINEAR', 'CONSTANT' or 'BEZIER')
+    - fcurves (optional): result of ensure_fcurves(id_data), to avoid looking it up for every channel of the same ID
+    '''
+
+    if fcurves is None:
+        fcurves = ensure_fcurves(id_data)
+
+    fcurve = fcurves.find(data_path, index = index)
+    if fcurve is not None: #replace existing keyframes of this channel
+        fcurves.remove(fcurve)
+
+    fcurve = fcurves.new(data_path, index = index)
+
+    co = np.empty(2 * len(frames), dtype = np.float32)
+    co[0::2] = frames
+    co[1::2] = values
+
+    fcurve.keyframe_points.add(len(frames))
+    fcurve.keyframe_points.foreach_set('co', co)
+
+    interpolation_value = bpy.types.Keyframe.bl_rna.properties['interpolation'].enum_items[interpolation].value
+    fcurve.keyframe_points.foreach_set('interpolation', np.full(len(frames), interpolation_value, dtype = np.int32))
+
+    fcurve.update()
+
+    return fcurve
+
+
+def write_vector_fcurves(id_data, data_path, frames, values, interpolation = 'LINEAR', keep = None):
+
+    #writes all components of a vector property (e.g. 'location', 'rotation_euler' or 'diffuse_color'). values is (n_frames x n_components)
+    #keep (optional): (n_components x n_frames) bool array with the frames to keyframe per component (see keyframe_reduction_func.py)
+
+    fcurves = ensure_fcurves(id_data)
+    values = np.asarray(values)
+    frames = np.asarray(frames)
+
+    for index in range(values.shape[1]):
+        if keep is None:
+            write_fcurve(id_data, data_path, index, frames, values[:, index], interpolation, fcurves)
+        else:
+            write_fcurve(id_data, data_path, index, frames[keep[index]], values[keep[index], index], interpolation, fcurves)
+
+
+def remove_fcurves(id_data, data_path):
+
+    #removes all F-curves of a property (all array indices) from the action of id_data, if it has one
+
+    anim_data = id_data.animation_data
+    if anim_data is None or anim_data.action is None:
+        return
+
+    fcurves = ensure_fcurves(id_data)
+
+    for fcurve in [fc for fc in fcurves if fc.data_path == data_path]:
+        fcurves.remove(fcurve)
@@ -0,0 +1,231 @@
+import bpy
+import numpy as np
+from mathutils.bvhtree import BVHTree
+
+from pose_sampling_geometry_func import mesh_arrays_from_object
+from pose_sampling_workers import matrices_from_euler_XYZbody
+
+# Range of motion of every joint in a chain (necks, tails), about a single local axis of each joint.
+# The geometry of the chain is exported once (in the base pose) and cached as NumPy arrays, so no objects are duplicated or merged in the scene.
+# For each joint, all geometry proximal to it is merged into one BVH tree, built once per joint. Proximal triangles that the
+# child geometry can never reach while it rotates about the joint center are left out, so the tree only contains the nearby segments.
+# Only the (small) child geometry is transformed per step, and the intersection angle is found by bisection after a coarse march,
+# instead of stepping through the whole range in small increments.
+# No relative imports, so the utility scripts can import this file after appending the scripts folder to sys.path.
+
+
+def axis_rotation(axis, phi):
+
+    #rotation matrix for a rotation of phi radians about a local axis ('X', 'Y' or 'Z')
+
+    angles = np.zeros(3)
+    angles['XYZ'.index(axis)] = phi
+
+    return matrices_from_euler_XYZbody(angles)[0]
+
+
+def geometry_names_of_body(body_name):
+
+    body = bpy.data.objects.get(body_name)
+    if not body:
+        return []
+
+    return [child.name for child in body.children if child.get('MuSkeMo_type') == 'GEOMETRY']
+
+
+def collect_proximal_geometry_names(joint_obj):
+
+    '''
+    Walks upward through the joint hierarchy starting from the given JOINT object,
+    collecting names of immediate GEOMETRY-type children of each parent body.
+
+    The result is ordered with the closest (most proximal) geometries first.
+    '''
+
+    geometry_names = []
+    current_joint = joint_obj
+
+    while True:
+        parent_body_name = current_joint.get('parent_body')
+        parent_body = bpy.data.objects.get(parent_body_name) if parent_body_name else None
+        if not parent_body:
+            break
+
+        geometry_names += geometry_names_of_body(parent_body_name)
+
+        parent_joint = parent_body.parent
+        if parent_joint and parent_joint.get('MuSkeMo_type') == 'JOINT':
+            current_joint = parent_joint
+        else:
+            break
+
+    return geometry_names
+
+
+def get_all_distal_joints(root_joint):
+
+    #all joints downstream from root_joint (including itself), by following child_body -> parent_body relationships, proximal first
+
+    joints_by_parent_body = {}
+    for obj in bpy.data.objects:
+        if obj.get('MuSkeMo_type') == 'JOINT' and obj.get('parent_body'):
+            joints_by_parent_body.setdefault(obj['parent_body'], []).append(obj)
+
+    joint_queue = [root_joint]
+    joint_list = []
+
+    while joint_queue:
+        joint = joint_queue.pop(0)
+        joint_list.append(joint)
+        joint_queue += joints_by_parent_body.get(joint.get('child_body'), [])
+
+    return joint_list
+
+
+class ChainGeometryCache:
+
+    #world-space vertices and triangles of each geometry in the base pose, exported from the scene only once
+
+    def __init__(self, depsgraph):
+
+        self.depsgraph = depsgraph
+        self.arrays = {}
+
+    def get(self, name):
+
+        if name not in self.arrays:
+            self.arrays[name] = mesh_arrays_from_object(bpy.data.objects[name], self.depsgraph)
+
+        return self.arrays[name]
+
+    def merged(self, names):
+
+        vertices = []
+        triangles = []
+        offset = 0
+
+        for name in names:
+            v, t = self.get(name)
+            vertices.append(v)
+            triangles.append(t + offset)
+            offset += len(v)
+
+        if not vertices:
+            return np.zeros((0, 3)), np.zeros((0, 3), dtype = np.int64)
+
+        return np.vstack(vertices), np.vstack(triangles)
+
+
+def reachable_triangles(vertices, triangles, center, reach):
+
+    '''
+    Conservative culling: returns the triangles that may come within 'reach' of 'center'.
+    A triangle is kept if its bounding sphere (around its centroid) overlaps the sphere of radius reach.
+    '''
+
+    if not len(triangles):
+        return triangles
+
+    tri_verts = vertices[triangles] #m x 3 x 3
+    centroids = tri_verts.mean(axis = 1)
+    tri_radius = np.linalg.norm(tri_verts - centroids[:, None, :], axis = 2).max(axis = 1)
+
+    keep = np.linalg.norm(centroids - center, axis = 1) - tri_radius <= reach
+
+    return triangles[keep]
+
+
+class JointRomProblem:
+
+    '''
+    Single-axis ROM of one joint in the chain.
+
+    Inputs:
+    - joint_obj: MuSkeMo JOINT, in its base pose
+    - cache: ChainGeometryCache
+    - axis: local axis of the joint ('X', 'Y' or 'Z')
+    '''
+
+    def __init__(self, joint_obj, cache, axis):
+
+        base = np.array(joint_obj.matrix_world)
+        self.R0 = base[:3, :3]
+        self.t0 = base[:3, 3]
+        self.axis = axis
+        self.n_evaluations = 0
+
+        #child geometry, in the joint frame
+        child_vertices, self.child_triangles = cache.merged(geometry_names_of_body(joint_obj.get('child_body', '')))
+        self.child_local = (child_vertices - self.t0) @ self.R0 #R0.T @ (v - t0), row-wise
+        self.child_triangle_list = self.child_triangles.tolist()
+
+        #proximal geometry, merged into one BVH tree and culled to what the rotating child geometry can reach
+        proximal_vertices, proximal_triangles = cache.merged(collect_proximal_geometry_names(joint_obj))
+        reach = np.linalg.norm(self.child_local, axis = 1).max() if len(self.child_local) else 0
+        proximal_triangles = reachable_triangles(proximal_vertices, proximal_triangles, self.t0, reach)
+
+        self.proximal_bvh = None
+        if len(proximal_triangles) and len(self.child_triangles):
+            self.proximal_bvh = BVHTree.FromPolygons(proximal_vertices.tolist(), proximal_triangles.tolist())
+
+    def rotation(self, phi_deg):
+
+        #world rotation of the joint after rotating phi degrees about its local axis
+
+        return self.R0 @ axis_rotation(self.axis, np.deg2rad(phi_deg))
+
+    def is_viable(self, phi_deg):
+
+        if self.proximal_bvh is None:
+            return True
+
+        self.n_evaluations += 1
+        vertices = self.child_local @ self.rotation(phi_deg).T + self.t0
+        child_bvh = BVHTree.FromPolygons(vertices.tolist(), self.child_triangle_list)
+
+        return not child_bvh.overlap(self.proximal_bvh)
+
+    def max_rotation(self, end_phi, coarse_step = 5, tolerance = 0.1):
+
+        '''
+        Largest viable rotation between 0 and end_phi (degrees), assuming the start pose is viable.
+        Marches in steps of coarse_step until the first intersection, and then bisects that step down to 'tolerance' degrees.
+
+        Output: last feasible angle in degrees, or 'start_pose_not_viable'
+        '''
+
+        if not self.is_viable(0):
+            return 'start_pose_not_viable'
+
+        step = np.sign(end_phi) * abs(coarse_step)
+        if step == 0:
+            return 0
+
+        last_feasible = 0.0
+
+        for phi in np.append(np.arange(step, end_phi, step), end_phi):
+            if self.is_viable(phi):
+                last_feasible = phi
+                continue
+
+            infeasible = phi
+            while abs(infeasible - last_feasible) > tolerance:
+                mid = (last_feasible + infeasible)/2
+                if self.is_viable(mid):
+                    last_feasible = mid
+                else:
+                    infeasible = mid
+
+            break
+
+        return float(last_feasible)
+
+    def matrix_world(self, phi_deg):
+
+        #4x4 world matrix (nested lists) of the joint for a rotation of phi degrees
+
+        matrix = np.eye(4)
+        matrix[:3, :3] = self.rotation(phi_deg)
+        matrix[:3, 3] = self.t0
+
+        return matrix.tolist()
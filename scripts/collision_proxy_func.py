@@ -0,0 +1,202 @@
+import bpy
+import hashlib
+import numpy as np
+from mathutils.bvhtree import BVHTree
+
+# Collision proxies: decimated copies of (high resolution) GEOMETRY meshes, for fast ROM and intersection checks.
+# A proxy is a separate mesh object, parented to its source mesh with an identity transform so it always moves with it.
+# The source stores the proxy name in its 'collision_proxy' custom property, and check_bvh_intersection (and the pose sampling
+# geometry export) use the proxy instead of the source whenever it exists, see two_object_intersection_func.collision_object.
+# The accuracy trade-off (triangle ratio and Hausdorff distance to the source) is stored as custom properties of the proxy.
+# No relative imports, so the utility scripts can import this file after appending the scripts folder to sys.path.
+
+proxy_collection_name = 'Collision proxies'
+
+
+def world_mesh_arrays(mesh, matrix_world):
+
+    #vertices (global coordinates) and triangles of a mesh datablock
+
+    mesh.calc_loop_triangles()
+
+    vertices = np.empty(len(mesh.vertices) * 3, dtype = np.float32)
+    mesh.vertices.foreach_get('co', vertices)
+
+    triangles = np.empty(len(mesh.loop_triangles) * 3, dtype = np.int32)
+    mesh.loop_triangles.foreach_get('vertices', triangles)
+
+    wm = np.array(matrix_world)
+    vertices = vertices.reshape(-1, 3).astype(np.float64) @ wm[:3, :3].T + wm[:3, 3]
+
+    return vertices, triangles.reshape(-1, 3)
+
+
+def decimated_mesh(source_obj, ratio, name):
+
+    #new mesh datablock with the source mesh decimated (quadric edge collapse, Blender's Decimate modifier) to 'ratio' of its faces
+
+    tmp_obj = bpy.data.objects.new(name + '_tmp', source_obj.data)
+    bpy.context.scene.collection.objects.link(tmp_obj)
+
+    modifier = tmp_obj.modifiers.new(name = 'Decimate', type = 'DECIMATE')
+    modifier.decimate_type = 'COLLAPSE'
+    modifier.ratio = ratio
+    modifier.use_collapse_triangulate = True
+
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    depsgraph.update()
+
+    mesh = bpy.data.meshes.new_from_object(tmp_obj.evaluated_get(depsgraph))
+    mesh.name = name
+
+    bpy.data.objects.remove(tmp_obj)
+
+    return mesh
+
+
+def inflate_mesh(mesh, distance, matrix_world):
+
+    #moves every vertex outward along its normal by 'distance' (meters, measured in global coordinates), so the proxy conservatively contains the source surface
+
+    if distance == 0:
+        return
+
+    co = np.empty(len(mesh.vertices) * 3, dtype = np.float32)
+    normals = np.empty(len(mesh.vertices) * 3, dtype = np.float32)
+    mesh.vertices.foreach_get('co', co)
+    mesh.vertices.foreach_get('normal', normals)
+
+    wm_inv = np.linalg.inv(np.array(matrix_world)[:3, :3]) #local directions to global normals: n @ wm_inv, global vectors to local: v @ wm_inv.T
+
+    normals = normals.reshape(-1, 3) @ wm_inv
+    normals /= np.maximum(np.linalg.norm(normals, axis = 1, keepdims = True), 1e-12)
+
+    mesh.vertices.foreach_set('co', co + ((normals * distance) @ wm_inv.T).astype(np.float32).reshape(-1))
+    mesh.update()
+
+
+def mesh_hash(mesh):
+
+    #hash of the vertex coordinates, to detect edits that don't change the topology (sculpting, alignment)
+
+    co = np.empty(len(mesh.vertices) * 3, dtype = np.float32)
+    mesh.vertices.foreach_get('co', co)
+
+    return hashlib.sha1(co.tobytes()).hexdigest()
+
+
+def hausdorff_distance(vertices_1, triangles_1, vertices_2, triangles_2, max_samples = 20000, random_seed = 0):
+
+    '''
+    Estimated symmetric Hausdorff distance between two triangle meshes (global coordinates).
+    The vertices of each mesh (randomly subsampled to max_samples) are projected onto the other mesh.
+    '''
+
+    rng = np.random.default_rng(random_seed)
+    distance = 0.0
+
+    for query, (vertices, triangles) in [(vertices_1, (vertices_2, triangles_2)), (vertices_2, (vertices_1, triangles_1))]:
+        if not len(triangles) or not len(query):
+            continue
+
+        bvh = BVHTree.FromPolygons(vertices.tolist(), triangles.tolist())
+        if len(query) > max_samples:
+            query = query[rng.choice(len(query), max_samples, replace = False)]
+
+        for co in query:
+            location, normal, index, d = bvh.find_nearest(co)
+            if location is not None and d > distance:
+                distance = d
+
+    return distance
+
+
+def get_proxy_collection():
+
+    collection = bpy.data.collections.get(proxy_collection_name)
+    if collection is None:
+        collection = bpy.data.collections.new(proxy_collection_name)
+        bpy.context.scene.collection.children.link(collection)
+
+    return collection
+
+
+def create_collision_proxy(source_obj, target_triangles = 5000, max_hausdorff = 0.0, inflation = 0.0):
+
+    '''
+    Creates (or updates) the collision proxy of a mesh.
+
+    Inputs:
+    - source_obj: the mesh object (typically a MuSkeMo GEOMETRY)
+    - target_triangles (int). Number of triangles of the proxy.
+    - max_hausdorff (float, meters). If larger than 0, the triangle count is doubled until the estimated Hausdorff distance to the source is below this tolerance.
+    - inflation (float, meters). Conservative offset of the proxy surface along the vertex normals.
+
+    Output: the proxy object. A cached proxy that was made with the same settings from the same source mesh (same vertex coordinates) is reused.
+    '''
+
+    source_obj.data.calc_loop_triangles()
+    n_source_triangles = len(source_obj.data.loop_triangles)
+    settings = [target_triangles, max_hausdorff, inflation, n_source_triangles, len(source_obj.data.vertices)]
+    source_hash = mesh_hash(source_obj.data)
+
+    proxy = bpy.data.objects.get(source_obj.get('collision_proxy', ''))
+    if (proxy is not None and list(proxy.get('collision_proxy_settings', [])) == settings
+            and proxy.get('collision_proxy_source_hash') == source_hash):
+        return proxy
+
+    proxy_name = source_obj.name + '_collision_proxy'
+    source_vertices, source_triangles = world_mesh_arrays(source_obj.data, source_obj.matrix_world)
+
+    n_triangles = target_triangles
+    while True:
+        ratio = min(1.0, n_triangles / max(n_source_triangles, 1))
+        mesh = decimated_mesh(source_obj, ratio, proxy_name)
+        inflate_mesh(mesh, inflation, source_obj.matrix_world)
+
+        proxy_vertices, proxy_triangles = world_mesh_arrays(mesh, source_obj.matrix_world)
+        hausdorff = hausdorff_distance(source_vertices, source_triangles, proxy_vertices, proxy_triangles)
+
+        if max_hausdorff <= 0 or hausdorff <= max_hausdorff or ratio >= 1:
+            break
+
+        bpy.data.meshes.remove(mesh)
+        n_triangles *= 2
+
+    if proxy is None:
+        proxy = bpy.data.objects.new(proxy_name, mesh)
+        get_proxy_collection().objects.link(proxy)
+    else:
+        old_mesh = proxy.data
+        proxy.data = mesh
+        if old_mesh.users == 0:
+            bpy.data.meshes.remove(old_mesh)
+
+    #move along with the source
+    proxy.parent = source_obj
+    proxy.matrix_parent_inverse.identity()
+    proxy.matrix_basis.identity()
+    proxy.display_type = 'WIRE'
+    proxy.hide_render = True
+
+    proxy['collision_proxy_source'] = source_obj.name
+    proxy['collision_proxy_settings'] = settings
+    proxy['collision_proxy_source_hash'] = source_hash
+    proxy['collision_proxy_triangle_ratio'] = len(proxy_triangles) / max(n_source_triangles, 1)
+    proxy['collision_proxy_hausdorff_distance'] = hausdorff
+    source_obj['collision_proxy'] = proxy.name
+
+    return proxy
+
+
+def remove_collision_proxy(source_obj):
+
+    proxy = bpy.data.objects.get(source_obj.get('collision_proxy', ''))
+    if proxy is not None:
+        mesh = proxy.data
+        bpy.data.objects.remove(proxy)
+        if mesh.users == 0:
+            bpy.data.meshes.remove(mesh)
+
+    if 'collision_proxy' in source_obj:
+        del source_obj['collision_proxy']
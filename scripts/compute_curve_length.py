@@ -25,4 +25,19 @@ def compute_curve_length(curve_name, depsgraph):
     length = obj_ev_mesh.attributes['length'].data[0].value
     obj_ev.to_mesh_clear()
             
-    return length
\ No newline at end of file
+    return length
+
+def compute_curve_lengths(curve_names, depsgraph):
+
+    #same as compute_curve_length, for multiple curves with a single depsgraph update. Returns a list of lengths
+
+    depsgraph.update()
+
+    lengths = []
+    for curve_name in curve_names:
+        obj_ev = bpy.data.objects[curve_name].evaluated_get(depsgraph)
+        obj_ev_mesh = obj_ev.to_mesh()
+        lengths.append(obj_ev_mesh.attributes['length'].data[0].value)
+        obj_ev.to_mesh_clear()
+
+    return lengths
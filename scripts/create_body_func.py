@@ -60,29 +60,12 @@ def create_body(name, size, self,
     
     '''
     
-      
-    #check if the collection name exists, and if not create it
-    if collection_name not in bpy.data.collections:
-        bpy.data.collections.new(collection_name)
-
-        #If the collection didn't even exist yet, we're probably starting from scratch. Turn off the object children filter to help the user.
-        bpy.ops.muskemo.set_child_visibility_outliner()
-        
-    coll = bpy.data.collections[collection_name] #Collection which will recieve the scaled  hulls
-
-    if collection_name not in bpy.context.scene.collection.children:       #if the collection is not yet in the scene
-        bpy.context.scene.collection.children.link(coll)     #add it to the scene
-    
-    #Make sure the "bodies" collection is active
-    bpy.context.view_layer.active_layer_collection = bpy.context.view_layer.layer_collection.children[collection_name]
-
+    from .create_datablocks_func import (get_collection, create_empty)
 
+    #If the collection didn't even exist yet, we're probably starting from scratch, and the object children filter in the outliner is turned off to help the user.
+    coll = get_collection(collection_name, hide_object_children = True) #Collection which will recieve the bodies
 
-    bpy.ops.object.empty_add(type='ARROWS', radius=size, align='WORLD',location = (0,0,0))
-    bpy.context.object.name  = name #set the name
-        
-    
-    obj = bpy.data.objects[name] 
+    obj = create_empty(name, coll, size = size)
     
     
     obj.rotation_mode = 'ZYX'    #change rotation sequence
@@ -135,8 +118,6 @@ def create_body(name, size, self,
         print('local body creation not implemented yet')
         ### get frame location and set obj location wrt frame
 
-    bpy.ops.object.select_all(action='DESELECT')    
-
     
 
     #### geometry import
@@ -159,18 +140,7 @@ def create_body(name, size, self,
         geometry_collection_name = bpy.context.scene.muskemo.geometry_collection 
 
 
-    #check if the collection name exists, and if not create it
-    if geometry_collection_name not in bpy.data.collections:
-        bpy.data.collections.new(geometry_collection_name)
-        
-
-    coll = bpy.data.collections[geometry_collection_name] #Collection which will recieve the scaled  hulls
-
-    if geometry_collection_name not in bpy.context.scene.collection.children:       #if the collection is not yet in the scene
-        bpy.context.scene.collection.children.link(coll)     #add it to the scene
-    
-    #Make sure the geom collection is active
-    bpy.context.view_layer.active_layer_collection = bpy.context.view_layer.layer_collection.children[geometry_collection_name]
+    geom_coll = get_collection(geometry_collection_name) #Collection which will recieve the geometries
     
     
 
@@ -188,50 +158,15 @@ def create_body(name, size, self,
 
         #    continue
         
-        if filepath.endswith('.obj'): #if the file exists, and it is an obj file
-
-            if bpy.app.version[0] <4: #if blender version is below 4
-                bpy.ops.import_scene.obj(filepath= filepath, axis_forward = 'Y', axis_up = 'Z', use_image_search = False)
-                    
-            else: #if blender version is above 4:    
-                bpy.ops.wm.obj_import(filepath= filepath, forward_axis = 'Y', up_axis = 'Z' ,
-                                    use_split_objects = False,)
-
-
-        
-            # Include the extension in the newly created object's name, to prevent potential naming conflicts
-            file_name_with_extension = os.path.basename(path)  # e.g. 'Humerus.001.obj'
-            #mesh_name, extension = os.path.splitext(file_name_with_extension)  # e.g. 'Humerus.001', '.obj'    
-            bpy.context.selected_objects[0].name =  file_name_with_extension            
-            bpy.ops.object.select_all(action='DESELECT')
-            
-            geom_obj = bpy.data.objects[file_name_with_extension]
+        if filepath.lower().endswith(('.obj', '.vtp', '.stl', '.ply')): #parsed with NumPy (possibly preloaded by the model importer, see import_geometry_func.py)
+            from .import_geometry_func import load_geometry_as_mesh
 
-        elif filepath.endswith('.vtp'):
-            from .import_vtp import load_vtp_as_mesh
-            geom_obj = load_vtp_as_mesh(filepath)
-
-
-        elif filepath.endswith('.stl'):
-
-            if bpy.app.version[0] <4: #if blender version is below 4
-
-                bpy.ops.import_mesh.stl(filepath=filepath, axis_forward='Y', axis_up='Z')
-            
-            else: #if blender version is above 4:    
-                bpy.ops.wm.stl_import(filepath= filepath, forward_axis = 'Y', up_axis = 'Z' ,)
-
-            # Include the extension in the newly created object's name, to prevent potential naming conflicts
-            file_name_with_extension = os.path.basename(path)  # e.g. 'Humerus.001.obj'
-            #mesh_name, extension = os.path.splitext(file_name_with_extension)  # e.g. 'Humerus.001', '.obj'    
-            bpy.context.selected_objects[0].name =  file_name_with_extension            
-            bpy.ops.object.select_all(action='DESELECT')
-            
-            geom_obj = bpy.data.objects[file_name_with_extension]    
+            # The object name includes the extension, to prevent potential naming conflicts. e.g. 'Humerus.001.obj'
+            geom_obj = load_geometry_as_mesh(filepath, geom_coll)
 
-        else: #if it's not an obj, vtp, or stl
+        else: #if it's not an obj, vtp, stl or ply
 
-            self.report({'WARNING'}, "Only obj, stl, or vtp formats are supported for geometry import. Geometry '" + path + "' skipped")
+            self.report({'WARNING'}, "Only obj, stl, ply, or vtp formats are supported for geometry import. Geometry '" + path + "' skipped")
             continue  
         
         geom_obj.rotation_mode = 'ZYX'  
@@ -1,7 +1,5 @@
 import bpy
 from math import nan
-import bmesh
-from mathutils import Matrix
 
 def create_contact(name, radius, collection_name,
                     pos_in_global = [nan]*3,
@@ -9,39 +7,14 @@ def create_contact(name, radius, collection_name,
                  parent_body = 'not_assigned', pos_in_parent_frame = [nan]*3):
     
 
-    #check if the collection name exists, and if not create it
-    if collection_name not in bpy.data.collections:
-        bpy.data.collections.new(collection_name)
-        
-    coll = bpy.data.collections[collection_name] #Collection which will recieve the scaled contacts
-
-    if collection_name not in bpy.context.scene.collection.children:       #if the collection is not yet in the scene
-        bpy.context.scene.collection.children.link(coll)     #add it to the scene
-    
-    #Make sure the "contacts" collection is active
-    bpy.context.view_layer.active_layer_collection = bpy.context.view_layer.layer_collection.children[collection_name]
+    from .create_datablocks_func import (get_collection, create_mesh_object, create_icosphere_mesh)
 
+    coll = get_collection(collection_name) #Collection which will recieve the contacts, created if it doesn't exist yet
 
-    
     ########### create contact
-    mesh = bpy.data.meshes.new(name)
-    bm = bmesh.new()
-
-    bmesh.ops.create_icosphere(
-        bm,
-        subdivisions=3,
-        radius=radius,
-        matrix=Matrix.Identity(4)
-    )
-
-    bm.to_mesh(mesh)
-    bm.free()
-
-    obj = bpy.data.objects.new(name, mesh)
+    obj = create_mesh_object(name, create_icosphere_mesh(name, radius = radius, subdivisions = 3), coll)
     obj.location = pos_in_global
 
-    coll.objects.link(obj) #link to correct collection
-
     #####
     obj.rotation_mode = 'ZYX'    #change rotation sequence
 
@@ -54,8 +27,6 @@ def create_contact(name, radius, collection_name,
     obj['pos_in_parent_frame'] = pos_in_parent_frame
     obj.id_properties_ui('pos_in_parent_frame').update(description = 'Contact sphere position in the parent body anatomical (local) reference frame (x, y, z, in meters). Optional.')
 
-    bpy.ops.object.select_all(action='DESELECT') 
-
     if is_global: #if we're constructing in global coordinates
         if pos_in_global != [nan]*3: #if the specified position is not [nan, nan, nan]
             obj.matrix_world.translation = pos_in_global
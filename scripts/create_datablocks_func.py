@@ -0,0 +1,104 @@
+import bpy
+import bmesh
+from mathutils import Matrix
+
+# Low-level creation layer for the create_* functions (bodies, joints, frames, muscles, wrapping geometry, contacts, landmarks).
+# Objects, meshes and collections are created directly in bpy.data, instead of with bpy.ops operators. Operator calls update
+# the view layer and depend on the active object, the active collection and the selection, which makes them slow when
+# a model with hundreds of components is imported, and unusable from timers or background scripts.
+# The created objects are linked to the collection that is passed, and are not selected or made active.
+
+
+def set_outliner_child_visibility():
+
+    #Toggle the object children filter off in all outliners, so that the parented model components remain visible in their own collections
+    for screen in bpy.data.screens:
+        for area in screen.areas:
+            if area.type == 'OUTLINER':
+                for space in area.spaces:
+                    if space.type == 'OUTLINER':
+                        space.use_filter_children = False
+
+
+def get_collection(collection_name, hide_object_children = False):
+
+    '''
+    Returns the collection, and creates it and links it to the scene if necessary.
+    hide_object_children (bool): If the collection didn't even exist yet, we're probably starting from scratch. Turn off the object children filter in the outliner to help the user.
+    '''
+
+    coll = bpy.data.collections.get(collection_name)
+
+    if coll is None:
+        coll = bpy.data.collections.new(collection_name)
+
+        if hide_object_children:
+            set_outliner_child_visibility()
+
+    if collection_name not in bpy.context.scene.collection.children: #if the collection is not yet in the scene
+        bpy.context.scene.collection.children.link(coll)
+
+    return coll
+
+
+def create_empty(name, collection, size = 1.0, display_type = 'ARROWS'):
+
+    obj = bpy.data.objects.new(name, None)
+    obj.empty_display_type = display_type
+    obj.empty_display_size = size
+
+    collection.objects.link(obj)
+
+    return obj
+
+
+def create_mesh_object(name, mesh, collection):
+
+    obj = bpy.data.objects.new(name, mesh)
+    collection.objects.link(obj)
+
+    return obj
+
+
+def create_icosphere_mesh(name, radius = 1.0, subdivisions = 2, scale = (1.0, 1.0, 1.0)):
+
+    #scale (3 floats): bakes a scale into the vertices, e.g. for ellipsoids
+
+    mesh = bpy.data.meshes.new(name)
+    bm = bmesh.new()
+
+    bmesh.ops.create_icosphere(
+        bm,
+        subdivisions = subdivisions,
+        radius = radius,
+        matrix = Matrix.Diagonal(scale).to_4x4()
+    )
+
+    bm.to_mesh(mesh)
+    bm.free()
+
+    return mesh
+
+
+def create_cylinder_mesh(name, radius = 1.0, depth = 1.0, segments = 32):
+
+    #cylinder along the local z-axis, centered on the origin (same as bpy.ops.mesh.primitive_cylinder_add)
+
+    mesh = bpy.data.meshes.new(name)
+    bm = bmesh.new()
+
+    bmesh.ops.create_cone(
+        bm,
+        cap_ends = True,
+        cap_tris = False,
+        segments = segments,
+        radius1 = radius,
+        radius2 = radius,
+        depth = depth,
+        matrix = Matrix.Identity(4)
+    )
+
+    bm.to_mesh(mesh)
+    bm.free()
+
+    return mesh
@@ -19,17 +19,9 @@ def create_frame(name, size,
     collection_name (string, optional. Name of the collection where the frames will be stored)
     parent_body = name of the parent body. Optional, to be filled in when importing models
     '''
-    #check if the collection name exists, and if not create it
-    if collection_name not in bpy.data.collections:
-        bpy.data.collections.new(collection_name)
-        
-    coll = bpy.data.collections[collection_name] #Collection which will recieve the frames
+    from .create_datablocks_func import (get_collection, create_empty)
 
-    if collection_name not in bpy.context.scene.collection.children:       #if the collection is not yet in the scene
-        bpy.context.scene.collection.children.link(coll)     #add it to the scene
-    
-    #Make sure the collection is active
-    bpy.context.view_layer.active_layer_collection = bpy.context.view_layer.layer_collection.children[collection_name]
+    coll = get_collection(collection_name) #Collection which will recieve the frames, created if it doesn't exist yet
 
 
     worldMat = Matrix(gRb).to_4x4() #matrix_world in blender is a 4x4 transformation matrix, with the first three columns and rows representing the orientation, last column the location, and bottom right diagonal 1
@@ -39,10 +31,7 @@ def create_frame(name, size,
         worldMat[i][3] = pos_in_global[i]  #set the fourth column as the location
 
 
-    bpy.ops.object.empty_add(type='ARROWS', radius=size, align='WORLD')
-    bpy.context.object.name = name #set the name
-    #bpy.context.object.data.name = name #set the name of the object data
-    obj = bpy.data.objects[name]
+    obj = create_empty(name, coll, size = size)
     obj.rotation_mode = 'ZYX'    #change rotation sequence
 
     #
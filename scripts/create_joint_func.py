@@ -1,6 +1,4 @@
 import bpy
-import bmesh
-from mathutils import Matrix
 from math import nan
 #from .euler_XYZ_body import euler_XYZbody_from_matrix
 from .quaternions import matrix_from_quaternion
@@ -49,39 +47,13 @@ def create_joint(name, radius, is_global = True, collection_name = 'Joint center
     
     """
 
-    #check if the collection name exists, and if not create it
-    if collection_name not in bpy.data.collections:
-        bpy.data.collections.new(collection_name)
-        #If the collection didn't even exist yet, we're probably starting from scratch. Turn off the object children filter to help the user.
-        bpy.ops.muskemo.set_child_visibility_outliner()
+    from .create_datablocks_func import (get_collection, create_mesh_object, create_icosphere_mesh)
 
-        
-    coll = bpy.data.collections[collection_name] #Collection which will recieve the joints
+    #If the collection didn't even exist yet, we're probably starting from scratch, and the object children filter in the outliner is turned off to help the user.
+    coll = get_collection(collection_name, hide_object_children = True) #Collection which will recieve the joints
 
-    if collection_name not in bpy.context.scene.collection.children:       #if the collection is not yet in the scene
-        bpy.context.scene.collection.children.link(coll)     #add it to the scene
-    
-    #Make sure the "joints" collection is active
-    bpy.context.view_layer.active_layer_collection = bpy.context.view_layer.layer_collection.children[collection_name]
-    
     # Create a sphere and set the name
-    mesh = bpy.data.meshes.new(name)
-    bm = bmesh.new()
-
-    bmesh.ops.create_icosphere(
-        bm,
-        subdivisions=3,
-        radius=radius,
-        matrix=Matrix.Identity(4)
-    )
-
-    bm.to_mesh(mesh)
-    bm.free()
-
-    obj = bpy.data.objects.new(name, mesh)
-    
-
-    coll.objects.link(obj) #link to correct collection
+    obj = create_mesh_object(name, create_icosphere_mesh(name, radius = radius, subdivisions = 3), coll)
 
     #####
     
@@ -239,6 +211,3 @@ def create_joint(name, radius, is_global = True, collection_name = 'Joint center
     ### viewport display color
 
     obj.active_material.diffuse_color = (color[0], color[1], color[2], transparency)
-
-    
-    bpy.ops.object.select_all(action='DESELECT')
\ No newline at end of file
@@ -1,7 +1,5 @@
 import bpy
-import bmesh
 from math import nan
-from mathutils import Matrix
 
 def create_landmark(landmark_name, landmark_radius, collection_name,
                     pos_in_global = [nan]*3,
@@ -12,45 +10,19 @@ def create_landmark(landmark_name, landmark_radius, collection_name,
     muskemo = bpy.context.scene.muskemo
 
 
-    if collection_name not in bpy.data.collections:
-        bpy.data.collections.new(collection_name)
-        
-    coll = bpy.data.collections[collection_name] #Collection which will recieve the landmarks
+    from .create_datablocks_func import (get_collection, create_mesh_object, create_icosphere_mesh)
 
-    if collection_name not in bpy.context.scene.collection.children:       #if the collection is not yet in the scene
-        bpy.context.scene.collection.children.link(coll)     #add it to the scene
+    coll = get_collection(collection_name) #Collection which will recieve the landmarks, created if it doesn't exist yet
         
    ## Create landmark 
-    mesh = bpy.data.meshes.new(landmark_name)
-    bm = bmesh.new()
-
-    bmesh.ops.create_icosphere(
-        bm,
-        subdivisions=2,
-        radius=landmark_radius,
-        matrix=Matrix.Identity(4)
-    )
-
-    bm.to_mesh(mesh)
-    bm.free()
-
-    obj = bpy.data.objects.new(landmark_name, mesh)
+    obj = create_mesh_object(landmark_name, create_icosphere_mesh(landmark_name, radius = landmark_radius, subdivisions = 2), coll)
     obj.location = pos_in_global
 
-    
-    coll.objects.link(obj)
-
-    obj.name = landmark_name
-    obj.data.name = landmark_name
-
     obj['MuSkeMo_type'] = 'LANDMARK'
     obj.id_properties_ui('MuSkeMo_type').update(
         description="The object type. Warning: don't modify this!"
     )
 
-    bpy.ops.object.select_all(action='DESELECT')
-
-    obj = bpy.data.objects[landmark_name]
     obj.rotation_mode = 'ZYX'    #change rotation sequence
 
     parent_body_obj = bpy.data.objects[parent_body]
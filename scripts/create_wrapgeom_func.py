@@ -14,18 +14,9 @@ def create_wrapgeom(name, geomtype, collection_name,
     
     from .quaternions import matrix_from_quaternion
     from .euler_XYZ_body import matrix_from_euler_XYZbody
+    from .create_datablocks_func import (get_collection, create_mesh_object, create_cylinder_mesh, create_icosphere_mesh)
 
-    #check if the collection name exists, and if not create it
-    if collection_name not in bpy.data.collections:
-        bpy.data.collections.new(collection_name)
-        
-    coll = bpy.data.collections[collection_name] #Collection which will recieve the scaled contacts
-
-    if collection_name not in bpy.context.scene.collection.children:       #if the collection is not yet in the scene
-        bpy.context.scene.collection.children.link(coll)     #add it to the scene
-    
-    #Make sure the correct collection is active
-    bpy.context.view_layer.active_layer_collection = bpy.context.view_layer.layer_collection.children[collection_name]
+    coll = get_collection(collection_name) #Collection which will recieve the wrap geometry, created if it doesn't exist yet
 
     ## check if material exists and if not, create it
     matname = 'wrap_geom_material'
@@ -42,7 +33,6 @@ def create_wrapgeom(name, geomtype, collection_name,
 
 
     if geomtype == 'Cylinder':
-        # Create a cylinder using bpy.ops
 
         if dimensions: #if the user specified dimensions
             radius = dimensions['radius']
@@ -52,11 +42,7 @@ def create_wrapgeom(name, geomtype, collection_name,
             radius = 1.0
             height = 1.0
 
-        bpy.ops.mesh.primitive_cylinder_add(
-            radius=radius, 
-            depth=height, 
-            
-        )   
+        mesh = create_cylinder_mesh(name, radius = radius, depth = height)
 
 
     elif geomtype == 'Sphere':
@@ -67,9 +53,7 @@ def create_wrapgeom(name, geomtype, collection_name,
         else: #otherwise just set default values
             radius = 1.0
 
-        bpy.ops.mesh.primitive_ico_sphere_add(
-            radius=radius,   
-        )   
+        mesh = create_icosphere_mesh(name, radius = radius)
 
     elif geomtype == 'Ellipsoid':
         if dimensions: #if the user specified dimensions
@@ -83,23 +67,11 @@ def create_wrapgeom(name, geomtype, collection_name,
             radius_z = 0.1
 
 
-        bpy.ops.mesh.primitive_ico_sphere_add(
-            radius=1, scale = (radius_x, radius_y, radius_z)
-        )  
-
+        #this bakes the underlying mesh as an ellipsoid, but we're going to overwrite it with a geometry nodes parametric object anyway
+        mesh = create_icosphere_mesh(name, radius = 1, scale = (radius_x, radius_y, radius_z))
 
 
-    bpy.context.object.name = name #set the name
-    bpy.context.object.data.name = name #set the name of the object data
-    obj = bpy.data.objects[name]
-
-    if geomtype == 'Ellipsoid': #this bakes the underlying object as an ellipsoid, but we're going to overwrite it with a geometry nodes parametric object anyway
-        
-        bpy.context.view_layer.objects.active = obj
-        obj.select_set(True)
-
-        bpy.ops.object.transform_apply(location=False, rotation=False,scale=True)
-        obj.select_set(False )
+    obj = create_mesh_object(name, mesh, coll)
 
     #Node tree name, if it exists get it, otherwise create it anew.
 
@@ -400,8 +372,6 @@ def create_wrapgeom(name, geomtype, collection_name,
     obj['target_muscles'] = 'not_assigned'
     obj.id_properties_ui('target_muscles').update(description='Muscles that are affected by this wrapping object. Delimited by ";"')
 
-    bpy.ops.object.select_all(action='DESELECT') 
-
 
     if or_in_global_quat !=[nan]*4:  #if a global orientation is supplied as a quaternion
         [gRb, bRg] = matrix_from_quaternion(or_in_global_quat)
@@ -18,6 +18,20 @@ def euler_XYZbody_from_matrix(mat):
     return(euler_xyz)
 
 
+def euler_XYZbody_from_matrices(mats):
+    #Batched version of euler_XYZbody_from_matrix, using NumPy
+    #input: (n x 3 x 3) array of rotation matrices gRb
+    #output: (n x 3) array of euler angles (phi_x, phi_y, phi_z), same convention as euler_XYZbody_from_matrix
+
+    mats = np.asarray(mats, dtype = float).reshape(-1, 3, 3)
+
+    phi_y = np.arcsin(np.clip(mats[:, 0, 2], -1, 1))
+    phi_x = np.arctan2(-mats[:, 1, 2], mats[:, 2, 2])
+    phi_z = np.arctan2(-mats[:, 0, 1], mats[:, 0, 0])
+
+    return np.column_stack([phi_x, phi_y, phi_z])
+
+
 def matrix_from_euler_XYZbody(angles_xyz):
     #inputs: list of euler angles (phi_x, phi_y, phi_z)
     #outputs: 3x3 rotation matrix of type mathutils.Matrix, outputs both gRb (from body to global) and bRg (from global to body)
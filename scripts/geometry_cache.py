@@ -0,0 +1,171 @@
+import numpy as np
+import hashlib
+import json
+import os
+import re
+import tempfile
+
+# On-disk cache of parsed geometry files (see mesh_file_readers.py), for models that are imported many times.
+# Each parsed file is stored as three .npy files (vertices, connectivity, offsets), named after the blake2b hash of the file contents,
+# so identical files in different folders share one entry. A small .json stub per source file (named after the hash of its path,
+# size and modification time) points to the content hash, so unchanged files don't have to be read and hashed again.
+# Cache hits are loaded memory-mapped. The cache is bounded in size: the least recently used entries are evicted first
+# (the modification time of an entry's files is updated on every hit).
+# This file doesn't import bpy and doesn't use relative imports, so it can also be used from worker threads and the utility scripts.
+
+geometry_array_names = ['vertices', 'connectivity', 'offsets']
+
+# The cache directory is set by the user, and can contain other files. evict and clear only remove files with the cache's own names
+# (a 40 character blake2b hash, followed by an array name and .npy, or by .json), and their partially written .tmp versions.
+# The .tmp files get a unique name (see _write_file), because the worker threads can write entries with the same content hash at the same time.
+_array_file_pattern = re.compile(r'^([0-9a-f]{40})\.(?:' + '|'.join(geometry_array_names) + r')\.npy$')
+_cache_file_pattern = re.compile(r'^[0-9a-f]{40}\.(?:(?:' + '|'.join(geometry_array_names) + r')\.npy|json)(?:\.\w+\.tmp)?$')
+
+
+def default_cache_directory():
+
+    return os.path.join(tempfile.gettempdir(), 'MuSkeMo_geometry_cache')
+
+
+def _hash(data):
+
+    return hashlib.blake2b(data, digest_size = 20).hexdigest()
+
+
+def file_content_hash(filepath, chunk_size = 1 << 20):
+
+    hasher = hashlib.blake2b(digest_size = 20)
+    with open(filepath, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            hasher.update(chunk)
+
+    return hasher.hexdigest()
+
+
+class GeometryCache:
+
+    def __init__(self, directory = '', max_megabytes = 1024):
+
+        self.directory = directory or default_cache_directory()
+        self.max_bytes = int(max_megabytes * 1024**2)
+        os.makedirs(self.directory, exist_ok = True)
+
+    def _stub_path(self, filepath):
+
+        stat = os.stat(filepath)
+        key = _hash(f'{os.path.abspath(filepath)}|{stat.st_size}|{stat.st_mtime_ns}'.encode())
+        return os.path.join(self.directory, key + '.json')
+
+    def _array_paths(self, content_hash):
+
+        return [os.path.join(self.directory, content_hash + '.' + name + '.npy') for name in geometry_array_names]
+
+    def _write_file(self, path, write):
+
+        #writes a file through a uniquely named temporary file, so readers never see a partially written file.
+        #write(file) writes the contents to an open binary file
+
+        fd, tmp_path = tempfile.mkstemp(prefix = os.path.basename(path) + '.', suffix = '.tmp', dir = self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                write(file)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            if not os.path.exists(path): #if another thread or process already wrote it (e.g. a file with the same contents), that's a cache hit
+                raise
+
+    def _load(self, content_hash):
+
+        paths = self._array_paths(content_hash)
+        try:
+            arrays = tuple(np.load(path, mmap_mode = 'r') for path in paths)
+        except (OSError, ValueError): #missing (evicted) or partially written entry
+            return None
+
+        for path in paths: #mark as recently used
+            os.utime(path)
+
+        return arrays
+
+    def read(self, filepath, reader):
+
+        '''
+        Returns the parsed arrays of filepath, from the cache if possible. Otherwise, the file is parsed with reader(filepath),
+        and the result is added to the cache.
+        '''
+
+        stub_path = self._stub_path(filepath)
+
+        try:
+            with open(stub_path) as file:
+                content_hash = json.load(file)['content_hash']
+        except (OSError, ValueError, KeyError):
+            content_hash = None
+
+        if content_hash is not None:
+            arrays = self._load(content_hash)
+            if arrays is not None:
+                return arrays
+
+        content_hash = file_content_hash(filepath) #the file changed, or the path is new
+        arrays = self._load(content_hash)
+
+        if arrays is None: #not cached yet, parse the file
+            arrays = reader(filepath)
+            for path, values in zip(self._array_paths(content_hash), arrays):
+                self._write_file(path, lambda file: np.save(file, np.ascontiguousarray(values)))
+
+        stub = json.dumps({'source': os.path.abspath(filepath), 'content_hash': content_hash}).encode()
+        self._write_file(stub_path, lambda file: file.write(stub))
+
+        return arrays
+
+    def evict(self):
+
+        #removes the least recently used entries until the cache is smaller than max_bytes. Returns the number of removed entries
+
+        entries = {} #content hash: [last use time, total size, paths]
+        for entry in os.scandir(self.directory):
+            match = _array_file_pattern.match(entry.name)
+            if match is None: #not a cache entry (or a partially written one)
+                continue
+
+            content_hash = match.group(1)
+            stat = entry.stat()
+            info = entries.setdefault(content_hash, [0, 0, []])
+            info[0] = max(info[0], stat.st_mtime)
+            info[1] += stat.st_size
+            info[2].append(entry.path)
+
+        total = sum(x[1] for x in entries.values())
+        removed = 0
+
+        for last_use, size, paths in sorted(entries.values()): #oldest first
+            if total <= self.max_bytes:
+                break
+
+            for path in paths:
+                try:
+                    os.remove(path)
+                except OSError: #e.g. still memory-mapped on Windows. It will be evicted next time
+                    pass
+
+            total -= size
+            removed += 1
+
+        return removed
+
+    def clear(self):
+
+        #removes all entries and stubs
+
+        for entry in os.scandir(self.directory):
+            if _cache_file_pattern.match(entry.name):
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
@@ -36,16 +36,10 @@ class SetChildVisibilityInOutlinerOperator(Operator):
     
     def execute(self, context):
 
-        
+        from .create_datablocks_func import set_outliner_child_visibility
+
         #Toggle object children filter off in all outliners
-        for screen in bpy.data.screens:
-            # Loop through all the areas in each screen
-            for area in screen.areas:
-                if area.type == 'OUTLINER':  # Check if the area is an Outliner
-                    for space in area.spaces:
-                        if space.type == 'OUTLINER':
-                            # Set 'use_filter_children' to False
-                            space.use_filter_children = False
+        set_outliner_child_visibility()
 
         return {'FINISHED'}    
     
@@ -214,6 +214,12 @@ class ImportGaitsymModel(Operator):
                 import_geometry = False
 
 
+        #parse all geometry files in parallel, before the bodies are created (see import_geometry_func.py)
+        if import_geometry:
+            from .import_geometry_func import (preload_geometry, clear_preloaded_geometry)
+            preload_geometry([geometry_parent_dir + '/' + gaitsym_geo_folder + '/' + body[x]
+                              for body in body_data for x in body if 'GraphicFile' in x and body[x]])
+
         for body in body_data:
             name = body['ID']
             mass = body['Mass']
@@ -259,6 +265,9 @@ class ImportGaitsymModel(Operator):
                             geometry_or_in_glob = geometry_or_in_glob)
             
 
+        if import_geometry:
+            clear_preloaded_geometry() #free the parsed geometry arrays
+
         # Extract joint data from the model
         joint_data = get_joint_data(root)
         
@@ -0,0 +1,98 @@
+import bpy
+from bpy.types import Operator
+import os
+
+from .mesh_file_readers import (read_mesh_file, read_mesh_files, mesh_file_readers)
+from .import_vtp import create_mesh_from_arrays
+
+# Visual geometry import for create_body.
+# The model importers collect the geometry paths of all bodies first, and call preload_geometry, which parses the files
+# into NumPy arrays in a thread pool. create_body then only has to create the mesh datablocks (on the main thread).
+# Files that were not preloaded (or failed to preload) are parsed when the body is created.
+# If the geometry cache is enabled, parsed files are stored on disk, and re-imports load them from there (see geometry_cache.py).
+# Geometry files that are used by several bodies (e.g. left and right sides, or repeated vertebrae) share one mesh datablock
+# within an import. Each body gets its own object, with its own position, orientation and (possibly mirrored) scale.
+# Every importer that creates bodies with geometry calls clear_preloaded_geometry (or preload_geometry) when it starts and
+# when it ends, so that a later import doesn't reuse meshes that were edited or whose file changed in the meantime.
+
+_preloaded_geometry = {} #parsed arrays per normalized filepath
+_shared_meshes = {} #mesh datablock name per normalized filepath, for mesh sharing within an import
+
+
+def get_geometry_cache():
+
+    #returns the geometry cache set up in the MuSkeMo settings, or None if it is disabled
+
+    muskemo = bpy.context.scene.muskemo
+    if not muskemo.use_geometry_cache:
+        return None
+
+    from .geometry_cache import GeometryCache
+
+    try:
+        return GeometryCache(bpy.path.abspath(muskemo.geometry_cache_directory), muskemo.geometry_cache_size)
+    except OSError: #e.g. a read-only directory. Import without the cache
+        return None
+
+
+def preload_geometry(filepaths, n_workers = None):
+
+    #parses the supported geometry files (see mesh_file_readers.py) in parallel. Replaces any previously preloaded geometry
+
+    clear_preloaded_geometry()
+
+    filepaths = [os.path.normpath(x) for x in filepaths if os.path.splitext(x)[1].lower() in mesh_file_readers]
+    cache = get_geometry_cache()
+
+    _preloaded_geometry.update(read_mesh_files([x for x in filepaths if os.path.exists(x)], n_workers, cache))
+
+    if cache is not None:
+        cache.evict()
+
+
+def clear_preloaded_geometry():
+
+    _preloaded_geometry.clear()
+    _shared_meshes.clear()
+
+
+def load_geometry_as_mesh(filepath, collection = None):
+
+    #creates a mesh object from a geometry file (preloaded or not), linked to collection (default is the active collection). The object gets the file name (including the extension)
+    #If the file was already loaded in this import, the object reuses that mesh datablock (unless mesh sharing is disabled in the MuSkeMo settings)
+
+    name = os.path.basename(filepath)
+    key = os.path.normpath(filepath)
+    share_meshes = bpy.context.scene.muskemo.share_geometry_meshes
+
+    mesh = bpy.data.meshes.get(_shared_meshes.get(key, '')) if share_meshes else None
+
+    if mesh is None:
+        arrays = _preloaded_geometry.get(key)
+        if arrays is None:
+            arrays = read_mesh_file(filepath, get_geometry_cache())
+
+        mesh = create_mesh_from_arrays(name, *arrays)
+        _shared_meshes[key] = mesh.name
+
+    obj = bpy.data.objects.new(name, mesh)
+    (collection or bpy.context.collection).objects.link(obj)
+
+    return obj
+
+
+class ClearGeometryCacheOperator(Operator):
+    bl_description = "Delete all parsed geometry files from the geometry cache directory"
+    bl_idname = "import.clear_geometry_cache"
+    bl_label = "Clear the geometry cache"
+
+    def execute(self, context):
+
+        from .geometry_cache import GeometryCache
+
+        muskemo = context.scene.muskemo
+        cache = GeometryCache(bpy.path.abspath(muskemo.geometry_cache_directory), muskemo.geometry_cache_size)
+        cache.clear()
+
+        self.report({'INFO'}, "Cleared the geometry cache in " + cache.directory)
+        return {'FINISHED'}
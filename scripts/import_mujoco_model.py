@@ -213,13 +213,18 @@ class ImportMuJoCoModel(Operator):
 
         from .create_body_func import create_body
         from .create_joint_func import create_joint
-        from .create_muscle_func import create_muscle
+        from .create_muscle_func import create_muscle_from_points
         from .create_frame_func import create_frame
         from .create_contact_func import create_contact
         from .create_wrapgeom_func import create_wrapgeom
 
 
         
+        #parse all geometry files in parallel, before the bodies are created (see import_geometry_func.py)
+        if import_geometry:
+            from .import_geometry_func import (preload_geometry, clear_preloaded_geometry)
+            preload_geometry([geometry_parent_dir + '/' + x['file'] for x in asset_data if x['type'] == 'mesh' and x['file']])
+
         # Stack-based traversal
         stack = [(body_data, 0) for body_data in body_hierarchy]  # Start with top-level bodies
 
@@ -731,6 +736,8 @@ class ImportMuJoCoModel(Operator):
                 #currently unused by MuSkeMo
                 #v_max = actuator['gainprm'][6]
 
+                point_positions = []
+                body_names = []
 
                 for site in tendon['sites']: #again a list of dicts
                     target_sitename = site['site']
@@ -752,18 +759,18 @@ class ImportMuJoCoModel(Operator):
                         #parent_parent_body_name = body_dict['mp_parent_body_name']['parent_body_name'] #
                         #mp_parent_body_name = parent_parent_body_name
 
-                    muscle_point_pos_in_glob = site_data['pos_in_global']
-
+                    point_positions.append(site_data['pos_in_global'])
+                    body_names.append(mp_parent_body_name)
 
-                    create_muscle(muscle_name = muscle_name, 
-                            is_global =True, 
-                            body_name = mp_parent_body_name,
-                            point_position = muscle_point_pos_in_glob,
-                            collection_name=muscle_colname,
-                            optimal_fiber_length=optimal_fiber_length,
-                            tendon_slack_length=tendon_slack_length,
-                            F_max = F_max,
-                            pennation_angle = 0)    
+                #create the muscle with all its points at once
+                create_muscle_from_points(muscle_name = muscle_name,
+                                          point_positions = point_positions,
+                                          body_names = body_names,
+                                          collection_name=muscle_colname,
+                                          optimal_fiber_length=optimal_fiber_length,
+                                          tendon_slack_length=tendon_slack_length,
+                                          F_max = F_max,
+                                          pennation_angle = 0)
 
                     
         if muscle_wrongparented_points: #throw a warning if muscle points were skipped
@@ -826,7 +833,8 @@ class ImportMuJoCoModel(Operator):
             #j2_name = [j for j in joint_names  if driving_coordinate in joint_dict[j]['coordinate_names']][0]
             #j2 = joint_dict[j2_name]
 
-        
+        if import_geometry:
+            clear_preloaded_geometry() #free the parsed geometry arrays
 
         return {'FINISHED'}
 
@@ -6,7 +6,6 @@ from bpy.types import (Operator,
 from bpy.props import (StringProperty,   #it appears to matter whether you import these from types or from props
                        BoolProperty)
 
-import xml.etree.ElementTree as ET
 from math import nan
 import numpy as np
 import os
@@ -14,7 +13,6 @@ import pprint
 
 import time
 
-from collections import defaultdict #for the uniqueness checker
 
 class ImportOpenSimModel(Operator):
     bl_description = "Import an OpenSim 4.0+ model"
@@ -47,601 +45,40 @@ class ImportOpenSimModel(Operator):
         
         filepath = self.filepath
 
-        with open(filepath, 'r', encoding='utf-8') as f:
-            xml_data = f.read()
-
-        if 'HuntCrossleyForce' in xml_data:
-
-            # OpenSim filespec allows :: in the tag names, which isn't allowed by the standard xml filespec.
-            # Those tags need to be replaced. For now, this is only relevant for HuntCrossleyForce.
-            # Only replace tags if HuntCrossley is present
-            # Sanitize only if HuntCrossleyForce is present
-            xml_data = xml_data.replace('HuntCrossleyForce::ContactParametersSet', 'HuntCrossleyForce_ContactParametersSet')
-            xml_data = xml_data.replace('HuntCrossleyForce::ContactParameters', 'HuntCrossleyForce_ContactParameters')
-            tree = ET.ElementTree(ET.fromstring(xml_data))
-        else:
-            # Fast path for clean XML
-            tree = ET.parse(filepath)
-
-        root = tree.getroot()
-        model = root.find('Model')
-
+        # Read the model in a single streaming pass (see opensim_model_reader.py)
+        from .opensim_model_reader import read_opensim_model
         
-        time1 = time.time()        
-    
+        time1 = time.time()
+
+        model_data = read_opensim_model(filepath)
 
         from .quaternions import (matrix_from_quaternion, quat_from_matrix)
         from .euler_XYZ_body import (matrix_from_euler_XYZbody, euler_XYZbody_from_matrix)
-    
-        def get_body_data(model):
-            body_set = model.find('BodySet')
-            bodies = body_set.find('objects')
-
-            body_data = {}
-            for body in bodies.findall('Body'):
-                name = body.get('name')
-                mass = float(body.find('mass').text)
-
-                # Check if mass_center exists
-                mass_center_element = body.find('mass_center')
-                if mass_center_element is not None:
-                    mass_center = tuple(map(float, mass_center_element.text.split()))
-                else:
-                    mass_center = (0, 0, 0)
 
-                # Check if inertia exists
-                inertia_element = body.find('inertia')
-                if inertia_element is not None:
-                    inertia = tuple(map(float, inertia_element.text.split()))
-                else:
-                    inertia = None  # Or another default value if inertia is absent
-
-                geometries = []
-
-                # First, try to find PhysicalOffsetFrames, if they exist
-                components = body.find('components')
-                if components is not None:
-                    offset_frames = components.findall('PhysicalOffsetFrame')
-                    for offset_frame in offset_frames:
-                        attached_geometry = offset_frame.find('attached_geometry')
-                        if attached_geometry is not None:
-                            for mesh in attached_geometry.findall('Mesh'):
-                                mesh_file = mesh.find('mesh_file').text.strip()
-                                translation = offset_frame.find('translation').text
-                                orientation = offset_frame.find('orientation').text
-
-                                # Check for scale_factors
-                                scale_elem = mesh.find('scale_factors')
-                                if scale_elem is not None:
-                                    scale_factors = list(map(float, scale_elem.text.strip().split()))
-                                else:
-                                    scale_factors = [1.0, 1.0, 1.0]
-
-                                geometries.append({
-                                    'mesh_file': mesh_file,
-                                    'translation': translation,
-                                    'orientation': orientation,
-                                    'scale_factors': scale_factors,
-                                })
-
-                # If no PhysicalOffsetFrame exists, check directly within the Body
-                if not geometries:
-                    attached_geometry = body.find('attached_geometry')
-                    if attached_geometry is not None:
-                        for mesh in attached_geometry.findall('Mesh'):
-                            mesh_file = mesh.find('mesh_file').text.strip()
-                            
-                            # Check for scale_factors
-                            scale_elem = mesh.find('scale_factors')
-                            if scale_elem is not None:
-                                scale_factors = list(map(float, scale_elem.text.strip().split()))
-                            else:
-                                scale_factors = [1.0, 1.0, 1.0]
-
-                            geometries.append({
-                                'mesh_file': mesh_file,
-                                'scale_factors': scale_factors
-                            })
-
-                # Wrap Object Set (handle any wrap object type)
-                wrap_objects = []
-                wrap_object_set = body.find('WrapObjectSet')
-                if wrap_object_set is not None:
-                    for wrap_object in wrap_object_set.find('objects').findall('*'):  # Get all wrap object types
-                        wrap_data = {
-                            'type': wrap_object.tag,  # Save the type of the wrap object (e.g., WrapCylinder, WrapSphere, etc.)
-                            'name': wrap_object.get('name')
-                        }
-
-                        # Collect all child elements of the wrap object dynamically
-                        for child in wrap_object:
-                            # Handle scalar and vector types
-                            value = child.text.strip() if child.text else None
-                            if value is not None:
-                                if value.lower() in ['true', 'false']:  # Handle boolean values
-                                    wrap_data[child.tag] = value.lower() == 'true'
-                                else:
-                                    try:
-                                        # Try to convert to float (for numbers)
-                                        wrap_data[child.tag] = float(value)
-                                    except ValueError:
-                                        # If it cannot be converted, store it as a string or tuple
-                                        if ' ' in value:
-                                            wrap_data[child.tag] = tuple(map(float, value.split()))  # Handle vectors
-                                        else:
-                                            wrap_data[child.tag] = value  # Store as string if it's not a number
-
-                            # Special case for Appearance
-                            if child.tag == 'Appearance':
-                                appearance = {}
-                                for appearance_child in child:
-                                    if appearance_child.tag == 'color':
-                                        appearance['color'] = tuple(map(float, appearance_child.text.split()))
-                                    elif appearance_child.tag == 'opacity':
-                                        appearance['opacity'] = float(appearance_child.text)
-                                    elif appearance_child.tag == 'SurfaceProperties':
-                                        appearance['representation'] = appearance_child.find('representation').text
-                                wrap_data['appearance'] = appearance
-
-                        wrap_objects.append(wrap_data)
-
-                # Add body data to dictionary
-                body_data[name] = {
-                    'mass': mass,
-                    'mass_center': mass_center,
-                    'inertia': inertia,
-                    'geometries': geometries,
-                    'wrap_objects': wrap_objects  # Modular wrap object data
-                }
-
-            return body_data
-
-
-
-        def get_joint_data(model):
-            joint_set = model.find('JointSet')
-            joints = joint_set.find('objects')
-
-            joint_data = {}
-            joint_inconsistent_frame_list = [] #list of joint names for a warning message if the socket_parent and socket_child names were not consistent with the names of the PhysicalOffsetFrames defined in the joint
-            
-            for joint in joints:
-                joint_name = joint.get('name')
-                joint_type = joint.tag
-
-                # Extract parent and child frames
-                parent_frame = joint.find('socket_parent_frame').text.strip()
-                child_frame = joint.find('socket_child_frame').text.strip()
-
-                # Initialize parent_body and child_body to None
-                parent_body = None
-                child_body = None
-
-                # Extract frames within the joint
-                frames_data = []
-                frames = joint.find('frames')
-                if frames is not None: #if there are frames defined
-                    for idx, frame in enumerate(frames.findall('PhysicalOffsetFrame')):
-                        frame_name = frame.get('name')
-                        translation = tuple(map(float, frame.find('translation').text.split()))
-                        orientation = tuple(map(float, frame.find('orientation').text.split()))
-                        socket_parent = frame.find('socket_parent').text.strip()
-
-                        # Match parent_frame with frame_name to get parent_body
-                        if frame_name == parent_frame:
-                            parent_body = socket_parent.split('/bodyset/')[-1]
-                            if parent_body == '/ground':
-                                parent_body = 'ground'
-
-                        # Match child_frame with frame_name to get child_body
-                        if frame_name == child_frame:
-                            child_body = socket_parent.split('/bodyset/')[-1]
-
-
-                        #if the joint has inconsistent definitions between socket_parent or socket_child and the actual PhysicalOffsetFrame names,
-                        #We throw a warning, and assume the PhysicalOffsetFrame is the correct frame.
-                        if (frame_name != parent_frame and frame_name != child_frame):
-                            if idx ==0: #parent frame assumed as first frame
-                                
-                                parent_body = socket_parent.split('/bodyset/')[-1]
-                                if parent_body == '/ground':
-                                    parent_body = 'ground'
+        #Throw a warning message if the frames definitions were inconsistent
+        if model_data['inconsistent_frame_joints']:
 
-                                #set 1st PhysicalOffsetFrame name as the parent_frame name 
-                                parent_frame = frame_name
-                                   
-                                joint_inconsistent_frame_list.append(joint_name) #for a warning message
-
-                            elif idx  == 1: #child frame assumed as second frame
-                                
-                                child_body = socket_parent.split('/bodyset/')[-1]
-                                
-                                #set 2nd PhysicalOffsetFrame name as the child_frame name 
-                                child_frame = frame_name
-
-                                joint_inconsistent_frame_list.append(joint_name) #for a warning message
-
-
-
-
-                        frames_data.append({
-                            'frame_name': frame_name,
-                            'translation': translation,
-                            'orientation': orientation,
-                            'socket_parent': socket_parent
-                        })
-                else: #if there are no frames defined in the joint, assume socket_parent_frame and child are the bodies themselves
-                    #and that the positions and orientations are both zero
-
-                    print(joint_name + ' has no frames defined. Automatically creating them. This may cause inconsistencies.')
-                    translation = tuple([0.0, 0.0, 0.0])
-                    orientation = tuple([0.0, 0.0, 0.0])
-                    
-                    ## parent
-                    parent_body = parent_frame.split('/bodyset/')[-1]
-
-                    if parent_body == '/ground':
-                        parent_body = 'ground'
-
-                    parent_frame = parent_body + '_offset', #opensim naming convention
-                    frames_data.append({
-                    'frame_name': parent_frame,
-                    'translation': translation,
-                    'orientation': orientation,
-                    'socket_parent': parent_body
-
-                    })
-
-                    ## Child
-                    child_body  = child_frame.split('/bodyset/')[-1]
-                    child_frame = child_body + '_offset'#opensim naming convention
-                    frames_data.append({
-                    'frame_name': child_frame, 
-                    'translation': translation,
-                    'orientation': orientation,
-                    'socket_parent': child_body
-
-                    })
-                
-                # Extract coordinates if any
-                coordinates = []
-                coords_element = joint.find('coordinates')
-                if coords_element is not None:
-                    for coord in coords_element.findall('Coordinate'):
-                        coordinates.append(coord.get('name'))
-
-                # Extract spatial transform data if present
-                spatial_transform = []
-                spatial_transform_element = joint.find('SpatialTransform')
-                if spatial_transform_element is not None:
-                    for axis in spatial_transform_element.findall('TransformAxis'):
-                        axis_name = axis.get('name')
-                        axis_coordinates_element = axis.find('coordinates')
-                        axis_coordinates = axis_coordinates_element.text.strip() if axis_coordinates_element is not None and axis_coordinates_element.text is not None else None
-                        axis_vector = tuple(map(float, axis.find('axis').text.split()))
-
-                        # Check if the transform axis has a LinearFunction and extract its coefficients
-                        transform_function = axis.find('LinearFunction')
-                        coefficients = None
-                        if transform_function is not None:
-                            coeff_values = tuple(map(float, transform_function.find('coefficients').text.split()))
-                            coefficients = coeff_values
-                            if coeff_values != (1.0, 0.0):
-                                print(f"Warning: Joint '{joint_name}' has a transform function that MuSkeMo may not support. Treating as regular joint.")
-
-                        spatial_transform.append({
-                            'axis_name': axis_name,
-                            'axis_coordinates': axis_coordinates,
-                            'axis_vector': axis_vector,
-                            'coefficients': coefficients
-                        })
-
-                # Store the extracted joint data in the dictionary
-                joint_data[joint_name] = {
-                    'joint_type': joint_type,
-                    'parent_frame': parent_frame,
-                    'child_frame': child_frame,
-                    'parent_body': parent_body,
-                    'child_body': child_body,
-                    'frames_data': frames_data,
-                    'coordinates': coordinates,
-                    'spatial_transform': spatial_transform
-                }
-
-            #Throw a warning message if the frames definitions were inconsistent
-
-            if joint_inconsistent_frame_list: #if this list contains any joint names
-
-                # Issue warning
-                warning_message = (
-                    f"The following joints had inconsistencies between socket_parent_frame or socket_child_frame and the actual PhysicalOffsetFrame names defined:"
-                    f"{', '.join(joint_inconsistent_frame_list)}."
-                    f"MuSkeMo automatically assumed the PhysicalOffsetFrames were the correct parent and/or child frames, but you should check your OpenSim model for inconsistencies."
-                )
-                self.report({'WARNING'}, warning_message)
-
-            
-            ## check if any of the child frames are non-unique            
-            #Collect all child_frames and where they occur
-            frame_usage = defaultdict(list)
-
-            for joint_name, joint in joint_data.items():
-                child_frame = joint['child_frame']
-                frame_usage[child_frame].append(joint_name)
-
-            #Find duplicates
-            duplicates = {frame: joints for frame, joints in frame_usage.items() if len(joints) > 1}
-
-            # Step 3: Rename and collect original duplicated names, if they exist
-            if duplicates:
-                renamed_original_frames = set()
-
-                #Loop through duplicate frames
-                for duplicate_frame, joints in duplicates.items():
-                    renamed_original_frames.add(duplicate_frame)
-                    for joint_name in joints:
-                        joint = joint_data[joint_name]
-                        child_body = joint['child_body']
-                        new_frame_name = child_body + "_offset_renamed"
-
-                        # Rename this joint's child_frame
-                        joint['child_frame'] = new_frame_name
-                        #also rename it in the easy access dict nested within each joint. First is the parent, second is the child. We want the child
-                        joint['frames_data'][1]['frame_name'] = new_frame_name
-
-                        # Now rename parent_frame of any joints that use this child_body as their parent_body
-                        for other_joint in joint_data.values():
-                            if other_joint['parent_body'] == child_body:
-                                other_joint['parent_frame'] = new_frame_name
-                                #also rename it in the easy access dict nested within each joint. First is the parent, second is the child. We want the parent
-                                other_joint['frames_data'][0]['frame_name'] = new_frame_name
-
-
-                # Convert to list
-                renamed_list = list(renamed_original_frames)
-
-                # Issue warning
-                warning_message = (
-                    f"The following child_frames were used more than once and were renamed during import: "
-                    f"{', '.join(renamed_list)}."
-                )
-                self.report({'WARNING'}, warning_message)
-
-
-            return joint_data
+            warning_message = (
+                f"The following joints had inconsistencies between socket_parent_frame or socket_child_frame and the actual PhysicalOffsetFrame names defined:"
+                f"{', '.join(model_data['inconsistent_frame_joints'])}."
+                f"MuSkeMo automatically assumed the PhysicalOffsetFrames were the correct parent and/or child frames, but you should check your OpenSim model for inconsistencies."
+            )
+            self.report({'WARNING'}, warning_message)
 
+        #Throw a warning message if any child frames were non-unique, and were renamed
+        if model_data['renamed_frames']:
 
-        
+            warning_message = (
+                f"The following child_frames were used more than once and were renamed during import: "
+                f"{', '.join(model_data['renamed_frames'])}."
+            )
+            self.report({'WARNING'}, warning_message)
 
-        def get_muscle_data(model):
-            muscle_data = {}
-
-            muscle_data['conditional_pathpoint_flag'] = False
-            muscle_data['moving_pathpoint_flag'] = False
-
-
-            # Locate the ForceSet in the model
-            forceset = model.find('ForceSet')
-            if forceset is not None:
-                # Locate all muscle objects (assuming they end with 'Muscle')
-                muscles = forceset.find('objects')
-                if muscles is not None:
-                    for muscle in muscles:
-                        if muscle.tag.endswith('Muscle'):
-                            muscle_name = muscle.get('name')
-                            muscle_type = muscle.tag
-
-                            # Initialize variables with default values
-                            tendon_slack_length = 0.0
-                            max_isometric_force = 0.0
-                            optimal_fiber_length = 0.0
-                            pennation_angle = 0.0
-
-                            # Extract specific muscle properties if they exist
-                            if muscle.find('tendon_slack_length') is not None:
-                                tendon_slack_length = float(muscle.find('tendon_slack_length').text)
-                            if muscle.find('max_isometric_force') is not None:
-                                max_isometric_force = float(muscle.find('max_isometric_force').text)
-                            if muscle.find('optimal_fiber_length') is not None:
-                                optimal_fiber_length = float(muscle.find('optimal_fiber_length').text)
-                            if muscle.find('pennation_angle_at_optimal') is not None:
-                                pennation_angle = np.rad2deg(float(muscle.find('pennation_angle_at_optimal').text))
-
-                            # Extract GeometryPath information
-                            geometry_path = muscle.find('GeometryPath')
-                            path_points_data = []
-                            path_wrap_data = []
-                            if geometry_path is not None:
-                                # Handle PathPointSet
-                                path_point_set = geometry_path.find('PathPointSet')
-                                if path_point_set is not None:
-                                    path_points = path_point_set.find('objects')
-                                    if path_points is not None:
-                                       for point in path_points:  # Iterate over all child elements
-                                            point_name = point.get('name')
-                                            parent_frame = point.find('socket_parent_frame').text.strip()
-
-                                            if (point.tag == 'PathPoint' or point.tag == 'ConditionalPathPoint'):  # Handle PathPoint and convert ConditionalPathPoint to regular PathPoints
-                                                
-                                                
-                                                location = tuple(map(float, point.find('location').text.split()))
-
-                                                if point.tag == 'ConditionalPathPoint':
-                                                    muscle_data['conditional_pathpoint_flag'] = True #if there are conditional pathpoints, we set this to true, so that we can display a warning later
-
-                                                
-                                            elif point.tag == 'MovingPathPoint': #if it's a moving path point, we find the position of each point when the associated joint_coordinate is 0
-                                                
-                                                muscle_data['moving_pathpoint_flag'] = True #if there are moving pathpoints, we set this to true, so that we can display a warning later
-
-
-                                                #the function gets called below, but is reused for all three points
-                                                def get_y_for_x_zero(location_tag):  #a function that extracts the y of each simmspline where the x input (corresponding to the joint coordinate) is zero.
-                                                    """Extract y-value corresponding to x=0 from the given location tag (x_location, y_location, z_location)."""
-                                                    location_elem = point.find(location_tag)  # e.g., "x_location", "y_location", "z_location"
-                                                    if location_elem is not None:
-
-                                                        #these nested if statements assume the simmspline is always within a multiplier function with scale. If this is not correct, add the alternative in the future.
-                                                        multiplier_function = location_elem.find(".//MultiplierFunction") 
-                                                        if multiplier_function is not None:
-
-                                                            scale_element = multiplier_function.find(".//scale")  # Locate the <scale> element
-                                                            scale = float(scale_element.text.strip()) if scale_element is not None else 1.0  # Convert to float, default to 1.0 if not found
-                                                            simm_spline = multiplier_function.find(".//SimmSpline")
-                                                            if simm_spline is not None:
-                                                                # Extract x and y values as lists of floats
-                                                                x_values = list(map(float, simm_spline.find('x').text.split()))
-                                                                y_values = list(map(float, simm_spline.find('y').text.split()))
-                                                                
-                                                                if 0 in x_values:  # Check if 0 is in x values
-                                                                    zero_index = x_values.index(0)  # Get index of 0
-                                                                    return scale*y_values[zero_index]  # Return corresponding y value
-                                                                
-
-                                                                else:
-                                                                    # Find indices of the two x-values that bridge 0
-                                                                    for i in range(len(x_values) - 1):
-                                                                        if x_values[i] < 0 < x_values[i + 1]:
-                                                                            # Perform linear interpolation
-                                                                            x1, x2 = x_values[i], x_values[i + 1]
-                                                                            y1, y2 = y_values[i], y_values[i + 1]
-                                                                            y_interpolated = y1 + (0 - x1) * (y2 - y1) / (x2 - x1)
-                                                                            return scale*float(y_interpolated)
-                                                        else:
-                                                            return None
-
-                                                    
-
-                                                # Get y-values for spline x=0, for x_location, y_location, z_location of the muscle point.
-                                                x_pos_at_zero = get_y_for_x_zero("x_location")
-                                                y_pos_at_zero = get_y_for_x_zero("y_location")
-                                                z_pos_at_zero = get_y_for_x_zero("z_location")
-
-                                                loc_list = [x_pos_at_zero, y_pos_at_zero, z_pos_at_zero]
-
-                                                if None not in loc_list: #if all the values are not None
-                                                    location = tuple(loc_list)
-                                                    
-
-                                                else: #if one is None, just make them all None
-                                                    location = tuple([None, None, None])    
-
-                                            if None not in location: #only if all the points actually exist
-
-                                                path_points_data.append({
-                                                        'point_name': point_name,
-                                                        'parent_frame': parent_frame,
-                                                        'location': location
-                                                    })    
-                                            
-                                # Handle PathWrapSet
-                                path_wrap_set = geometry_path.find('PathWrapSet')
-                                if path_wrap_set is not None:
-                                    wrap_objects = path_wrap_set.find('objects')
-                                    if wrap_objects is not None:
-                                        for wrap in wrap_objects.findall('PathWrap'):
-                                            wrap_name = wrap.get('name')
-                                            wrap_object = wrap.find('wrap_object').text.strip()
-
-                                            path_wrap_data.append({
-                                                'wrap_name': wrap_name,
-                                                'wrap_object': wrap_object
-                                            })
-
-                            # Add the extracted data to the muscle_data dict
-                            muscle_data[muscle_name] = {
-                                'muscle_type': muscle_type,
-                                'tendon_slack_length': tendon_slack_length,
-                                'F_max': max_isometric_force,
-                                'optimal_fiber_length': optimal_fiber_length,
-                                'pennation_angle': pennation_angle,
-                                'path_points_data': path_points_data,
-                                'path_wrap_data': path_wrap_data  # Add path wrap data here
-                            }
-
-            return muscle_data
-
-       
-        def get_contact_data(model):
-            contact_data = {}
-
-            # Locate the ContactGeometrySet in the model
-            contact_geometry_set = model.find('ContactGeometrySet')
-            if contact_geometry_set is not None:
-                # Locate all contact geometry objects
-                contact_objects = contact_geometry_set.find('objects')
-                if contact_objects is not None:
-                    for contact_geometry in contact_objects:
-                        geometry_name = contact_geometry.get('name')
-                        geometry_type = contact_geometry.tag
-
-                        # Initialize variables with default values
-                        socket_frame = None
-                        location = (0.0, 0.0, 0.0)
-                        orientation = (0.0, 0.0, 0.0)
-                        radius = None  # Not all geometries will have a radius
-
-                        # Extract frame, location, and orientation
-                        if contact_geometry.find('socket_frame') is not None:
-                            socket_frame = contact_geometry.find('socket_frame').text.strip()
-
-                        if contact_geometry.find('location') is not None:
-                            location = tuple(map(float, contact_geometry.find('location').text.split()))
-
-                        if contact_geometry.find('orientation') is not None:
-                            orientation = tuple(map(float, contact_geometry.find('orientation').text.split()))
-
-                        # Extract radius if it's a sphere
-                        if geometry_type == 'ContactSphere' and contact_geometry.find('radius') is not None:
-                            radius = float(contact_geometry.find('radius').text)
-
-                        # Add the extracted data to the contact_data dict
-                        contact_data[geometry_name] = {
-                            'geometry_type': geometry_type,
-                            'socket_frame': socket_frame,
-                            'location': location,
-                            'orientation': orientation,
-                            'radius': radius  # Will be None for geometries without a radius
-                        }
-
-            return contact_data
-
-        def get_marker_data(model):
-
-            marker_data = {}
-
-             # Locate the MarkerSet in the model
-            marker_set = model.find('MarkerSet')
-            if marker_set is not None:
-                # Locate all marker objects
-                marker_objects = marker_set.find('objects')
-                if marker_objects is not None:
-                    for marker in marker_objects:
-                        marker_name = marker.get('name')
-
-                        # Initialize variables with default values
-                        socket_parent_frame = None
-                        location = (0.0, 0.0, 0.0)
-
-                        # Extract frame, location, and orientation
-                        if marker.find('socket_parent_frame') is not None:
-                            socket_parent_frame = marker.find('socket_parent_frame').text.strip()
-
-                        if marker.find('location') is not None:
-                            location = tuple(map(float, marker.find('location').text.split()))
-
-
-                        # Add the extracted data to the marker_data dict
-                        marker_data[marker_name] = {
-                            'socket_parent_frame': socket_parent_frame,
-                            'location': location,
-                            }
-            return marker_data            
         #preallocate muskemo
         muskemo = bpy.context.scene.muskemo
 
         # Extract body data from the model, and check if geometry folder exists
-        body_data = get_body_data(model)
+        body_data = model_data['body_data']
         
         body_colname = muskemo.body_collection #name for the collection that will contain the hulls
         body_axes_size = muskemo.axes_size #axis length, in meters
@@ -687,30 +124,44 @@ class ImportOpenSimModel(Operator):
                    
 
         # Extract joint data from the model
-        joint_data = get_joint_data(model)
+        joint_data = model_data['joint_data']
 
         joint_colname = muskemo.joint_collection #name for the collection that will contain the joints
         joint_rad = muskemo.jointsphere_size #joint_radius
 
         # Extract muscle data from the model
-        muscle_data = get_muscle_data(model)
+        muscle_data = model_data['muscle_data']
         muscle_colname = muskemo.muscle_collection #name for the collection that will contain the muscles
         
         # Extract the contact data from the model
-        contact_data = get_contact_data(model)
+        contact_data = model_data['contact_data']
         contact_colname =  muskemo.contact_collection #name for the collection that will contain the contacts
         
         # Extract marker data from the model
-        marker_data = get_marker_data(model)
+        marker_data = model_data['marker_data']
         landmark_colname = muskemo.landmark_collection
         landmark_radius = muskemo.landmark_radius
 
 
+        #### parse all geometry files in parallel, before the bodies are created (see import_geometry_func.py)
+        if import_geometry:
+            from .import_geometry_func import preload_geometry
+
+            geometry_filepaths = []
+            for body in body_data.values():
+                for geometry in body['geometries']:
+                    filepath = geometry_parent_dir + '/' + geometry['mesh_file']
+                    if not os.path.exists(filepath): #OpenSim models where the Geometry subdirectory is not explicitly named
+                        filepath = geometry_parent_dir + '/Geometry/' + geometry['mesh_file']
+                    geometry_filepaths.append(filepath)
+
+            preload_geometry(geometry_filepaths)
+
         #### import the component creation functions
 
         from .create_body_func import create_body
         from .create_joint_func import create_joint
-        from .create_muscle_func import create_muscle
+        from .create_muscle_func import create_muscle_from_points
         from .create_frame_func import create_frame
         from .create_contact_func import create_contact
         from .create_wrapgeom_func import create_wrapgeom
@@ -839,20 +290,14 @@ class ImportOpenSimModel(Operator):
         else: #if using local definitions
             
            
-            def build_joint_tree(joint_data, parent_body):
-                # Find all joints where the parent_body is the current body
-                child_joints = {}
-                
-                for joint_name, joint in joint_data.items():
-                    if joint['parent_body'] == parent_body:
-                        # Recursively build the tree for this joint's child body
-                        child_body = joint['child_body']
-                        child_joints[joint_name] = build_joint_tree(joint_data, child_body)
-                
-                return child_joints
+            joints_by_parent_body = model_data['joints_by_parent_body'] #joint names per parent body, indexed by the model reader
+
+            def build_joint_tree(parent_body):
+                # Find all joints where the parent_body is the current body, and recursively build the tree for their child bodies
+                return {joint_name: build_joint_tree(joint_data[joint_name]['child_body']) for joint_name in joints_by_parent_body.get(parent_body, [])}
 
             # Get the entire joint topology as a tree structure
-            joint_tree = build_joint_tree(joint_data, 'ground') #this assumes ground is always the parent body of the model
+            joint_tree = build_joint_tree('ground') #this assumes ground is always the parent body of the model
 
             # Pretty print the resulting tree structure
             pprint.pprint(joint_tree)
@@ -1382,6 +827,9 @@ class ImportOpenSimModel(Operator):
             tendon_slack_length = muscle['tendon_slack_length']
             pennation_angle = muscle['pennation_angle']
 
+            point_positions = []
+            body_names = []
+
             for point in muscle['path_points_data']:
 
                 socket_parent_frame_name = point['parent_frame']
@@ -1402,15 +850,18 @@ class ImportOpenSimModel(Operator):
                 
                 point['global_position'] = muscle_point_position #store the global position so that we can potentially compare to wrap object position
 
-                create_muscle(muscle_name = muscle_name, 
-                            is_global =True, 
-                            body_name = mp_parent_body_name,
-                            point_position = muscle_point_position,
-                            collection_name=muscle_colname,
-                            optimal_fiber_length=optimal_fiber_length,
-                            tendon_slack_length=tendon_slack_length,
-                            F_max = F_max,
-                            pennation_angle = pennation_angle)    
+                point_positions.append(muscle_point_position)
+                body_names.append(mp_parent_body_name)
+
+            #create the muscle with all its points at once
+            create_muscle_from_points(muscle_name = muscle_name,
+                                      point_positions = point_positions,
+                                      body_names = body_names,
+                                      collection_name=muscle_colname,
+                                      optimal_fiber_length=optimal_fiber_length,
+                                      tendon_slack_length=tendon_slack_length,
+                                      F_max = F_max,
+                                      pennation_angle = pennation_angle)
 
             # Dictionary to store indices and count occurrences
             pre_wrap_indices_count = {} #we use this to track whether a muscle has a multi-object wrap
@@ -1605,7 +1056,11 @@ class ImportOpenSimModel(Operator):
                             is_global = True,
                             )
 
-       
+
+        if import_geometry:
+            from .import_geometry_func import clear_preloaded_geometry
+            clear_preloaded_geometry() #free the parsed geometry arrays
+
         time2 = time.time()
 
         print('Elapsed time = ' + str(time2-time1) + ' seconds')
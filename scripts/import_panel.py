@@ -104,8 +104,9 @@ class ImportBodiesOperator(Operator, ImportHelperCustom):  #inherits from Import
   
 
         from .create_body_func import create_body
+        from .import_geometry_func import clear_preloaded_geometry
                        
-        
+        clear_preloaded_geometry() #start without shared meshes from an earlier import (see import_geometry_func.py)
 
         for row in data:
             
@@ -127,6 +128,7 @@ class ImportBodiesOperator(Operator, ImportHelperCustom):  #inherits from Import
                          import_geometry = import_geometry, #the bool property
                             geometry_parent_dir = geometry_parent_dir)
 
+        clear_preloaded_geometry()
 
         return {'FINISHED'}
 
@@ -275,32 +277,24 @@ class ImportMusclesOperator(Operator, ImportHelperCustom):  #inherits from Impor
         
         
 
-        from .create_muscle_func import create_muscle
-
+        from .create_muscle_func import create_muscle_from_points
 
-        ### get unique muscle names               
-        # Extract the first column (muscle point names)
-        muscle_point_names = [row[0] for row in data]
 
-        # Define the pattern to remove suffixes (_or, _ins, _via#)
+        ### group the rows per muscle               
+        # Define the pattern to remove suffixes (_or, _ins, _via#) from the muscle point names in the first column
         pattern = r'_or|_ins|_via\d+'
 
         # Apply the regex pattern to remove the suffixes and maintain original order
-        muscle_names = []
-        seen = set()
+        muscle_rows = {} #data rows per muscle name
 
-        for name in muscle_point_names:
-            clean_name = re.sub(pattern, '', name)
-            if clean_name not in seen:
-                seen.add(clean_name)
-                muscle_names.append(clean_name)
+        for row in data:
+            muscle_rows.setdefault(re.sub(pattern, '', row[0]), []).append(row)
         
 
-        #muscle_names = muscle_names[0]
-        for muscle_name in muscle_names:
+        for muscle_name, data_onemusc in muscle_rows.items(): #data_onemusc contains the data rows of a single muscle
 
-            data_onemusc = [x for x in data if x[0].startswith(muscle_name)] #data rows of a single muscle
-            
+            point_positions = []
+            body_names = []
 
             for point_row in data_onemusc:  #each row of data_onemusc contains data for one muscle point
                 parent_body_name = point_row[1]
@@ -319,25 +313,27 @@ class ImportMusclesOperator(Operator, ImportHelperCustom):  #inherits from Impor
                     return {'FINISHED'}
         
             
-                point_position = [float(x) for x in point_row[2:5]]
+                point_positions.append([float(x) for x in point_row[2:5]])
+                body_names.append(parent_body_name)
 
                 #parent_frame_name = point_row[5]
                 #point_position_loc = [float(x) for x in point_row[6:9]]
 
-                optimal_fiber_length = float(point_row[9])
-                tendon_slack_length  = float(point_row[10])
-                F_max                = float(point_row[11])
-                pennation_angle      = float(point_row[12])
-                
-                create_muscle(muscle_name = muscle_name, 
-                              is_global =True, 
-                              body_name = parent_body_name,
-                              point_position = point_position,
-                              collection_name=colname,
-                              optimal_fiber_length=optimal_fiber_length,
-                              tendon_slack_length=tendon_slack_length,
-                              F_max = F_max,
-                              pennation_angle = pennation_angle)
+            #the muscle properties are repeated in each row, take them from the first point
+            optimal_fiber_length = float(data_onemusc[0][9])
+            tendon_slack_length  = float(data_onemusc[0][10])
+            F_max                = float(data_onemusc[0][11])
+            pennation_angle      = float(data_onemusc[0][12])
+
+            #create the muscle with all its points at once
+            create_muscle_from_points(muscle_name = muscle_name,
+                                      point_positions = point_positions,
+                                      body_names = body_names,
+                                      collection_name=colname,
+                                      optimal_fiber_length=optimal_fiber_length,
+                                      tendon_slack_length=tendon_slack_length,
+                                      F_max = F_max,
+                                      pennation_angle = pennation_angle)
                 
 
         return {'FINISHED'}
@@ -673,6 +669,10 @@ from .import_gaitsym_model import ImportGaitsymModel
 
 from .import_mujoco_model import ImportMuJoCoModel
 
+## geometry cache
+
+from .import_geometry_func import ClearGeometryCacheOperator
+
 ### The panels
 
 ## Main export panel
@@ -876,3 +876,35 @@ class VIEW3D_PT_import_MuJoCo_model_subpanel(VIEW3D_PT_MuSkeMo, Panel):  # class
         row = self.layout.row()
         
         return   
+
+
+    ## Geometry cache and mesh sharing
+class VIEW3D_PT_geometry_cache_subpanel(VIEW3D_PT_MuSkeMo, Panel):  # class naming convention ‘CATEGORY_PT_name’
+    bl_idname = 'VIEW3D_PT_geometry_cache_subpanel'
+    bl_parent_id = 'VIEW3D_PT_import_panel'  #have to define this if you use multiple panels
+    bl_label = "Geometry import options"  # found at the top of the Panel
+    bl_options = {'DEFAULT_CLOSED'} 
+    
+    def draw(self, context):
+        layout = self.layout
+        scene = context.scene
+        muskemo = scene.muskemo
+
+        row = layout.row()
+        row.prop(muskemo, "share_geometry_meshes") #boolean, yes or no
+
+        row = layout.row()
+        row.prop(muskemo, "use_geometry_cache") #boolean, yes or no
+
+        row = layout.row()
+        split= row.split(factor=1/3)
+        split.label(text = 'Cache directory')
+        split.prop(muskemo, "geometry_cache_directory", text = "")
+
+        row = layout.row()
+        row.prop(muskemo, "geometry_cache_size")
+
+        row = layout.row()
+        row.operator("import.clear_geometry_cache",text = 'Clear geometry cache')
+        
+        return   
@@ -2,11 +2,11 @@ import bpy
 from mathutils import (Vector, Matrix)
 
 
-from bpy.types import (Operator,
+from bpy.types import (Operator, OperatorFileListElement,
                         )
 
 from bpy.props import (StringProperty,   #it appears to matter whether you import these from types or from props
-                       BoolProperty)
+                       BoolProperty, CollectionProperty)
 
 
 from math import nan
@@ -16,7 +16,6 @@ import numpy as np
 import os
 import csv
 
-import colorsys
 
 class ImportTrajectory(Operator):
     bl_description = "Import a trajectory file to create an animation"
@@ -51,106 +50,47 @@ class ImportTrajectory(Operator):
 
 
     def parse_trajectory_file(self, context):  # custom super class method
-        """Reads simulation trajectory data from the specified file"""
-        filepath = self.filepath
-        file_header = []       # all header lines including 'endheader'
-        column_headers = []    # actual data column names
-        data = []              # numeric data rows
-        is_data = False        # becomes True after 'endheader'
+        """Reads simulation trajectory data from the specified file. The numeric data are read in one go, and cached as .npy next to the file (see trajectory_file_reader.py)"""
 
-        in_degrees = 'not_defined'
+        from .trajectory_file_reader import read_trajectory_file
 
         ## user switches
         muskemo = context.scene.muskemo
         trajectory_filetype = muskemo.trajectory_filetype
 
         if trajectory_filetype == 'OpenSim (.sto or .mot)': ### OpenSim .sto or .mot should be split based on whitespaces
+            column_headers, data, in_degrees = read_trajectory_file(self.filepath, opensim_format = True)
 
-
-            with open(filepath, mode='r') as file:
-                
-                for line_num, line in enumerate(file, 1):
-                    line = line.strip()
-                    if not line:
-                        continue  # skip empty lines
-
-                    # Check inDegrees in header
-                    if not is_data and 'inDegrees' in line:
-                        if 'no' in line.lower():
-                            in_degrees = False
-                        elif 'yes' in line.lower():
-                            in_degrees = True
-                        else:
-                            print(f"Warning: unrecognized inDegrees value at line {line_num}: {line}")
-
-                        bpy.context.scene.muskemo.in_degrees = in_degrees
-
-                    # Detect end of header
-                    if not is_data and 'endheader' in line.lower():
-                        is_data = True
-                        continue
-
-                    if is_data:
-                        # First row after endheader is column headers
-                        if not column_headers:
-                            column_headers = line.split()  # split on any whitespace
-                        else:
-                            try:
-                                row_values = [float(x) for x in line.split()]
-                                if len(row_values) != len(column_headers):
-                                    print(f"Warning: line {line_num} has {len(row_values)} values but expected {len(column_headers)}")
-                                data.append(row_values)
-                            except ValueError as e:
-                                print(f"Warning: could not convert values to float at line {line_num}: {e}")
-                    else:
-                        file_header.append(line)
-
-            
             # Warn if inDegrees was not defined in the header
-            if in_degrees == 'not_defined':
+            if in_degrees is None:
                 self.report({'WARNING'},
                             "Your .sto or .mot file does not have an 'inDegrees' line in the header. "
                             "Default behavior is to assume radians; if you want degrees, specify it before import.")
-
+            else:
+                muskemo.in_degrees = in_degrees
 
         else: #custom filetype is split based on user set delimiter, and starts after user-set number of header rows. 
-            #more user switches
-            delimiter = muskemo.delimiter
-            column_label_row_number = muskemo.column_label_row_number
-             
-            with open(filepath, mode='r') as file:
-            
-                for line_num, line in enumerate(file, 1):
-                    line = line.strip()
-
-                    # Detect the row where the column labels are
-                    if not is_data and line_num == column_label_row_number:
-                        is_data = True
-                        
-
-                    if is_data:
-                        # First row after endheader is column headers
-                        if not column_headers:
-                            column_headers = line.split(delimiter)  # split on any whitespace
-                        else:
-                            try:
-                                row_values = [float(x) for x in line.split(delimiter)]
-                                if len(row_values) != len(column_headers):
-                                    print(f"Warning: line {line_num} has {len(row_values)} values but expected {len(column_headers)}")
-                                data.append(row_values)
-                            except ValueError as e:
-                                print(f"Warning: could not convert values to float at line {line_num}: {e}")
-                    else:
-                        file_header.append(line)
+            column_headers, data, in_degrees = read_trajectory_file(self.filepath, opensim_format = False,
+                                                                    delimiter = muskemo.delimiter,
+                                                                    column_label_row_number = muskemo.column_label_row_number)
         
         return column_headers, data
     
     def execute(self, context):
         
         # Call the custom superclass method parse_sto to read the sto data
-        column_headers, traj_data = self.parse_trajectory_file(context)
+        try:
+            column_headers, traj_data = self.parse_trajectory_file(context)
+        except ValueError as e:
+            self.report({'ERROR'}, str(e))
+            return {'FINISHED'}
+
+        return self.create_trajectory_animation(context, column_headers, traj_data)
+
+    def create_trajectory_animation(self, context, column_headers, traj_data, trial_name = None):
+        """Animates the model with the parsed trajectory data. If trial_name is given (batch import), the keyframes are written
+        into new actions for that trial (see trajectory_trials.py), and the playback mode is ignored"""
         
-        traj_data = np.array(traj_data)
         time = traj_data[:,0] #time is the first column
 
         #### First we get the joint parameters in the model. Because a joint can have multiple coordinates, this is slightly involved
@@ -380,252 +320,230 @@ class ImportTrajectory(Operator):
         
         
 
-        ##### start adding keyframes
-        ##### insert a rest-pose keyframe at frame number 0
+        ##### compute all channel values first, and then write each channel's F-curve in one go (see bulk_keyframes_func.py)
+        ##### frame 0 holds the rest pose, frames 1 to n_frames the trajectory
+
+        from .bulk_keyframes_func import (write_fcurve, write_vector_fcurves)
+        from .trajectory_pose_func import (compile_joint_channels, joint_poses)
+
+        frames = np.arange(0, n_frames + 1)
+
+        unique_joints_in_traj = list(dict.fromkeys(traj_joints)) #unique joints used in the trajectory 
+
+        #map the trajectory columns to the coordinates of each joint once. The base (global) positions and orientations of the joints
+        #are used as offsets for the trajectory data that are loaded in
+        joint_channels = compile_joint_channels(unique_joints_in_traj, traj_joints, traj_model_coordinate_types)
+
+        #### keep track of trajectory time per frame
+        bpy.context.scene["trajectory_timebase"] = np.nan
+        # Give the custom property a tooltip description in the UI
+        id_props = bpy.context.scene.id_properties_ui("trajectory_timebase")
+        id_props.update(description="The timestamp (in seconds) of the current frame of the imported trajectory")
+        
+        ##### compute the joint positions and orientations for all time points at once
+        in_degrees = bpy.context.scene.muskemo.in_degrees
+
+        joint_locations = np.zeros((len(unique_joints_in_traj), n_frames + 1, 3))
+        joint_rotations = np.zeros((len(unique_joints_in_traj), n_frames + 1, 3))
 
-        frame_number = 0
+        joint_locations[:, 1:], joint_rotations[:, 1:] = joint_poses(joint_channels, coordinate_trajectories_rs[:n_frames, :], in_degrees)
 
-        unique_joints_in_traj = list(set(traj_joints)) #unique joints used in the trajectory 
+        for joint_ind, joint in enumerate(unique_joints_in_traj): #rest-pose keyframe at frame number 0
+            joint_locations[joint_ind, 0] = joint.location
+            joint_rotations[joint_ind, 0] = joint.rotation_euler
 
-        #Define the global starting position and orientations of the joints, so we can use these as offsets for the trajectory data that are loaded in
-        base_position = []  #The global position of the joint, before it is moved.
-        base_orientation = []   #Global orientation of the joint, before it is moved.
+        ##### muscle activation per time point. Frame 0 (the rest pose) is fully activated
+        activations = activation_trajectories_rs[:n_frames, :]
 
-        for joint in unique_joints_in_traj:
-            base_position.append(Vector(joint['pos_in_global']))
-            base_orientation.append(Vector(joint['or_in_global_XYZeuler']))
-            joint.keyframe_insert('rotation_euler', frame = frame_number)
-            joint.keyframe_insert('location', frame = frame_number)
+        if scale_activations_to_highest and traj_muscles: #scales the intensity of the activation colours (useful for simulations where muscle activations are low)
+            activations = activations/max_act
 
+        activations = np.vstack([np.ones((1, len(traj_muscles))), activations])
 
-        ## same for muscles
+        if bpy.app.version[0] <4: #if blender version is below 4
+            nodename = 'Hue Saturation Value'
+        else: #if blender version is above 4:
+            nodename = 'Hue/Saturation/Value'
+
+        #The activation is stored as one custom property per muscle. A shared node group maps it onto the color saturation,
+        #between baseline_saturation and 1, so inactive muscles are never at 0 saturation. Drivers do the same for the viewport display color.
+        from .muscle_activation_coloring import (get_activation_node_group, setup_activation_coloring, activation_property_name)
+        from .bulk_keyframes_func import remove_fcurves
+
+        activation_node_group = get_activation_node_group(baseline_saturation)
 
         for muscle in traj_muscles:
-            muscle_name = muscle.name
+            mat = bpy.data.materials[muscle.name]   #get the right material
+            setup_activation_coloring(muscle, mat, nodename, activation_node_group)
 
-            mat = bpy.data.materials[muscle_name]   #get the right material
-            node_tree = mat.node_tree
+            #keyframed colors from trajectories imported with older versions would override the shared coloring
+            remove_fcurves(mat, 'diffuse_color')
+            remove_fcurves(mat.node_tree, mat.node_tree.nodes[nodename].inputs['Saturation'].path_from_id('default_value'))
 
+        trajectory_time = np.concatenate([[np.nan], time_rs[:n_frames]]) #frame 0 is the rest pose, and has no trajectory time
 
-            if bpy.app.version[0] <4: #if blender version is below 4
-                nodename = 'Hue Saturation Value'
-            else: #if blender version is above 4:
-                nodename = 'Hue/Saturation/Value'
+        #### STREAMING PLAYBACK. The per-frame values are written to memory-mapped arrays, and a frame change handler poses the model (see trajectory_playback.py)
+        if muskemo.trajectory_playback_mode == 'Stream' and trial_name is None:
+            from .trajectory_playback import (write_playback_store, set_playback_layout, register_playback_handler, trajectory_playback_handler)
 
-            # Muscle mat in rendered mode
-            node_tree.nodes[nodename].inputs['Saturation'].default_value = 1
-            node_tree.nodes[nodename].inputs['Saturation'].keyframe_insert('default_value', frame = frame_number) #insert a keyframe
+            playback_folder = os.path.splitext(self.filepath)[0] + '_playback'
+            write_playback_store(playback_folder, trajectory_time,
+                                 joint_locations.transpose(1, 0, 2), joint_rotations.transpose(1, 0, 2),
+                                 activations)
 
-            # Muscle mat viewport display (i.e., workbench renderer)
-            mat.keyframe_insert('diffuse_color',frame = frame_number)
+            #existing keyframes would override the handler
+            remove_fcurves(bpy.context.scene, '["trajectory_timebase"]')
+            for joint in unique_joints_in_traj:
+                remove_fcurves(joint, 'location')
+                remove_fcurves(joint, 'rotation_euler')
 
-        #### keep track of trajectory time per frame
-        bpy.context.scene["trajectory_timebase"] = np.nan
-        # Give the custom property a tooltip description in the UI
-        id_props = bpy.context.scene.id_properties_ui("trajectory_timebase")
-        id_props.update(description="The timestamp (in seconds) of the current frame of the imported trajectory")
-        
-        ##### start inserting keyframes per time point
-        in_degrees = bpy.context.scene.muskemo.in_degrees
+            for muscle in traj_muscles:
+                remove_fcurves(muscle, f'["{activation_property_name}"]')
 
-        for i in range(n_frames):                     
-            frame_number = i+1 
+            set_playback_layout(bpy.context.scene, playback_folder, [x.name for x in unique_joints_in_traj],
+                                [x.name for x in traj_muscles])
+            register_playback_handler()
+            trajectory_playback_handler(bpy.context.scene)
 
-            #keyframe trajectory time
-            bpy.context.scene["trajectory_timebase"] = float(time_rs[i])
-            bpy.context.scene.keyframe_insert(data_path='["trajectory_timebase"]', frame=frame_number)
+            return {'FINISHED'}
 
-            coordinate_traj_row = coordinate_trajectories_rs[i,:] #row i of the resampled coordinate trajectory
+        ##### write the F-curves
+        from .trajectory_playback import clear_playback
+        clear_playback(bpy.context.scene) #keyframes replace a previously streamed trajectory
 
-            
-            for joint_ind, joint in enumerate(unique_joints_in_traj):
+        animated_ids = [bpy.context.scene] + unique_joints_in_traj + traj_muscles
 
-                entries_in_traj_coor_list = [i for i,x in enumerate(traj_joints) if joint == x] #fill these into traj_coordinate_headers & associated lists
-                Tx = 0
-                Ty = 0
-                Tz = 0
+        if trial_name is not None: #write into new actions for this trial
+            from .trajectory_trials import assign_trial_actions
+            assign_trial_actions(animated_ids, trial_name)
 
-                Rx = 0
-                Ry = 0
-                Rz = 0
+        #### optional keyframe reduction (see keyframe_reduction_func.py). The keep masks are (n_channels x n_frames), computed for all channels at once
+        n_joints = len(unique_joints_in_traj)
+        location_keep = rotation_keep = activation_keep = None
 
-                if 'transform_axes' not in joint: #if the joint doesn't have transform axes from OpenSim, treat it normally
+        if muskemo.reduce_keyframes:
+            from .keyframe_reduction_func import (rdp_keep_mask, reduction_summary)
 
-                    for idx in entries_in_traj_coor_list: 
-                        
-                        #check what type of coordinate it is
-                        if traj_model_coordinate_types[idx] == 'coordinate_Tx':
-                            #Tx = coordinate_traj_row[traj_coordinate_ind[idx] -1]
-                            Tx = coordinate_traj_row[idx]
-                        
-                        if traj_model_coordinate_types[idx] == 'coordinate_Ty':
-                            #Ty = coordinate_traj_row[traj_coordinate_ind[idx]]
-                            Ty = coordinate_traj_row[idx]
-
-                        if traj_model_coordinate_types[idx] == 'coordinate_Tz':
-                            Tz = coordinate_traj_row[idx]  
-                            
-                        if traj_model_coordinate_types[idx] == 'coordinate_Rx':
-                            if in_degrees:
-                                Rx = np.deg2rad(coordinate_traj_row[idx])
-                            else:
-                                Rx =coordinate_traj_row[idx]
-
-                        if traj_model_coordinate_types[idx] == 'coordinate_Ry':
-                            if in_degrees:
-                                Ry =np.deg2rad(coordinate_traj_row[idx])
-                            else:
-                                Ry = coordinate_traj_row[idx]
-
-                        if traj_model_coordinate_types[idx] == 'coordinate_Rz':
-                            if in_degrees:
-                                Rz = np.deg2rad(coordinate_traj_row[idx])  
-                            else:
-                                Rz = coordinate_traj_row[idx]
-
-                else:
-                    transform_axes = joint['transform_axes'].to_dict()  #dict with the transform axes
-                    
-                    #pre-allocate translation and identity matrices for rotations
-                    translation = Vector([Tx, Ty, Tz])
-
-                    Rmat_x = Matrix([[1,0,0],[0,1,0],[0,0,1]])
-                    Rmat_y = Matrix([[1,0,0],[0,1,0],[0,0,1]])
-                    Rmat_z = Matrix([[1,0,0],[0,1,0],[0,0,1]])
-
-                    from .axis_angle import matrix_from_axis_angle
-                    from .euler_XYZ_body import (matrix_from_euler_XYZbody, euler_XYZbody_from_matrix)
-
-                    for idx in entries_in_traj_coor_list:
-                        
-                        
-                        #for the translation coordinates, multiply the coordinate value by the transform axis vector
-                        if traj_model_coordinate_types[idx] == 'coordinate_Tx':
-                            #Tx = coordinate_traj_row[traj_coordinate_ind[idx] -1]
-                            translation += Vector(transform_axes['transform_axis_Tx'])*coordinate_traj_row[idx]
-                        
-                        if traj_model_coordinate_types[idx] == 'coordinate_Ty':
-                            #Ty = coordinate_traj_row[traj_coordinate_ind[idx]]
-                            translation += Vector(transform_axes['transform_axis_Ty'])*coordinate_traj_row[idx]
-
-                        if traj_model_coordinate_types[idx] == 'coordinate_Tz':
-                            translation += Vector(transform_axes['transform_axis_Tz'])*coordinate_traj_row[idx]
-
-                        #for the rotation coordinates, set up an axis angle rotation matrix, and replace the ID matrix with it
-                        if traj_model_coordinate_types[idx] == 'coordinate_Rx':
-                            if in_degrees:
-                                angle = np.deg2rad(coordinate_traj_row[idx])
-                            else:
-                                angle =coordinate_traj_row[idx]
-
-                            axis =  transform_axes['transform_axis_Rx']
-                            Rmat_x = matrix_from_axis_angle(axis, angle) 
-
-                        if traj_model_coordinate_types[idx] == 'coordinate_Ry':
-                            if in_degrees:
-                                angle =np.deg2rad(coordinate_traj_row[idx])
-                            else:
-                                angle = coordinate_traj_row[idx]
-
-                            axis =  transform_axes['transform_axis_Ry']
-                            Rmat_y = matrix_from_axis_angle(axis, angle)    
-
-                        if traj_model_coordinate_types[idx] == 'coordinate_Rz':
-                            if in_degrees:
-                                angle = np.deg2rad(coordinate_traj_row[idx])  
-                            else:
-                                angle = coordinate_traj_row[idx]
-
-                            axis =  transform_axes['transform_axis_Rz']
-                            Rmat_z = matrix_from_axis_angle(axis, angle)
-
-                    # X Y Z, maybe this should be flipped
-                    jRta = Rmat_x @ Rmat_y @ Rmat_z #matrix from transform axis to joint 
-
-                    #jRta = Rmat_z @ Rmat_y @ Rmat_x #should it be flipped like this?
-                    
-
-                    [gRj, jRg] = matrix_from_euler_XYZbody(base_orientation[joint_ind])
-
-                    # rotate the joint
-                    rotated_joint = gRj@jRta
-                    
-                    #decompose into euler angles
-                    rotated_joint_euler = euler_XYZbody_from_matrix(rotated_joint)
-
-                    #Unpack into separate euler angles
-                    #In the normal case, the base orientation is implicit, and since we are calculating a relative orientation with respect to it,
-                    # we add the base orientation to each euler angle. In the non-standard transform axes case, since we are creating a matrix
-                    #from the base orientation about which to compute the actual orientation, maybe we shouldn't be adding it to Rx when setting the keyframe?
-                    # That's why I subtract it here, because it gets added later.
-                    Rx = rotated_joint_euler[0] -base_orientation[joint_ind][0] 
-                    Ry = rotated_joint_euler[1] -base_orientation[joint_ind][1]
-                    Rz = rotated_joint_euler[2] -base_orientation[joint_ind][2]
-
-                    ## Rotate the translations. We only rotate about base orientation, which means the translation is assumed to be with respect to the parent frame.
-                   
-                    global_translation = gRj @ translation
-
-
-                    #unpack translations. Compensate for the base position being added to it
-                    Tx = global_translation[0] #- base_position[joint_ind][0]
-                    Ty = global_translation[1] #- base_position[joint_ind][1]
-                    Tz = global_translation[2] #- base_position[joint_ind][2]
-
-                                      
-           
-                #add the position and orientation, using the original position and orientation as an offset.
-                #the above loop should have only added the changed coordinates (e.g. Rz), zo all the other components are simply zero.
-                joint.location = Vector((Tx, Ty, Tz)) + base_position[joint_ind]
-                joint.rotation_euler = (base_orientation[joint_ind][0] + Rx,
-                                        base_orientation[joint_ind][1] + Ry, 
-                                        base_orientation[joint_ind][2] + Rz)
-                
-                #joint.rotation_euler = ( Rx,  Ry,  Rz) # should we not be adding the base_orientation to the euler angles?
-               
-                joint.keyframe_insert('rotation_euler', frame = frame_number)
-                joint.keyframe_insert('location', frame = frame_number)
-                
+            location_keep = rdp_keep_mask(joint_locations.transpose(0, 2, 1).reshape(-1, n_frames + 1),
+                                          muskemo.keyframe_reduction_tolerance_translation).reshape(n_joints, 3, n_frames + 1)
+            rotation_keep = rdp_keep_mask(joint_rotations.transpose(0, 2, 1).reshape(-1, n_frames + 1),
+                                          np.deg2rad(muskemo.keyframe_reduction_tolerance_rotation)).reshape(n_joints, 3, n_frames + 1)
+            activation_keep = rdp_keep_mask(activations.T, 0.005) #a 0.5% activation difference is not visible in the muscle colours
 
-            activation_traj_row = activation_trajectories_rs[i,:] #row i of the resampled coordinate trajectory
-            
+            n_original, n_reduced, ratio = reduction_summary(np.concatenate([location_keep.reshape(-1), rotation_keep.reshape(-1), activation_keep.reshape(-1)]))
+            self.report({'INFO'}, f"Keyframe reduction: {n_original} to {n_reduced} keyframes (compression ratio {ratio:.1f})")
 
-            for muscle_ind, muscle in enumerate(traj_muscles):
-                muscle_name = muscle.name
+        write_fcurve(bpy.context.scene, '["trajectory_timebase"]', 0, frames[1:], trajectory_time[1:])
 
-                mat = bpy.data.materials[muscle_name]   #get the right material
-                node_tree = mat.node_tree
+        for joint_ind, joint in enumerate(unique_joints_in_traj):
+            joint.location = joint_locations[joint_ind, -1]
+            joint.rotation_euler = joint_rotations[joint_ind, -1]
+            write_vector_fcurves(joint, 'location', frames, joint_locations[joint_ind],
+                                 keep = None if location_keep is None else location_keep[joint_ind])
+            write_vector_fcurves(joint, 'rotation_euler', frames, joint_rotations[joint_ind],
+                                 keep = None if rotation_keep is None else rotation_keep[joint_ind])
 
+        for muscle_ind, muscle in enumerate(traj_muscles): #one F-curve per muscle, the colors follow from the shared node group and drivers
+            muscle[activation_property_name] = float(activations[-1, muscle_ind])
+            muscle_keep = slice(None) if activation_keep is None else activation_keep[muscle_ind]
+            write_fcurve(muscle, f'["{activation_property_name}"]', 0, frames[muscle_keep], activations[muscle_keep, muscle_ind])
 
-                if bpy.app.version[0] <4: #if blender version is below 4
-                    nodename = 'Hue Saturation Value'
-                else: #if blender version is above 4:
-                    nodename = 'Hue/Saturation/Value'
+        if trial_name is not None:
+            from .trajectory_trials import store_trial
+            store_trial(bpy.context.scene, animated_ids, trial_name, n_frames, muskemo.trajectory_trial_mode)
 
-                activation = activation_traj_row[muscle_ind] #assign the right data point, using the k'th ind_act
-                
+        return {'FINISHED'}
 
-                if scale_activations_to_highest: #scales the intensity of the activation colours (useful for simulations where muscle activations are low)
-                    activation = activation/max_act
 
-                #remap activation (which should vary between 0 to 1) onto a saturation scale of baseline_saturation to 1.
-                # The result is that inactive muscles are never at 0 saturation.
-                saturation = baseline_saturation + (1-baseline_saturation) * activation
+def read_trajectory_for_batch(filepath, trajectory_filetype, delimiter, column_label_row_number):
 
+    #reads one file of a batch import. Runs in a worker thread, so it can't use bpy. Errors are returned instead of raised
+
+    from .trajectory_file_reader import read_trajectory_file
+
+    try:
+        if trajectory_filetype == 'OpenSim (.sto or .mot)':
+            return read_trajectory_file(filepath, opensim_format = True) + (None,)
+
+        return read_trajectory_file(filepath, opensim_format = False, delimiter = delimiter,
+                                    column_label_row_number = column_label_row_number) + (None,)
+
+    except (OSError, ValueError) as e:
+        return None, None, None, str(e)
 
-                ## First the rendered materials
-                
-                node_tree.nodes[nodename].inputs['Saturation'].default_value = saturation
-                node_tree.nodes[nodename].inputs['Saturation'].keyframe_insert('default_value', frame = frame_number) #insert a keyframe
 
-                ## Now the viewport display materials (for the workbench renderer)
-                r,g,b,a = mat.diffuse_color #viewport display color
+class BatchImportTrajectories(Operator):
+    bl_description = "Import multiple trajectory files as separate trials, that you can switch between without re-importing"
+    bl_idname = "visualization.batch_import_trajectories"
+    bl_label = "Import multiple trajectory files as trials"
+    bl_options = {"UNDO"} #enable undoing
+
+    files: CollectionProperty(type = OperatorFileListElement, options = {'HIDDEN', 'SKIP_SAVE'})
+    directory: StringProperty(subtype = 'DIR_PATH')
+
+    #this filters other filetypes from the window during import. The actual value is set in invoke, by setting the filetype
+    filter_glob: bpy.props.StringProperty(default = "",options={'HIDDEN'}, maxlen=255)
+
+    #the animation is created in the same way as for a single import
+    create_trajectory_animation = ImportTrajectory.create_trajectory_animation
 
-                h,s,v = colorsys.rgb_to_hsv(r,g,b) #convert to Hue Saturation Value
-                r,g,b = colorsys.hsv_to_rgb(h,saturation,v) #set saturation using activation level
-                mat.diffuse_color = (r,g,b,a)
-                mat.keyframe_insert('diffuse_color',frame = frame_number)
+    def invoke(self, context, _event):
+
+        if bpy.context.scene.muskemo.trajectory_filetype == 'OpenSim (.sto or .mot)':
+            self.filter_glob = "*.sto;*.mot"
+
+        else: #filter nothing
+            self.filter_glob = "*"
+
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+    def execute(self, context):
+
+        from concurrent.futures import ThreadPoolExecutor
+        from .trajectory_trials import switch_trial
+
+        muskemo = context.scene.muskemo
+        filepaths = [os.path.join(self.directory, x.name) for x in self.files if x.name]
+
+        if not filepaths:
+            self.report({'ERROR'}, "No trajectory files were selected.")
+            return {'FINISHED'}
+
+        #parse all files in parallel. np.loadtxt spends most of its time outside the Python interpreter lock.
+        #The settings are read here, because the worker threads can't access bpy
+        settings = (muskemo.trajectory_filetype, muskemo.delimiter, muskemo.column_label_row_number)
+
+        with ThreadPoolExecutor(max_workers = min(len(filepaths), os.cpu_count() or 1)) as pool:
+            results = list(pool.map(lambda filepath: read_trajectory_for_batch(filepath, *settings), filepaths))
+
+        #every trial starts from the same rest pose
+        joint_col = bpy.data.collections[muskemo.joint_collection]
+        rest_poses = [(x, x.location.copy(), x.rotation_euler.copy()) for x in joint_col.objects if 'MuSkeMo_type' in x and x['MuSkeMo_type']=='JOINT']
+
+        trial_names = []
+
+        for filepath, (column_headers, traj_data, in_degrees, error) in zip(filepaths, results):
+            trial_name = os.path.splitext(os.path.basename(filepath))[0]
+
+            if error is not None:
+                self.report({'WARNING'}, "Trial '" + trial_name + "' was skipped: " + error)
+                continue
+
+            if in_degrees is not None: #otherwise the user setting is used, as for single imports
+                muskemo.in_degrees = in_degrees
+
+            for joint, location, rotation in rest_poses:
+                joint.location = location
+                joint.rotation_euler = rotation
+
+            self.create_trajectory_animation(context, column_headers, traj_data, trial_name)
+            trial_names.append(trial_name)
+
+        if trial_names:
+            switch_trial(context.scene, trial_names[0])
+            self.report({'INFO'}, "Imported " + str(len(trial_names)) + " trial(s). Switch between them in the 'Trials' list of the Import trajectory panel.")
 
         return {'FINISHED'}
 
-    
\ No newline at end of file
+    
@@ -1,78 +1,62 @@
 import bpy
 import os
-import xml.etree.ElementTree as ET
 import numpy as np
 
-def load_vtp_as_mesh(filepath):
-    # Get the filename from the path
-    filename = os.path.basename(filepath)
+from .mesh_file_readers import read_vtp
 
-    # Parse the .vtp XML file
-    tree = ET.parse(filepath)
-    root = tree.getroot()
 
-    # Debugging: Print XML structure to check the paths
-    #print("XML Structure:")
-    #for elem in root.iter():
-    #    print(elem.tag, elem.attrib)
+def create_mesh_from_arrays(name, vertices, connectivity, offsets, smooth = True):
 
-    # Find the point data in the .vtp file
-    points_elem = root.find(".//Points/DataArray")
-    #if points_elem is None:
-    #    raise ValueError("Points element not found in the VTP file")
+    '''
+    Creates a mesh datablock from NumPy arrays, without Python loops over the vertices or polygons.
 
-    # Extract the DataArray elements for connectivity and offsets
-    polys_elem = root.find(".//Polys")
-    #if polys_elem is None:
-    #   raise ValueError("Polys element not found in the VTP file")
+    Inputs:
+    - vertices: (n x 3) array
+    - connectivity, offsets: polygons in VTK layout (see mesh_file_readers.py)
+    - smooth (bool): smooth shading for all polygons
+    '''
 
-    connectivity_elem = polys_elem.find("./DataArray[@Name='connectivity']")
-    offsets_elem = polys_elem.find("./DataArray[@Name='offsets']")
+    vertices = np.asarray(vertices, dtype = np.float32)
+    connectivity = np.asarray(connectivity, dtype = np.int32)
+    offsets = np.asarray(offsets, dtype = np.int32)
 
-    # Debugging: Check if elements were found
-    #if connectivity_elem is None:
-    #    raise ValueError("Connectivity element not found in the VTP file")
-    #if offsets_elem is None:
-    #    raise ValueError("Offsets element not found in the VTP file")
+    loop_starts = np.concatenate([[0], offsets[:-1]]).astype(np.int32)
+    loop_totals = (offsets - loop_starts).astype(np.int32)
 
-    # Extract points (coordinates) from the Points element
-    num_components = int(points_elem.get("NumberOfComponents", "3"))
-    points_raw = points_elem.text.strip().split()
+    mesh = bpy.data.meshes.new(name)
 
-    # Ensure the points are reshaped into the correct form (triples for 3D points)
-    points = np.array(points_raw, dtype=float).reshape((-1, num_components))
-    #print("Points Array Shape:", points.shape)
+    mesh.vertices.add(len(vertices))
+    mesh.vertices.foreach_set('co', vertices[:, :3].ravel())
 
-    # Parse the connectivity and offsets values as lists of integers
-    connectivity = list(map(int, connectivity_elem.text.strip().split()))
-    offsets = list(map(int, offsets_elem.text.strip().split()))
+    mesh.loops.add(len(connectivity))
+    mesh.loops.foreach_set('vertex_index', connectivity)
 
-    # List to store the final polygons
-    polys = []
+    mesh.polygons.add(len(offsets))
+    mesh.polygons.foreach_set('loop_start', loop_starts)
+    if bpy.app.version[0] < 4: #loop_total is derived from loop_start in Blender 4 and later
+        mesh.polygons.foreach_set('loop_total', loop_totals)
 
-    # Iterate over the offsets to extract the individual polygons from the connectivity array
-    start = 0
-    for end in offsets:
-        polygon = connectivity[start:end]
-        polys.append(polygon)
-        start = end
+    mesh.polygons.foreach_set('use_smooth', np.full(len(offsets), smooth, dtype = bool))
 
-    #print("Polygons:", polys)
+    mesh.update(calc_edges = True)
+    mesh.validate() #removes degenerate polygons, which some exported geometry files have
 
-    # Create a new mesh and object in Blender
-    mesh = bpy.data.meshes.new(filename)
+    return mesh
+
+
+def load_vtp_as_mesh(filepath):
+    # Get the filename from the path
+    filename = os.path.basename(filepath)
 
-    
+    # Read the points and polygons. ascii, binary and appended (optionally compressed) DataArrays are decoded with NumPy
+    vertices, connectivity, offsets = read_vtp(filepath)
+
+    # Create a new mesh and object in Blender
+    mesh = create_mesh_from_arrays(filename, vertices, connectivity, offsets)
 
     obj = bpy.data.objects.new(filename, mesh)
 
     # Link object to the current scene
     bpy.context.collection.objects.link(obj)
 
-    # Set the mesh data with n-gons support
-    mesh.from_pydata(points.tolist(), [], polys)
-    for poly in mesh.polygons:
-        poly.use_smooth = True
-    mesh.update()
-
     return obj
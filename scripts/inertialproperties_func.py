@@ -22,6 +22,9 @@ def inertial_properties(obj):
     
     
     
+    if obj.data.users > 1: #shared mesh (see share_geometry_meshes). Blender can't apply transforms to a multi user mesh, and this would also change the other objects that use it
+        obj.data = obj.data.copy()
+
     bpy.ops.object.select_all(action='DESELECT') #Deselect all, then select desired object 
     obj.select_set(True)
     bpy.ops.object.transform_apply()  
@@ -0,0 +1,74 @@
+import numpy as np
+
+# Keyframe reduction for imported trajectories (Ramer-Douglas-Peucker on the values of linearly interpolated F-curves).
+# A keyframe is only kept if leaving it out would make the linear interpolation between its neighbouring keyframes deviate
+# from the original values by more than the tolerance. The error is measured along the value axis (not perpendicular to the curve),
+# because frames and values have different units. So the reduced F-curve stays within the tolerance at every frame.
+# All channels are reduced at once: each iteration splits every open segment of every channel at its worst frame,
+# so the number of iterations scales with the depth of the recursion, not with the number of channels or keyframes.
+# This file doesn't import bpy and doesn't use relative imports, so it can also be used from the 'MuSkeMo utilities' scripts.
+
+
+def rdp_keep_mask(values, tolerance):
+
+    '''
+    Inputs:
+    - values: (n_channels x n_frames) array, one row per F-curve, sampled at every frame
+    - tolerance: maximum deviation (in the units of the values), scalar or one per channel
+
+    Output: (n_channels x n_frames) bool array, True for the keyframes that are kept. The first and last frame are always kept.
+    '''
+
+    values = np.atleast_2d(np.asarray(values, dtype = float))
+    n_channels, n_frames = values.shape
+
+    keep = np.zeros((n_channels, n_frames), dtype = bool)
+    keep[:, [0, -1]] = True
+
+    if n_frames < 3:
+        return keep
+
+    tolerance = np.broadcast_to(np.asarray(tolerance, dtype = float).reshape(-1, 1), (n_channels, 1))
+
+    frame_ind = np.arange(n_frames)
+    rows = np.arange(n_channels)[:, np.newaxis]
+
+    for _ in range(n_frames): #every iteration keeps at least one more frame, so this is only a guard against endless loops
+        #previous and next kept keyframe of every frame
+        prev_ind = np.maximum.accumulate(np.where(keep, frame_ind, 0), axis = 1)
+        next_ind = np.minimum.accumulate(np.where(keep, frame_ind, n_frames - 1)[:, ::-1], axis = 1)[:, ::-1]
+
+        span = np.maximum(next_ind - prev_ind, 1)
+        weight = (frame_ind - prev_ind) / span
+        interpolated = values[rows, prev_ind] + weight * (values[rows, next_ind] - values[rows, prev_ind])
+
+        error = np.abs(values - interpolated)
+        error[keep] = 0
+        error[~(error > tolerance)] = 0 #also ignores nans (e.g. normalized all-zero activations, or missing samples)
+
+        if not error.any():
+            return keep
+
+        #worst frame of each segment: segments are numbered by their first keyframe, over all channels
+        segment = (rows * n_frames + prev_ind).ravel()
+        segment_max = np.zeros(n_channels * n_frames)
+        np.maximum.at(segment_max, segment, error.ravel())
+
+        candidates = (error.ravel() > 0) & (error.ravel() == segment_max[segment])
+        candidate_ind = np.flatnonzero(candidates)
+
+        #if several frames of a segment have the same error, only keep the first
+        _, first = np.unique(segment[candidate_ind], return_index = True)
+        keep.flat[candidate_ind[first]] = True
+
+    return keep
+
+
+def reduction_summary(keep):
+
+    #returns the original and reduced number of keyframes, and the compression ratio (original/reduced)
+
+    n_original = keep.size
+    n_reduced = int(np.count_nonzero(keep))
+
+    return n_original, n_reduced, n_original / max(n_reduced, 1)
@@ -0,0 +1,441 @@
+import numpy as np
+import xml.etree.ElementTree as ET
+import base64
+import zlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Mesh file readers that return NumPy arrays, without bpy, so they can run in worker threads or processes.
+# The arrays are turned into Blender meshes with create_mesh_from_arrays (import_vtp.py).
+# Polygons are returned in VTK layout: a flat connectivity array (vertex indices of all polygons after each other),
+# and offsets (the end of each polygon in connectivity).
+# read_mesh_files parses many files in a thread pool (e.g. all geometry of a model, before the bodies are created).
+# No relative imports, so the utility scripts can import this file after appending the scripts folder to sys.path.
+
+
+## VTK XML PolyData (.vtp). Supports ascii, binary (base64) and appended (base64 or raw) DataArrays, optionally zlib compressed
+
+vtk_types = {'Int8': np.int8, 'UInt8': np.uint8, 'Int16': np.int16, 'UInt16': np.uint16,
+             'Int32': np.int32, 'UInt32': np.uint32, 'Int64': np.int64, 'UInt64': np.uint64,
+             'Float32': np.float32, 'Float64': np.float64}
+
+
+def _base64_chars(num_bytes):
+
+    #number of base64 characters that encode num_bytes bytes
+    return -(-num_bytes // 3) * 4
+
+
+class _VTKDataDecoder:
+
+    #decodes the DataArrays of one VTK XML file, using the settings of its root VTKFile element
+
+    def __init__(self, root, appended_raw = None):
+
+        byte_order = '<' if root.get('byte_order', 'LittleEndian') == 'LittleEndian' else '>'
+        self.byte_order = byte_order
+        self.header_dtype = np.dtype(vtk_types[root.get('header_type', 'UInt32')]).newbyteorder(byte_order)
+        self.compressed = root.get('compressor') is not None
+
+        if root.get('compressor') not in (None, 'vtkZLibDataCompressor'):
+            raise ValueError("Unsupported VTK compressor '" + root.get('compressor') + "'. Only zlib compression is supported")
+
+        appended_elem = root.find('AppendedData')
+        self.appended_base64 = appended_elem is not None and appended_elem.get('encoding', 'raw') == 'base64'
+
+        if appended_raw is not None: #raw appended data, cut out of the file before parsing the XML
+            self.appended = appended_raw
+        elif appended_elem is not None and appended_elem.text:
+            self.appended = appended_elem.text.strip()[1:] #the data starts after an underscore
+        else:
+            self.appended = None
+
+    def _header(self, data, base64_encoded):
+
+        #returns the header (uncompressed: [n_bytes], compressed: [n_blocks, block_size, last_block_size, compressed sizes...])
+        #and the position in data where the binary data starts
+
+        item_size = self.header_dtype.itemsize
+        n_items = 1
+
+        if self.compressed: #the number of blocks determines the header length
+            first = base64.b64decode(data[:_base64_chars(item_size)]) if base64_encoded else data[:item_size]
+            n_items = 3 + int(np.frombuffer(first[:item_size], self.header_dtype)[0])
+
+        n_bytes = item_size * n_items
+
+        if base64_encoded:
+            n_chars = _base64_chars(n_bytes)
+            return np.frombuffer(base64.b64decode(data[:n_chars])[:n_bytes], self.header_dtype), n_chars
+
+        return np.frombuffer(data[:n_bytes], self.header_dtype), n_bytes
+
+    def _binary(self, data, dtype, base64_encoded):
+
+        header, start = self._header(data, base64_encoded)
+
+        if not self.compressed:
+            n_bytes = int(header[0])
+
+            if base64_encoded:
+                n_chars = _base64_chars(header.itemsize)
+                if data[n_chars - 1:n_chars] == b'=': #the header was encoded separately (it has its own padding)
+                    raw = base64.b64decode(data[n_chars:])[:n_bytes]
+                else: #header and data were encoded together
+                    raw = base64.b64decode(data)[header.itemsize:header.itemsize + n_bytes]
+            else:
+                raw = data[start:start + n_bytes]
+
+            return np.frombuffer(raw, dtype)
+
+        compressed_sizes = header[3:].astype(np.int64)
+        block_ends = np.cumsum(compressed_sizes)
+
+        n_blocks_bytes = int(block_ends[-1]) if len(block_ends) else 0
+
+        if base64_encoded:
+            if data[start - 1:start] == b'=': #the header was encoded separately (it has its own padding), the compressed blocks are encoded together after it
+                blocks = base64.b64decode(data[start:start + _base64_chars(n_blocks_bytes)])
+            else: #header and blocks were encoded together
+                n_header_bytes = header.itemsize * len(header)
+                blocks = base64.b64decode(data[:_base64_chars(n_header_bytes + n_blocks_bytes)])[n_header_bytes:]
+        else:
+            blocks = data[start:]
+
+        raw = b''.join(zlib.decompress(blocks[end - size:end]) for size, end in zip(compressed_sizes, block_ends))
+
+        return np.frombuffer(raw, dtype)
+
+    def read(self, elem):
+
+        dtype = np.dtype(vtk_types[elem.get('type', 'Float32')]).newbyteorder(self.byte_order)
+        data_format = elem.get('format', 'ascii')
+
+        if data_format == 'ascii':
+            values = np.array((elem.text or '').split(), dtype = np.float64)
+            return values.astype(dtype.newbyteorder('='), copy = False)
+
+        if data_format == 'binary':
+            values = self._binary(elem.text.strip().encode(), dtype, True)
+
+        elif data_format == 'appended':
+            if self.appended is None:
+                raise ValueError("DataArray '" + elem.get('Name', '') + "' refers to appended data, but the file has no AppendedData")
+
+            offset = int(elem.get('offset', '0'))
+            values = self._binary(self.appended[offset:].encode() if self.appended_base64 else self.appended[offset:],
+                                  dtype, self.appended_base64)
+
+        else:
+            raise ValueError("Unsupported DataArray format '" + data_format + "'")
+
+        return values.astype(dtype.newbyteorder('='), copy = False) #native byte order for Blender
+
+
+def _parse_vtk_xml(filepath):
+
+    #returns the XML root and the raw appended data (None if the appended data is base64 encoded or absent).
+    #Raw appended data is binary and not valid XML, so it is cut out before parsing
+
+    with open(filepath, 'rb') as file:
+        content = file.read()
+
+    start = content.find(b'<AppendedData')
+    if start == -1:
+        return ET.fromstring(content), None
+
+    tag_end = content.index(b'>', start)
+    if b'base64' in content[start:tag_end]:
+        return ET.fromstring(content), None
+
+    data_start = content.index(b'_', tag_end) + 1
+    data_end = content.rindex(b'</AppendedData>')
+
+    xml = content[:tag_end + 1] + content[data_end:]
+    return ET.fromstring(xml), content[data_start:data_end]
+
+
+def read_vtp(filepath):
+
+    '''
+    Reads a VTK XML PolyData file (.vtp), e.g. OpenSim geometry.
+
+    Output: vertices (n x 3 float array), connectivity and offsets (int arrays, VTK layout, see top of this file).
+    Raises a ValueError if the file has no points, or uses an unsupported encoding.
+    '''
+
+    root, appended_raw = _parse_vtk_xml(filepath)
+    decoder = _VTKDataDecoder(root, appended_raw)
+
+    points_elem = root.find('.//Piece/Points/DataArray')
+    polys_elem = root.find('.//Piece/Polys')
+
+    if points_elem is None:
+        raise ValueError("No points found in '" + filepath + "'")
+
+    num_components = int(points_elem.get('NumberOfComponents', '3'))
+    vertices = decoder.read(points_elem).reshape(-1, num_components)
+
+    if polys_elem is None: #e.g. a point cloud
+        return vertices, np.zeros(0, dtype = np.int64), np.zeros(0, dtype = np.int64)
+
+    connectivity = decoder.read(polys_elem.find("./DataArray[@Name='connectivity']")).astype(np.int64)
+    offsets = decoder.read(polys_elem.find("./DataArray[@Name='offsets']")).astype(np.int64)
+
+    return vertices, connectivity, offsets
+
+
+## Wavefront OBJ. Only the vertex positions and polygons are read (no normals, texture coordinates, materials or groups).
+## Like the Blender importer with forward axis Y and up axis Z, the coordinates are not converted
+
+def read_obj(filepath):
+
+    #Output: vertices, connectivity and offsets (see top of this file)
+
+    vertex_lines = []
+    face_sizes = []
+    connectivity = []
+
+    with open(filepath, mode = 'r', errors = 'replace') as file:
+        for line in file:
+            if line.startswith('v '):
+                vertex_lines.append(line[2:])
+
+            elif line.startswith('f '):
+                face = [int(token.split('/', 1)[0]) for token in line.split()[1:]]
+                n_vertices = len(vertex_lines)
+                connectivity.extend([i - 1 if i > 0 else n_vertices + i for i in face]) #1-based, or negative (relative to the last vertex so far)
+                face_sizes.append(len(face))
+
+    values = np.array(' '.join(vertex_lines).split(), dtype = np.float64)
+
+    if len(vertex_lines) and values.size % len(vertex_lines) == 0: #all vertex lines have the same length (xyz, xyzw or xyzrgb)
+        vertices = values.reshape(len(vertex_lines), -1)[:, :3]
+    else:
+        vertices = np.array([line.split()[:3] for line in vertex_lines], dtype = np.float64).reshape(-1, 3)
+
+    return vertices, np.array(connectivity, dtype = np.int64), np.cumsum(face_sizes, dtype = np.int64)
+
+
+## STL (binary and ascii). STL files store every triangle with its own three vertices, so the vertices are welded
+## (exact duplicates merged with np.unique), as the Blender STL importer does
+
+stl_triangle_dtype = np.dtype([('normal', '<f4', (3,)), ('vertices', '<f4', (3, 3)), ('attribute', '<u2')]) #50 bytes per triangle
+
+
+def weld_triangles(triangle_vertices):
+
+    #input: (n_triangles x 3 x 3) array. Output: vertices, connectivity and offsets (see top of this file)
+
+    corners = np.ascontiguousarray(triangle_vertices, dtype = np.float32).reshape(-1, 3)
+    vertices, connectivity = np.unique(corners, axis = 0, return_inverse = True)
+
+    return vertices, connectivity.reshape(-1).astype(np.int64), np.arange(3, len(corners) + 1, 3, dtype = np.int64)
+
+
+def read_stl(filepath):
+
+    #Output: vertices, connectivity and offsets (see top of this file)
+
+    size = os.path.getsize(filepath)
+
+    with open(filepath, 'rb') as file:
+        header = file.read(84)
+
+    n_triangles = int(np.frombuffer(header[80:84], '<u4')[0]) if len(header) == 84 else -1
+
+    if size == 84 + n_triangles * stl_triangle_dtype.itemsize: #binary. Some binary files also start with 'solid', so the size decides
+        if n_triangles == 0:
+            return np.zeros((0, 3), dtype = np.float32), np.zeros(0, dtype = np.int64), np.zeros(0, dtype = np.int64)
+
+        triangles = np.memmap(filepath, dtype = stl_triangle_dtype, mode = 'r', offset = 84, shape = (n_triangles,))
+        return weld_triangles(triangles['vertices'])
+
+    with open(filepath, mode = 'r', errors = 'replace') as file: #ascii: 'vertex x y z' lines
+        tokens = np.array(file.read().split())
+
+    vertex_ind = np.flatnonzero(tokens == 'vertex')
+    if not len(vertex_ind) or len(vertex_ind) % 3:
+        raise ValueError("'" + os.path.basename(filepath) + "' is not a valid binary or ascii STL file")
+
+    coordinates = tokens[vertex_ind[:, np.newaxis] + np.arange(1, 4)].astype(np.float64)
+
+    return weld_triangles(coordinates.reshape(-1, 3, 3))
+
+
+## PLY (ascii, binary little endian and binary big endian). Only the vertex positions and the face vertex indices are read
+
+ply_types = {'char': 'i1', 'int8': 'i1', 'uchar': 'u1', 'uint8': 'u1', 'short': 'i2', 'int16': 'i2', 'ushort': 'u2', 'uint16': 'u2',
+             'int': 'i4', 'int32': 'i4', 'uint': 'u4', 'uint32': 'u4', 'float': 'f4', 'float32': 'f4', 'double': 'f8', 'float64': 'f8'}
+
+
+def _read_ply_header(file):
+
+    #returns the format and a list of elements: [name, count, properties], with properties a list of (name, type) or (name, count type, item type) for lists
+
+    if file.readline().strip() != b'ply':
+        raise ValueError("Not a PLY file")
+
+    ply_format = None
+    elements = []
+
+    for line in file:
+        words = line.decode('ascii', errors = 'replace').split()
+        if not words or words[0] in ('comment', 'obj_info'):
+            continue
+
+        if words[0] == 'format':
+            ply_format = words[1]
+        elif words[0] == 'element':
+            elements.append([words[1], int(words[2]), []])
+        elif words[0] == 'property' and words[1] == 'list':
+            elements[-1][2].append((words[4], ply_types[words[2]], ply_types[words[3]]))
+        elif words[0] == 'property':
+            elements[-1][2].append((words[2], ply_types[words[1]]))
+        elif words[0] == 'end_header':
+            return ply_format, elements
+
+    raise ValueError("PLY header has no 'end_header'")
+
+
+def _ply_lists_binary(data, start, count, properties, byte_order):
+
+    #reads an element with list properties (e.g. faces) from binary data. Returns the lists of the first list property
+    #(as flat values and end offsets), and the position after the element
+
+    if len(properties) == 1 and count: #fast path: a single list property where all lists have the same length (e.g. only triangles)
+        name, count_type, item_type = properties[0]
+        list_length = int(np.frombuffer(data, byte_order + count_type, 1, start)[0])
+        face_dtype = np.dtype([('n', byte_order + count_type), ('items', byte_order + item_type, (list_length,))])
+
+        if start + count * face_dtype.itemsize <= len(data):
+            faces = np.frombuffer(data, face_dtype, count, start)
+            if (faces['n'] == list_length).all():
+                return (faces['items'].reshape(-1).astype(np.int64), np.arange(1, count + 1, dtype = np.int64) * list_length,
+                        start + count * face_dtype.itemsize)
+
+    values = []
+    sizes = []
+    position = start
+
+    for _ in range(count): #general case: lists of different lengths, or more properties
+        for prop_ind, prop in enumerate(properties):
+            if len(prop) == 2: #scalar
+                position += np.dtype(prop[1]).itemsize
+                continue
+
+            n = int(np.frombuffer(data, byte_order + prop[1], 1, position)[0])
+            position += np.dtype(prop[1]).itemsize
+            items = np.frombuffer(data, byte_order + prop[2], n, position)
+            position += n * np.dtype(prop[2]).itemsize
+
+            if prop_ind == next(i for i, x in enumerate(properties) if len(x) == 3): #first list property
+                values.append(items)
+                sizes.append(n)
+
+    values = np.concatenate(values).astype(np.int64) if values else np.zeros(0, dtype = np.int64)
+    return values, np.cumsum(sizes, dtype = np.int64), position
+
+
+def read_ply(filepath):
+
+    #Output: vertices, connectivity and offsets (see top of this file)
+
+    with open(filepath, 'rb') as file:
+        ply_format, elements = _read_ply_header(file)
+        data = file.read()
+
+    vertices = np.zeros((0, 3))
+    connectivity = np.zeros(0, dtype = np.int64)
+    offsets = np.zeros(0, dtype = np.int64)
+
+    if ply_format == 'ascii':
+        lines = data.decode('ascii', errors = 'replace').split('\n')
+        line_ind = 0
+
+        for name, count, properties in elements:
+            element_lines = lines[line_ind:line_ind + count]
+            line_ind += count
+
+            if name == 'vertex':
+                values = np.array(' '.join(element_lines).split(), dtype = np.float64).reshape(count, -1)
+                names = [x[0] for x in properties]
+                vertices = values[:, [names.index('x'), names.index('y'), names.index('z')]]
+
+            elif name == 'face': #the vertex indices are the first list of each line (count, then the indices)
+                faces = [line.split() for line in element_lines]
+                list_start = next(i for i, x in enumerate(properties) if len(x) == 3)
+                sizes = [int(face[list_start]) for face in faces]
+                connectivity = np.array([int(i) for face, n in zip(faces, sizes) for i in face[list_start + 1:list_start + 1 + n]], dtype = np.int64)
+                offsets = np.cumsum(sizes, dtype = np.int64)
+
+        return vertices, connectivity, offsets
+
+    if ply_format not in ('binary_little_endian', 'binary_big_endian'):
+        raise ValueError("Unsupported PLY format '" + str(ply_format) + "'")
+
+    byte_order = '<' if ply_format == 'binary_little_endian' else '>'
+    position = 0
+
+    for name, count, properties in elements:
+        if all(len(x) == 2 for x in properties): #only scalar properties: one structured array
+            element_dtype = np.dtype([(x[0], byte_order + x[1]) for x in properties])
+            values = np.frombuffer(data, element_dtype, count, position)
+            position += count * element_dtype.itemsize
+
+            if name == 'vertex':
+                vertices = np.column_stack([values['x'], values['y'], values['z']])
+
+        else:
+            lists, ends, position = _ply_lists_binary(data, position, count, properties, byte_order)
+            if name == 'face':
+                connectivity, offsets = lists, ends
+
+    return vertices, connectivity, offsets
+
+
+## any supported file
+
+mesh_file_readers = {'.vtp': read_vtp, '.obj': read_obj, '.stl': read_stl, '.ply': read_ply}
+
+
+def read_mesh_file(filepath, cache = None):
+
+    #reads a mesh file with the reader for its extension. Raises a ValueError for unsupported filetypes
+    #cache (optional): a geometry_cache.GeometryCache, so files that were parsed before are loaded from the cache instead
+
+    extension = os.path.splitext(filepath)[1].lower()
+    if extension not in mesh_file_readers:
+        raise ValueError("Unsupported mesh filetype '" + extension + "'")
+
+    if cache is not None:
+        return cache.read(filepath, mesh_file_readers[extension])
+
+    return mesh_file_readers[extension](filepath)
+
+
+def read_mesh_files(filepaths, n_workers = None, cache = None):
+
+    '''
+    Reads many mesh files in a thread pool.
+
+    Inputs: filepaths (list of strings), n_workers (int, optional, defaults to the number of CPU cores), cache (optional, see read_mesh_file)
+
+    Output: dict with the (vertices, connectivity, offsets) of each file that could be read. Files that fail are left out,
+    so the caller can report them when it reads them again.
+    '''
+
+    filepaths = list(dict.fromkeys(filepaths))
+    if not filepaths:
+        return {}
+
+    def read(filepath):
+        try:
+            return read_mesh_file(filepath, cache)
+        except (OSError, ValueError, ET.ParseError, zlib.error):
+            return None
+
+    with ThreadPoolExecutor(max_workers = min(len(filepaths), n_workers or os.cpu_count() or 1)) as pool:
+        results = list(pool.map(read, filepaths))
+
+    return {filepath: arrays for filepath, arrays in zip(filepaths, results) if arrays is not None}
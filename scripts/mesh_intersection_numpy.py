@@ -0,0 +1,194 @@
+import numpy as np
+
+# Triangle mesh intersection checks in pure NumPy.
+# This is the same test as check_bvh_intersection (do the surfaces of two meshes intersect?), but it works on plain vertex and triangle arrays.
+# That means it can run outside of Blender, e.g. in worker processes that don't have access to bpy or mathutils.
+
+# The static mesh is sorted into a uniform grid once (broadphase). For each query, the moving triangles are looked up in the grid,
+# and only candidate pairs whose bounding boxes overlap are tested exactly with segment-triangle tests (narrowphase).
+# This file does not use relative imports, so it can be imported from the scripts folder directly.
+
+
+def _expand_cell_ranges(i0, i1, dims):
+
+    #For every box i (given by integer cell index ranges i0[i] to i1[i], inclusive), list all the grid cells it overlaps.
+    #Output: linear cell indices, and the box index that each cell belongs to.
+
+    extents = i1 - i0 + 1
+    counts = np.prod(extents, axis = 1)
+    owner = np.repeat(np.arange(len(i0)), counts)
+
+    k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) #running index within each box
+    a = k % extents[owner, 0]
+    k = k // extents[owner, 0]
+    b = k % extents[owner, 1]
+    c = k // extents[owner, 1]
+
+    ix = i0[owner, 0] + a
+    iy = i0[owner, 1] + b
+    iz = i0[owner, 2] + c
+
+    return ix + dims[0] * (iy + dims[1] * iz), owner
+
+
+def build_triangle_grid(vertices, triangles, cell_size = None):
+
+    '''
+    Sorts the triangles of a (static) mesh into a uniform grid.
+
+    Inputs:
+    - vertices: (n x 3) float array
+    - triangles: (m x 3) int array of vertex indices
+    - cell_size (optional float). Defaults to twice the median triangle size.
+
+    Output: dict that can be passed to mesh_intersects_grid
+    '''
+
+    vertices = np.asarray(vertices, dtype = np.float64)
+    triangles = np.asarray(triangles, dtype = np.int64)
+
+    tri_verts = vertices[triangles]
+    lo = tri_verts.min(axis = 1)
+    hi = tri_verts.max(axis = 1)
+
+    if cell_size is None:
+        cell_size = 2 * np.median((hi - lo).max(axis = 1)) if len(triangles) else 1.0
+        cell_size = max(cell_size, 1e-9)
+
+    origin = lo.min(axis = 0) if len(triangles) else np.zeros(3)
+    upper = hi.max(axis = 0) if len(triangles) else np.zeros(3)
+    dims = np.floor((upper - origin) / cell_size).astype(np.int64) + 1
+
+    i0 = np.floor((lo - origin) / cell_size).astype(np.int64)
+    i1 = np.minimum(np.floor((hi - origin) / cell_size).astype(np.int64), dims - 1)
+
+    cells, tri_ids = _expand_cell_ranges(i0, i1, dims)
+
+    order = np.argsort(cells, kind = 'stable')
+    cells = cells[order]
+    tri_ids = tri_ids[order]
+
+    keys, starts = np.unique(cells, return_index = True)
+    ends = np.append(starts[1:], len(cells))
+
+    return {
+        'tri_verts': tri_verts,
+        'tri_lo': lo,
+        'tri_hi': hi,
+        'origin': origin,
+        'upper': upper,
+        'cell_size': cell_size,
+        'dims': dims,
+        'keys': keys,
+        'starts': starts,
+        'ends': ends,
+        'tri_ids': tri_ids,
+    }
+
+
+def candidate_pairs(grid, tri_verts):
+
+    #Broadphase. Returns index arrays (query triangle, grid triangle) of pairs whose bounding boxes overlap.
+
+    lo = tri_verts.min(axis = 1)
+    hi = tri_verts.max(axis = 1)
+
+    #only triangles that overlap the bounding box of the gridded mesh
+    inside = np.all(hi >= grid['origin'], axis = 1) & np.all(lo <= grid['upper'], axis = 1)
+    query = np.flatnonzero(inside)
+
+    if len(query) == 0 or len(grid['keys']) == 0:
+        return np.zeros(0, dtype = np.int64), np.zeros(0, dtype = np.int64)
+
+    dims = grid['dims']
+    i0 = np.clip(np.floor((lo[query] - grid['origin']) / grid['cell_size']).astype(np.int64), 0, dims - 1)
+    i1 = np.clip(np.floor((hi[query] - grid['origin']) / grid['cell_size']).astype(np.int64), 0, dims - 1)
+
+    cells, owner = _expand_cell_ranges(i0, i1, dims)
+
+    #look up the occupied cells
+    pos = np.searchsorted(grid['keys'], cells)
+    pos = np.minimum(pos, len(grid['keys']) - 1)
+    found = grid['keys'][pos] == cells
+    pos = pos[found]
+    owner = owner[found]
+
+    counts = grid['ends'][pos] - grid['starts'][pos]
+    q_idx = np.repeat(query[owner], counts)
+    k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    g_idx = grid['tri_ids'][np.repeat(grid['starts'][pos], counts) + k]
+
+    #a pair can be found in several cells, only keep it once
+    n_grid = len(grid['tri_lo'])
+    pair_key = np.unique(q_idx * n_grid + g_idx)
+    q_idx = pair_key // n_grid
+    g_idx = pair_key % n_grid
+
+    #bounding box overlap test
+    overlap = np.all(hi[q_idx] >= grid['tri_lo'][g_idx], axis = 1) & np.all(lo[q_idx] <= grid['tri_hi'][g_idx], axis = 1)
+
+    return q_idx[overlap], g_idx[overlap]
+
+
+def segments_intersect_triangles(p0, p1, tri):
+
+    #Vectorized Moller-Trumbore test. p0, p1: (k x 3) segment end points, tri: (k x 3 x 3) triangles.
+    #Output: boolean array of length k
+
+    d = p1 - p0
+    e1 = tri[:, 1] - tri[:, 0]
+    e2 = tri[:, 2] - tri[:, 0]
+
+    h = np.cross(d, e2)
+    a = np.einsum('ij,ij->i', e1, h)
+
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        f = 1.0 / a
+        s = p0 - tri[:, 0]
+        u = f * np.einsum('ij,ij->i', s, h)
+        q = np.cross(s, e1)
+        v = f * np.einsum('ij,ij->i', d, q)
+        t = f * np.einsum('ij,ij->i', e2, q)
+
+        return (np.abs(a) > 1e-300) & (u >= 0) & (v >= 0) & (u + v <= 1) & (t >= 0) & (t <= 1)
+
+
+def triangles_intersect(tri_a, tri_b):
+
+    #Two (non-coplanar) triangles intersect if one of the edges of either triangle crosses the other triangle.
+    #tri_a, tri_b: (k x 3 x 3). Output: boolean array of length k
+
+    hit = np.zeros(len(tri_a), dtype = bool)
+
+    for first, second in [(tri_a, tri_b), (tri_b, tri_a)]:
+        for i, j in [(0, 1), (1, 2), (2, 0)]:
+            hit |= segments_intersect_triangles(first[:, i], first[:, j], second)
+
+    return hit
+
+
+def mesh_intersects_grid(grid, vertices, triangles, max_pairs_per_chunk = 200000):
+
+    '''
+    Checks whether a mesh (e.g., the moving child geometry in its current pose) intersects the gridded mesh.
+
+    Inputs:
+    - grid: output of build_triangle_grid
+    - vertices: (n x 3) float array, in the same coordinate system as the gridded mesh
+    - triangles: (m x 3) int array
+
+    Output: True if any pair of triangles intersects
+    '''
+
+    tri_verts = np.asarray(vertices, dtype = np.float64)[triangles]
+
+    q_idx, g_idx = candidate_pairs(grid, tri_verts)
+
+    for start in range(0, len(q_idx), max_pairs_per_chunk): #chunked to bound memory use, and to stop at the first intersection
+        q = q_idx[start:start + max_pairs_per_chunk]
+        g = g_idx[start:start + max_pairs_per_chunk]
+
+        if triangles_intersect(tri_verts[q], grid['tri_verts'][g]).any():
+            return True
+
+    return False
@@ -130,6 +130,12 @@ class MeshIntersectionCheckerOperator(Operator):
         else:
             self.result_message = mesh_1_name + " and " + mesh_2_name + " do not intersect with each other."
 
+        from .two_object_intersection_func import collision_object
+        proxies = [collision_object(x) for x in sel_meshes if collision_object(x) != x]
+        if proxies: #report the accuracy trade-off of the proxies that were used
+            max_deviation = max(x.get('collision_proxy_hausdorff_distance', 0) for x in proxies)
+            self.result_message += f" (Collision proxies used, max. deviation {max_deviation:.4g} m)"
+
         # Show popup after setting the message
         return context.window_manager.invoke_popup(self)
 
@@ -141,6 +147,160 @@ class MeshIntersectionCheckerOperator(Operator):
         
         return self.execute(context)
     
+class ArticularSpacingOperator(Operator):
+    bl_idname = "mesh.articular_spacing"
+    bl_label = "Select 2 meshes and compute the minimal distance between them for each frame (e.g. articular spacing during an XROMM trial). The results are written to a CSV file."
+    bl_description = "Select 2 meshes and compute the minimal distance between them for each frame (e.g. articular spacing during an XROMM trial). The results are written to a CSV file."
+
+    filepath: bpy.props.StringProperty(name="File Path",description="Filepath used for exporting the articular spacing time series", maxlen=1024, subtype='FILE_PATH',)
+    filter_glob: bpy.props.StringProperty(default="*.csv", options={'HIDDEN'}, maxlen=255)
+
+    def execute(self, context):
+
+        sel_meshes = [x for x in bpy.context.selected_objects if x.type == 'MESH']
+
+        if len(sel_meshes) != 2:
+            self.report({'ERROR'}, "You must select exactly 2 meshes to compute the articular spacing between them.")
+            return {'FINISHED'}
+
+        scene = bpy.context.scene
+        muskemo = scene.muskemo
+
+        if muskemo.articular_spacing_all_frames:
+            frames = range(scene.frame_start, scene.frame_end + 1)
+        else:
+            frames = [scene.frame_current]
+
+        from .articular_spacing_func import articular_spacing_time_series
+
+        obj_1, obj_2 = sel_meshes
+        rows = articular_spacing_time_series(obj_1, obj_2, frames, scene)
+
+        filepath = bpy.path.ensure_ext(self.filepath, '.csv')
+        delimiter = muskemo.delimiter if muskemo.delimiter else ','
+
+        import csv
+        with open(filepath, 'w', newline='') as file:
+            writer = csv.writer(file, delimiter = delimiter)
+            writer.writerow(["frame", "min_distance(m)",
+                             obj_1.name + "_x(m)", obj_1.name + "_y(m)", obj_1.name + "_z(m)",
+                             obj_2.name + "_x(m)", obj_2.name + "_y(m)", obj_2.name + "_z(m)"])
+            writer.writerows(rows)
+
+        min_row = min(rows, key = lambda row: row[1])
+        self.report({'INFO'}, f"Articular spacing of {len(rows)} frames written to {filepath}. Smallest distance: {min_row[1]} m at frame {min_row[0]}.")
+        return {'FINISHED'}
+
+    def invoke(self, context, event):
+
+        import os
+        model_export_dir = bpy.context.scene.muskemo.model_export_directory
+        default_filename = "articular_spacing.csv"
+
+        if model_export_dir:
+            self.filepath = os.path.join(os.path.split(model_export_dir)[0], default_filename)
+        else:
+            self.filepath = default_filename
+
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+    
+class WorkspaceEnvelopeOperator(Operator):
+    bl_idname = "mesh.workspace_envelope"
+    bl_label = "Select a point cloud mesh (e.g. the viable endpoint markers of a pose sampling analysis), and compute the volume and surface area of its convex hull and voxel envelope. The convex hull is added as a new mesh."
+    bl_description = "Select a point cloud mesh (e.g. the viable endpoint markers of a pose sampling analysis), and compute the volume and surface area of its convex hull and voxel envelope. The convex hull is added as a new mesh."
+    bl_options = {"UNDO"} #enable undoing
+
+    def execute(self, context):
+
+        sel_meshes = [x for x in bpy.context.selected_objects if x.type == 'MESH']
+
+        if len(sel_meshes) != 1:
+            self.report({'ERROR'}, "You must select exactly 1 mesh (a point cloud, e.g. the viable endpoint markers) to compute the workspace envelope.")
+            return {'FINISHED'}
+
+        obj = sel_meshes[0]
+        muskemo = bpy.context.scene.muskemo
+
+        #the original mesh data, so instanced marker spheres (geometry nodes) are not included
+        points = np.empty(len(obj.data.vertices) * 3, dtype = np.float32)
+        obj.data.vertices.foreach_get('co', points)
+        wm = np.array(obj.matrix_world)
+        points = points.reshape(-1, 3) @ wm[:3, :3].T + wm[:3, 3]
+
+        if len(points) < 4:
+            self.report({'ERROR'}, obj.name + " has less than 4 points. A workspace envelope requires at least 4 (non-coplanar) points.")
+            return {'FINISHED'}
+
+        from .workspace_envelope import (WorkspaceEnvelope, create_hull_object)
+
+        try:
+            envelope = WorkspaceEnvelope(muskemo.workspace_voxel_size)
+            envelope.add(points)
+        except ValueError as e:
+            self.report({'ERROR'}, str(e))
+            return {'FINISHED'}
+
+        summary = envelope.summary()
+
+        hull_obj = create_hull_object(obj.name + '_convex_hull', envelope.hull.vertices, envelope.hull.triangles,
+                                      obj.users_collection[0] if obj.users_collection else None)
+        hull_obj.display_type = 'WIRE'
+
+        for key, value in summary.items(): #store the results as custom properties of the hull
+            hull_obj['workspace_' + key] = value
+
+        self.report({'INFO'}, f"{obj.name}: convex hull volume {summary['convex_hull_volume']:.6g} m^3, area {summary['convex_hull_area']:.6g} m^2. " +
+                    f"Voxel envelope volume {summary['voxel_volume']:.6g} m^3, area {summary['voxel_area']:.6g} m^2.")
+        return {'FINISHED'}
+
+
+class CreateCollisionProxiesOperator(Operator):
+    bl_idname = "mesh.create_collision_proxies"
+    bl_label = "Create decimated collision proxies of the selected meshes. ROM and intersection checks automatically use the proxy instead of the full resolution mesh."
+    bl_description = "Create decimated collision proxies of the selected meshes. ROM and intersection checks automatically use the proxy instead of the full resolution mesh."
+    bl_options = {"UNDO"} #enable undoing
+
+    def execute(self, context):
+
+        sel_meshes = [x for x in bpy.context.selected_objects if x.type == 'MESH' and not x.get('collision_proxy_source')]
+
+        if not sel_meshes:
+            self.report({'ERROR'}, "No meshes selected. Select the meshes (e.g. GEOMETRY) you would like to create collision proxies for, and try again.")
+            return {'FINISHED'}
+
+        muskemo = bpy.context.scene.muskemo
+
+        from .collision_proxy_func import create_collision_proxy
+
+        for obj in sel_meshes:
+            proxy = create_collision_proxy(obj,
+                                           target_triangles = muskemo.collision_proxy_target_triangles,
+                                           max_hausdorff = muskemo.collision_proxy_max_hausdorff,
+                                           inflation = muskemo.collision_proxy_inflation)
+
+            self.report({'INFO'}, f"{obj.name}: collision proxy has {proxy['collision_proxy_triangle_ratio']*100:.3g}% of the triangles, " +
+                        f"estimated Hausdorff distance {proxy['collision_proxy_hausdorff_distance']:.4g} m")
+
+        return {'FINISHED'}
+
+
+class RemoveCollisionProxiesOperator(Operator):
+    bl_idname = "mesh.remove_collision_proxies"
+    bl_label = "Remove the collision proxies of the selected meshes."
+    bl_description = "Remove the collision proxies of the selected meshes."
+    bl_options = {"UNDO"} #enable undoing
+
+    def execute(self, context):
+
+        from .collision_proxy_func import remove_collision_proxy
+
+        for obj in [x for x in bpy.context.selected_objects if x.type == 'MESH' and not x.get('collision_proxy_source')]:
+            remove_collision_proxy(obj)
+
+        return {'FINISHED'}
+
+
 class MeshFromSelectionOperator(Operator):
     bl_idname = "mesh.mesh_from_selection"
     bl_label = "Mesh From Selected Portion"
@@ -1027,6 +1187,14 @@ class VIEW3D_PT_mesh_tools_panel(VIEW3D_PT_MuSkeMo,Panel):  # class naming conve
         row = self.layout.row()
         row.operator("mesh.intersection_checker", text = "Check for mesh intersections")
 
+        row = self.layout.row()
+        row.operator("mesh.articular_spacing", text = "Compute articular spacing")
+        row.prop(muskemo, "articular_spacing_all_frames")
+
+        row = self.layout.row()
+        row.operator("mesh.workspace_envelope", text = "Compute workspace envelope")
+        row.prop(muskemo, "workspace_voxel_size")
+
         if context.mode == 'EDIT_MESH':
             layout.operator(
                 "mesh.mesh_from_selection",
@@ -1099,6 +1267,43 @@ class VIEW3D_PT_mesh_alignment_subpanel(VIEW3D_PT_MuSkeMo,Panel):  # class namin
 
 
 
+class VIEW3D_PT_collision_proxy_subpanel(VIEW3D_PT_MuSkeMo,Panel):  # class naming convention ‘CATEGORY_PT_name’
+    #This panel inherits from the class VIEW3D_PT_MuSkeMo
+
+
+    bl_idname = 'VIEW3D_PT_collision_proxy_subpanel'
+    bl_label = "Collision proxies"  # found at the top of the Panel
+    bl_context = "objectmode"
+    bl_parent_id = "VIEW3D_PT_mesh_tools_panel"
+    bl_options = {'DEFAULT_CLOSED'}
+
+    def draw(self, context): 
+    
+        layout = self.layout
+        scene = context.scene
+        muskemo = scene.muskemo
+
+        layout.prop(muskemo, "use_collision_proxies")
+
+        row = layout.row()
+        row.operator("mesh.create_collision_proxies", text = "Create collision proxies")
+        row.operator("mesh.remove_collision_proxies", text = "Remove collision proxies")
+
+        layout.prop(muskemo, "collision_proxy_target_triangles")
+        layout.prop(muskemo, "collision_proxy_max_hausdorff")
+        layout.prop(muskemo, "collision_proxy_inflation")
+
+        #accuracy of the proxy of the active object
+        obj = context.active_object
+        if obj is not None:
+            proxy = bpy.data.objects.get(obj.get('collision_proxy', '')) if not obj.get('collision_proxy_source') else obj
+            if proxy is not None:
+                box = layout.box()
+                box.label(text = "Proxy: " + proxy.name)
+                box.label(text = f"Triangle ratio: {proxy.get('collision_proxy_triangle_ratio', 0)*100:.3g}%")
+                box.label(text = f"Hausdorff distance: {proxy.get('collision_proxy_hausdorff_distance', 0):.4g} m")
+
+
 class VIEW3D_PT_geom_primitive_fitting_subpanel(VIEW3D_PT_MuSkeMo,Panel):  # class naming convention ‘CATEGORY_PT_name’
     #This panel inherits from the class VIEW3D_PT_MuSkeMo
 
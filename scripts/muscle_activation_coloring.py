@@ -0,0 +1,113 @@
+import bpy
+import colorsys
+
+# Activation-driven muscle colouring.
+# Each muscle has a single animated 'activation' custom property (frame 0, the rest pose, is fully activated).
+# All muscle materials share one shader node group that reads the activation of the object being rendered (Attribute node, Object type),
+# and maps it onto the saturation of the muscle colour, between the baseline saturation and 1.
+# The viewport display colour (workbench renderer) is set by drivers on each material's diffuse_color, which read the same
+# activation property and the baseline saturation of the shared node group. So importing a trajectory only writes one F-curve per muscle,
+# and changing the baseline saturation in the node group recolours all muscles.
+
+activation_property_name = 'activation'
+activation_node_group_name = 'MuSkeMo activation saturation'
+activation_map_node_name = 'Activation to saturation'
+activation_group_node_name = 'Activation saturation' #name of the group node in each muscle material
+
+
+def get_activation_node_group(baseline_saturation = None):
+
+    #returns the shared node group (creates it if needed). If baseline_saturation is given, it is updated in the group
+
+    node_group = bpy.data.node_groups.get(activation_node_group_name)
+
+    if node_group is None:
+        node_group = bpy.data.node_groups.new(activation_node_group_name, 'ShaderNodeTree')
+        node_group.interface.new_socket(name = 'Saturation', in_out = 'OUTPUT', socket_type = 'NodeSocketFloat')
+
+        attribute = node_group.nodes.new('ShaderNodeAttribute')
+        attribute.attribute_type = 'OBJECT'
+        attribute.attribute_name = activation_property_name
+        attribute.location = (-400, 0)
+
+        map_range = node_group.nodes.new('ShaderNodeMapRange')
+        map_range.name = activation_map_node_name
+        map_range.clamp = True
+        map_range.inputs['From Min'].default_value = 0
+        map_range.inputs['From Max'].default_value = 1
+        map_range.inputs['To Max'].default_value = 1
+        map_range.inputs['To Min'].default_value = 0.25
+
+        group_output = node_group.nodes.new('NodeGroupOutput')
+        group_output.location = (250, 0)
+
+        node_group.links.new(attribute.outputs['Fac'], map_range.inputs['Value'])
+        node_group.links.new(map_range.outputs['Result'], group_output.inputs['Saturation'])
+
+    if baseline_saturation is not None:
+        node_group.nodes[activation_map_node_name].inputs['To Min'].default_value = baseline_saturation
+
+    return node_group
+
+
+def setup_activation_coloring(muscle, mat, nodename, node_group):
+
+    '''
+    Connects a muscle material to the shared activation node group, and adds the viewport colour drivers.
+
+    Inputs:
+    - muscle: the MuSkeMo MUSCLE object (its material has the same name)
+    - mat: the muscle material
+    - nodename: name of the Hue/Saturation/Value node in the material (depends on the Blender version)
+    - node_group: output of get_activation_node_group
+    '''
+
+    if activation_property_name not in muscle:
+        muscle[activation_property_name] = 1.0
+        muscle.id_properties_ui(activation_property_name).update(min = 0.0, description = "Muscle activation, used for the muscle colour")
+
+    ## rendered materials
+    node_tree = mat.node_tree
+    group_node = node_tree.nodes.get(activation_group_node_name)
+    if group_node is None:
+        group_node = node_tree.nodes.new('ShaderNodeGroup')
+        group_node.name = activation_group_node_name
+        group_node.location = (node_tree.nodes[nodename].location.x - 250, node_tree.nodes[nodename].location.y - 150)
+
+    group_node.node_tree = node_group
+    node_tree.links.new(group_node.outputs['Saturation'], node_tree.nodes[nodename].inputs['Saturation'])
+
+    ## viewport display colour. For a fixed hue and value, each RGB channel is linear in the saturation:
+    ## channel = v - saturation * (v - fully_saturated_channel)
+    if 'activation_base_color' not in mat: #the colour before any activation colouring, so re-imports start from the same colour
+        mat['activation_base_color'] = list(mat.diffuse_color)
+
+    r, g, b, a = mat['activation_base_color']
+    h, s, v = colorsys.rgb_to_hsv(r, g, b)
+    full = colorsys.hsv_to_rgb(h, 1, v)
+
+    baseline_path = f'nodes["{activation_map_node_name}"].inputs["To Min"].default_value'
+
+    for index in range(3):
+        mat.driver_remove('diffuse_color', index)
+        driver = mat.driver_add('diffuse_color', index).driver
+        driver.type = 'SCRIPTED'
+
+        act = driver.variables.new()
+        act.name = 'act'
+        act.type = 'SINGLE_PROP'
+        act.targets[0].id_type = 'OBJECT'
+        act.targets[0].id = muscle
+        act.targets[0].data_path = f'["{activation_property_name}"]'
+
+        base = driver.variables.new()
+        base.name = 'base'
+        base.type = 'SINGLE_PROP'
+        base.targets[0].id_type = 'NODETREE'
+        base.targets[0].id = node_group
+        base.targets[0].data_path = baseline_path
+
+        #simple expression (no python), so it also runs if auto-run scripts is disabled
+        driver.expression = f"{v:.6f} - ({v - full[index]:.6f})*(base + (1 - base)*min(max(act, 0), 1))"
+
+    mat.diffuse_color[3] = a
@@ -298,7 +298,8 @@ class InsertMusclePointOperator(Operator):
                         
         #Ensure the last two modifiers are always the Visualization and then the bevel modifier
         n_modifiers = len(obj.modifiers)
-        obj.modifiers.move(n_modifiers-1, insert_after) #new modifiers are placed at the end, index is n_modifiers-1. Place it at the index of the last curve point.
+        n_hooks = len([x for x in obj.modifiers if x.type == 'HOOK'])
+        obj.modifiers.move(n_modifiers-1, n_hooks-1) #new modifiers are placed at the end, index is n_modifiers-1. Place it after the other hooks (muscles can have one hook per point, or one per body).
 
         ### restore selection state
         bpy.context.view_layer.objects.active = active_obj
@@ -664,6 +664,33 @@ class MuSkeMoProperties(PropertyGroup):
         default = True,
     )
 
+    share_geometry_meshes: BoolProperty(
+        name = 'Share geometry meshes',
+        description='If several bodies use the same geometry file, their geometry objects share one mesh (instead of each having a copy). Saves memory and file size. Editing the mesh of one of them changes all of them',
+        default = False,
+    )
+
+    use_geometry_cache: BoolProperty(
+        name = 'Use geometry cache',
+        description='Store parsed geometry files (obj, vtp, stl, ply) on disk, so re-importing a model with the same geometry skips parsing. Changed files are detected by their contents',
+        default = True,
+    )
+
+    geometry_cache_directory: StringProperty(
+        name = "Geometry cache directory",
+        description="Directory for the geometry cache. If empty, a MuSkeMo_geometry_cache folder in the temporary directory of the system is used",
+        default = "",
+        maxlen = 1024,
+        subtype = 'DIR_PATH',
+        )
+
+    geometry_cache_size: IntProperty(
+        name = 'Cache size (MB)',
+        description='Maximum size of the geometry cache. When it is full, the least recently used geometry is removed',
+        default = 1024,
+        min = 1,
+    )
+
     enable_wrapping_on_import: BoolProperty(
         name = 'Enable wrapping during import (Cylinders)',
         description='Enable cylinder wrapping for imported muscles. It may be required to manually tune the parameters after import.',
@@ -966,6 +993,53 @@ class MuSkeMoProperties(PropertyGroup):
         precision = 2,
     )
 
+    trajectory_playback_mode: EnumProperty(
+        name="Playback mode",
+        description="Keyframes: bake every frame of the trajectory into keyframes. Stream: keep the trajectory in memory-mapped files next to the trajectory file, and pose the model on demand when the frame changes. Streaming keeps the .blend file small for long simulations, and can be baked to keyframes later (e.g. for rendering)",
+        items=[ ('Keyframes', "Keyframes", "Bake every frame into keyframes"),
+                ('Stream', "Stream", "Pose the model on demand from memory-mapped files"),
+              ],
+        default = "Keyframes",
+        )
+
+    trajectory_trial_mode: EnumProperty(
+        name="Trials as",
+        description="How multiple imported trajectories (trials) are stored. NLA strips: one NLA track per trial, the inactive trials are muted. Actions: one action per trial, the active trial's action is assigned",
+        items=[ ('NLA', "NLA strips", "One NLA track per trial"),
+                ('Actions', "Separate actions", "One action per trial"),
+              ],
+        default = "NLA",
+        )
+
+    muscle_analysis_moment_arms: BoolProperty(
+        name="Include moment arms",
+        description="Also compute the moment arms of all muscles about all rotational coordinates (two extra evaluations per coordinate per frame). Only muscles that cross the coordinate's joint are written",
+        default = True,
+    )
+
+    reduce_keyframes: BoolProperty(
+        name="Reduce keyframes",
+        description="Only keep the keyframes that are needed to follow the trajectory within the tolerances (linear interpolation between the remaining keyframes). Nearly constant or smoothly varying channels then need far fewer keyframes",
+        default = False,
+    )
+
+    keyframe_reduction_tolerance_translation: FloatProperty(
+        name="Translation tolerance (m)",
+        description="Maximum deviation of the reduced joint translation curves from the trajectory, in meters",
+        default = 0.0001,
+        min = 0,
+        precision = 5,
+        step = 0.001,
+    )
+
+    keyframe_reduction_tolerance_rotation: FloatProperty(
+        name="Rotation tolerance (deg)",
+        description="Maximum deviation of the reduced joint rotation curves from the trajectory, in degrees",
+        default = 0.05,
+        min = 0,
+        precision = 3,
+    )
+
     ############### Global properties panel
 
     left_side_string: StringProperty(
@@ -1128,3 +1202,45 @@ class MuSkeMoProperties(PropertyGroup):
         min=1,
         max=99
     )
+
+    articular_spacing_all_frames: BoolProperty(
+        name="All frames",
+        description = "Compute the articular spacing for every frame in the scene's frame range (e.g. an XROMM trial). If False, only the current frame is used.",
+        default=True,
+    )
+
+    workspace_voxel_size: FloatProperty(
+        name="Voxel size",
+        description = "Edge length (in meters) of the voxels of the workspace voxel envelope. Smaller voxels follow the point cloud more closely, but the point cloud must be dense enough to fill them.",
+        default=0.01,
+        precision=4,
+        min=1e-6,
+    )
+
+    use_collision_proxies: BoolProperty(
+        name="Use collision proxies",
+        description = "Intersection checks and ROM analyses use the decimated collision proxy of a mesh instead of the full resolution mesh, if it has one",
+        default=True,
+    )
+
+    collision_proxy_target_triangles: IntProperty(
+        name="Target triangles",
+        description = "Number of triangles of each collision proxy",
+        default=5000,
+        min=4,
+    )
+
+    collision_proxy_max_hausdorff: FloatProperty(
+        name="Max. Hausdorff distance",
+        description = "If larger than 0, the number of triangles is increased until the (estimated) Hausdorff distance between the proxy and the source mesh is below this tolerance, in meters",
+        default=0.0,
+        precision=5,
+        min=0.0,
+    )
+
+    collision_proxy_inflation: FloatProperty(
+        name="Inflation",
+        description = "Offset of the proxy surface along the vertex normals (in meters). Positive values make intersection checks conservative",
+        default=0.0,
+        precision=5,
+    )
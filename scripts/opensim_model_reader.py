@@ -0,0 +1,504 @@
+import xml.etree.ElementTree as ET
+import numpy as np
+from collections import defaultdict
+
+# Single-pass reader for OpenSim 4.0+ model files (.osim), for ImportOpenSimModel.
+# The file is streamed with iterparse. Each component in one of the model sets (OpenSimDocument/Model/<Set>/objects/<component>)
+# is parsed as soon as its end tag is read, and then removed from the tree, so the full ElementTree of large models
+# (thousands of path points, SimmSpline-based moving points) is never held in memory.
+# Components are stored in dicts by name, and the joints are also indexed by parent body,
+# so that the importer doesn't have to loop over all joints for every joint or frame.
+# This file doesn't import bpy and doesn't use relative imports, so it can also be used from worker threads and the utility scripts.
+
+
+class _SanitizedFile:
+
+    # OpenSim filespec allows :: in the tag names, which isn't allowed by the standard xml filespec.
+    # Those tags are replaced while streaming the file. For now, this is only relevant for HuntCrossleyForce
+    # (HuntCrossleyForce::ContactParametersSet and HuntCrossleyForce::ContactParameters).
+
+    old = b'HuntCrossleyForce::'
+    new = b'HuntCrossleyForce_'
+
+    def __init__(self, file):
+
+        self.file = file
+        self.tail = b'' #end of the previous chunk that could be the start of a split tag
+
+    def read(self, size = -1):
+
+        keep = len(self.old) - 1 #hold back the end of the data, in case a tag is split between chunks
+        data = self.tail
+
+        while len(data) <= keep: #an empty return value means the end of the file, so read until there is something to return
+            chunk = self.file.read(size)
+            if not chunk: #end of the file
+                self.tail = b''
+                return data.replace(self.old, self.new)
+            data += chunk
+
+        data = data.replace(self.old, self.new)
+        self.tail = data[-keep:]
+        return data[:-keep]
+
+
+def _vector(element):
+
+    return tuple(map(float, element.text.split()))
+
+
+def _body_socket(socket):
+
+    #body name from a socket path, e.g. '/bodyset/femur_r' -> 'femur_r'. Ground is called 'ground'
+
+    body = socket.split('/bodyset/')[-1]
+    if body == '/ground':
+        body = 'ground'
+    return body
+
+
+def parse_body(body):
+
+    mass = float(body.find('mass').text)
+
+    # Check if mass_center exists
+    mass_center_element = body.find('mass_center')
+    mass_center = _vector(mass_center_element) if mass_center_element is not None else (0, 0, 0)
+
+    # Check if inertia exists
+    inertia_element = body.find('inertia')
+    inertia = _vector(inertia_element) if inertia_element is not None else None
+
+    geometries = []
+
+    # First, try to find PhysicalOffsetFrames, if they exist
+    components = body.find('components')
+    if components is not None:
+        for offset_frame in components.findall('PhysicalOffsetFrame'):
+            attached_geometry = offset_frame.find('attached_geometry')
+            if attached_geometry is not None:
+                for mesh in attached_geometry.findall('Mesh'):
+                    scale_elem = mesh.find('scale_factors')
+
+                    geometries.append({
+                        'mesh_file': mesh.find('mesh_file').text.strip(),
+                        'translation': offset_frame.find('translation').text,
+                        'orientation': offset_frame.find('orientation').text,
+                        'scale_factors': list(map(float, scale_elem.text.strip().split())) if scale_elem is not None else [1.0, 1.0, 1.0],
+                    })
+
+    # If no PhysicalOffsetFrame exists, check directly within the Body
+    if not geometries:
+        attached_geometry = body.find('attached_geometry')
+        if attached_geometry is not None:
+            for mesh in attached_geometry.findall('Mesh'):
+                scale_elem = mesh.find('scale_factors')
+
+                geometries.append({
+                    'mesh_file': mesh.find('mesh_file').text.strip(),
+                    'scale_factors': list(map(float, scale_elem.text.strip().split())) if scale_elem is not None else [1.0, 1.0, 1.0],
+                })
+
+    # Wrap Object Set (handle any wrap object type)
+    wrap_objects = []
+    wrap_object_set = body.find('WrapObjectSet')
+    if wrap_object_set is not None:
+        for wrap_object in wrap_object_set.find('objects').findall('*'):  # Get all wrap object types
+            wrap_data = {
+                'type': wrap_object.tag,  # Save the type of the wrap object (e.g., WrapCylinder, WrapSphere, etc.)
+                'name': wrap_object.get('name')
+            }
+
+            # Collect all child elements of the wrap object dynamically
+            for child in wrap_object:
+                # Handle scalar and vector types
+                value = child.text.strip() if child.text else None
+                if value is not None:
+                    if value.lower() in ['true', 'false']:  # Handle boolean values
+                        wrap_data[child.tag] = value.lower() == 'true'
+                    else:
+                        try:
+                            # Try to convert to float (for numbers)
+                            wrap_data[child.tag] = float(value)
+                        except ValueError:
+                            # If it cannot be converted, store it as a string or tuple
+                            if ' ' in value:
+                                wrap_data[child.tag] = tuple(map(float, value.split()))  # Handle vectors
+                            else:
+                                wrap_data[child.tag] = value  # Store as string if it's not a number
+
+                # Special case for Appearance
+                if child.tag == 'Appearance':
+                    appearance = {}
+                    for appearance_child in child:
+                        if appearance_child.tag == 'color':
+                            appearance['color'] = _vector(appearance_child)
+                        elif appearance_child.tag == 'opacity':
+                            appearance['opacity'] = float(appearance_child.text)
+                        elif appearance_child.tag == 'SurfaceProperties':
+                            appearance['representation'] = appearance_child.find('representation').text
+                    wrap_data['appearance'] = appearance
+
+            wrap_objects.append(wrap_data)
+
+    return {
+        'mass': mass,
+        'mass_center': mass_center,
+        'inertia': inertia,
+        'geometries': geometries,
+        'wrap_objects': wrap_objects  # Modular wrap object data
+    }
+
+
+def parse_joint(joint):
+
+    '''
+    Output: joint data dict, and a bool that is True if the socket_parent_frame or socket_child_frame names were not consistent
+    with the names of the PhysicalOffsetFrames defined in the joint.
+    '''
+
+    joint_name = joint.get('name')
+    inconsistent_frames = False
+
+    # Extract parent and child frames
+    parent_frame = joint.find('socket_parent_frame').text.strip()
+    child_frame = joint.find('socket_child_frame').text.strip()
+
+    parent_body = None
+    child_body = None
+
+    # Extract frames within the joint
+    frames_data = []
+    frames = joint.find('frames')
+    if frames is not None: #if there are frames defined
+        for idx, frame in enumerate(frames.findall('PhysicalOffsetFrame')):
+            frame_name = frame.get('name')
+            socket_parent = frame.find('socket_parent').text.strip()
+
+            # Match parent_frame and child_frame with frame_name to get the parent and child bodies
+            if frame_name == parent_frame:
+                parent_body = _body_socket(socket_parent)
+
+            if frame_name == child_frame:
+                child_body = socket_parent.split('/bodyset/')[-1]
+
+            #if the joint has inconsistent definitions between socket_parent or socket_child and the actual PhysicalOffsetFrame names,
+            #we assume the PhysicalOffsetFrame is the correct frame (first is the parent, second is the child), and the importer throws a warning
+            if (frame_name != parent_frame and frame_name != child_frame):
+                if idx == 0:
+                    parent_body = _body_socket(socket_parent)
+                    parent_frame = frame_name
+                    inconsistent_frames = True
+
+                elif idx == 1:
+                    child_body = socket_parent.split('/bodyset/')[-1]
+                    child_frame = frame_name
+                    inconsistent_frames = True
+
+            frames_data.append({
+                'frame_name': frame_name,
+                'translation': _vector(frame.find('translation')),
+                'orientation': _vector(frame.find('orientation')),
+                'socket_parent': socket_parent
+            })
+
+    else: #if there are no frames defined in the joint, assume socket_parent_frame and child are the bodies themselves
+        #and that the positions and orientations are both zero
+
+        print(joint_name + ' has no frames defined. Automatically creating them. This may cause inconsistencies.')
+
+        parent_body = _body_socket(parent_frame)
+        parent_frame = parent_body + '_offset' #opensim naming convention
+
+        child_body = child_frame.split('/bodyset/')[-1]
+        child_frame = child_body + '_offset'
+
+        for frame_name, socket_parent in [(parent_frame, parent_body), (child_frame, child_body)]:
+            frames_data.append({
+                'frame_name': frame_name,
+                'translation': (0.0, 0.0, 0.0),
+                'orientation': (0.0, 0.0, 0.0),
+                'socket_parent': socket_parent
+            })
+
+    # Extract coordinates if any
+    coordinates = []
+    coords_element = joint.find('coordinates')
+    if coords_element is not None:
+        coordinates = [coord.get('name') for coord in coords_element.findall('Coordinate')]
+
+    # Extract spatial transform data if present
+    spatial_transform = []
+    spatial_transform_element = joint.find('SpatialTransform')
+    if spatial_transform_element is not None:
+        for axis in spatial_transform_element.findall('TransformAxis'):
+            axis_coordinates_element = axis.find('coordinates')
+            axis_coordinates = axis_coordinates_element.text.strip() if axis_coordinates_element is not None and axis_coordinates_element.text is not None else None
+
+            # Check if the transform axis has a LinearFunction and extract its coefficients
+            transform_function = axis.find('LinearFunction')
+            coefficients = None
+            if transform_function is not None:
+                coefficients = _vector(transform_function.find('coefficients'))
+                if coefficients != (1.0, 0.0):
+                    print(f"Warning: Joint '{joint_name}' has a transform function that MuSkeMo may not support. Treating as regular joint.")
+
+            spatial_transform.append({
+                'axis_name': axis.get('name'),
+                'axis_coordinates': axis_coordinates,
+                'axis_vector': _vector(axis.find('axis')),
+                'coefficients': coefficients
+            })
+
+    joint_data = {
+        'joint_type': joint.tag,
+        'parent_frame': parent_frame,
+        'child_frame': child_frame,
+        'parent_body': parent_body,
+        'child_body': child_body,
+        'frames_data': frames_data,
+        'coordinates': coordinates,
+        'spatial_transform': spatial_transform
+    }
+
+    return joint_data, inconsistent_frames
+
+
+def _y_for_x_zero(point, location_tag):
+
+    '''
+    Extracts the y-value of a MovingPathPoint SimmSpline where the x input (corresponding to the joint coordinate) is zero.
+    location_tag is x_location, y_location or z_location. Returns None if the location is not a (scaled) SimmSpline.
+    '''
+
+    location_elem = point.find(location_tag)
+    if location_elem is None:
+        return None
+
+    #assumes the simmspline is always within a multiplier function with scale. If this is not correct, add the alternative in the future.
+    multiplier_function = location_elem.find('.//MultiplierFunction')
+    if multiplier_function is None:
+        return None
+
+    scale_element = multiplier_function.find('.//scale')
+    scale = float(scale_element.text.strip()) if scale_element is not None else 1.0
+
+    simm_spline = multiplier_function.find('.//SimmSpline')
+    if simm_spline is None:
+        return None
+
+    x_values = np.array(_vector(simm_spline.find('x')))
+    y_values = np.array(_vector(simm_spline.find('y')))
+
+    zero_index = np.flatnonzero(x_values == 0)
+    if zero_index.size:
+        return scale*float(y_values[zero_index[0]])
+
+    # Linear interpolation between the two x-values that bridge 0
+    bridge = np.flatnonzero((x_values[:-1] < 0) & (x_values[1:] > 0))
+    if bridge.size:
+        i = bridge[0]
+        x1, x2 = x_values[i], x_values[i + 1]
+        y1, y2 = y_values[i], y_values[i + 1]
+        return scale*float(y1 + (0 - x1) * (y2 - y1) / (x2 - x1))
+
+    return None
+
+
+def parse_muscle(muscle, flags):
+
+    '''
+    Inputs: muscle element, and the dict with the 'conditional_pathpoint_flag' and 'moving_pathpoint_flag' (set to True
+    if the muscle has ConditionalPathPoints or MovingPathPoints, so the importer can display a warning).
+    '''
+
+    def get_float(tag, default = 0.0):
+        element = muscle.find(tag)
+        return float(element.text) if element is not None else default
+
+    path_points_data = []
+    path_wrap_data = []
+
+    geometry_path = muscle.find('GeometryPath')
+    if geometry_path is not None:
+        path_points = geometry_path.find('PathPointSet/objects')
+        if path_points is not None:
+            for point in path_points:  # Iterate over all child elements
+                parent_frame = point.find('socket_parent_frame').text.strip()
+
+                if point.tag == 'PathPoint' or point.tag == 'ConditionalPathPoint':  # ConditionalPathPoints are converted to regular PathPoints
+                    location = _vector(point.find('location'))
+
+                    if point.tag == 'ConditionalPathPoint':
+                        flags['conditional_pathpoint_flag'] = True
+
+                elif point.tag == 'MovingPathPoint': #the position of the point when the associated joint coordinate is 0
+                    flags['moving_pathpoint_flag'] = True
+
+                    location = tuple(_y_for_x_zero(point, tag) for tag in ['x_location', 'y_location', 'z_location'])
+
+                else:
+                    continue
+
+                if None not in location: #only if all the points actually exist
+                    path_points_data.append({
+                        'point_name': point.get('name'),
+                        'parent_frame': parent_frame,
+                        'location': location
+                    })
+
+        wrap_objects = geometry_path.find('PathWrapSet/objects')
+        if wrap_objects is not None:
+            for wrap in wrap_objects.findall('PathWrap'):
+                path_wrap_data.append({
+                    'wrap_name': wrap.get('name'),
+                    'wrap_object': wrap.find('wrap_object').text.strip()
+                })
+
+    return {
+        'muscle_type': muscle.tag,
+        'tendon_slack_length': get_float('tendon_slack_length'),
+        'F_max': get_float('max_isometric_force'),
+        'optimal_fiber_length': get_float('optimal_fiber_length'),
+        'pennation_angle': np.rad2deg(get_float('pennation_angle_at_optimal')),
+        'path_points_data': path_points_data,
+        'path_wrap_data': path_wrap_data
+    }
+
+
+def parse_contact(contact_geometry):
+
+    socket_frame = contact_geometry.find('socket_frame')
+    location = contact_geometry.find('location')
+    orientation = contact_geometry.find('orientation')
+    radius = contact_geometry.find('radius')
+
+    return {
+        'geometry_type': contact_geometry.tag,
+        'socket_frame': socket_frame.text.strip() if socket_frame is not None else None,
+        'location': _vector(location) if location is not None else (0.0, 0.0, 0.0),
+        'orientation': _vector(orientation) if orientation is not None else (0.0, 0.0, 0.0),
+        'radius': float(radius.text) if contact_geometry.tag == 'ContactSphere' and radius is not None else None  # None for geometries without a radius
+    }
+
+
+def parse_marker(marker):
+
+    socket_parent_frame = marker.find('socket_parent_frame')
+    location = marker.find('location')
+
+    return {
+        'socket_parent_frame': socket_parent_frame.text.strip() if socket_parent_frame is not None else None,
+        'location': _vector(location) if location is not None else (0.0, 0.0, 0.0),
+    }
+
+
+def rename_duplicate_child_frames(joint_data, joints_by_parent_body):
+
+    '''
+    Renames child frames that are used by more than one joint to <child_body>_offset_renamed, in the joints themselves and as
+    the parent frame of the joints that have that child body as their parent body.
+    Output: list of the original names of the renamed frames.
+    '''
+
+    frame_usage = defaultdict(list)
+    for joint_name, joint in joint_data.items():
+        frame_usage[joint['child_frame']].append(joint_name)
+
+    renamed_original_frames = []
+    for duplicate_frame, joint_names in frame_usage.items():
+        if len(joint_names) < 2:
+            continue
+
+        renamed_original_frames.append(duplicate_frame)
+        for joint_name in joint_names:
+            joint = joint_data[joint_name]
+            child_body = joint['child_body']
+            new_frame_name = child_body + '_offset_renamed'
+
+            #frames_data: first is the parent, second is the child
+            joint['child_frame'] = new_frame_name
+            joint['frames_data'][1]['frame_name'] = new_frame_name
+
+            for other_joint_name in joints_by_parent_body.get(child_body, []):
+                other_joint = joint_data[other_joint_name]
+                other_joint['parent_frame'] = new_frame_name
+                other_joint['frames_data'][0]['frame_name'] = new_frame_name
+
+    return renamed_original_frames
+
+
+def read_opensim_model(filepath):
+
+    '''
+    Reads an OpenSim model in a single streaming pass.
+
+    Output: dict with
+    - 'body_data', 'joint_data', 'contact_data', 'marker_data': component data dicts by name
+    - 'muscle_data': muscle data dicts by name, and the 'conditional_pathpoint_flag' and 'moving_pathpoint_flag' bools
+    - 'joints_by_parent_body': joint names per parent body name (in file order)
+    - 'inconsistent_frame_joints': names of joints with inconsistent socket frames (see parse_joint)
+    - 'renamed_frames': names of duplicate child frames that were renamed (see rename_duplicate_child_frames)
+    '''
+
+    body_data = {}
+    joint_data = {}
+    muscle_data = {'conditional_pathpoint_flag': False, 'moving_pathpoint_flag': False}
+    contact_data = {}
+    marker_data = {}
+    inconsistent_frame_joints = []
+
+    flags = muscle_data #parse_muscle sets the pathpoint flags in here
+
+    stack = [] #currently open elements. The component sets are at OpenSimDocument/Model/<Set>/objects/<component>
+
+    with open(filepath, 'rb') as file:
+        for event, element in ET.iterparse(_SanitizedFile(file), events = ('start', 'end')):
+
+            if event == 'start':
+                stack.append(element)
+                continue
+
+            stack.pop()
+            depth = len(stack)
+
+            if depth == 4 and stack[3].tag == 'objects':
+                set_tag = stack[2].tag
+                name = element.get('name')
+
+                if set_tag == 'BodySet':
+                    body_data[name] = parse_body(element)
+
+                elif set_tag == 'JointSet':
+                    joint_data[name], inconsistent_frames = parse_joint(element)
+                    if inconsistent_frames:
+                        inconsistent_frame_joints.append(name)
+
+                elif set_tag == 'ForceSet' and element.tag.endswith('Muscle'):
+                    muscle_data[name] = parse_muscle(element, flags)
+
+                elif set_tag == 'ContactGeometrySet':
+                    contact_data[name] = parse_contact(element)
+
+                elif set_tag == 'MarkerSet':
+                    marker_data[name] = parse_marker(element)
+
+            if 1 <= depth <= 4: #components and everything else in the model (ground, credits, other sets) are discarded once read
+                stack[-1].remove(element)
+
+    joints_by_parent_body = defaultdict(list)
+    for joint_name, joint in joint_data.items():
+        joints_by_parent_body[joint['parent_body']].append(joint_name)
+
+    renamed_frames = rename_duplicate_child_frames(joint_data, joints_by_parent_body)
+
+    return {
+        'body_data': body_data,
+        'joint_data': joint_data,
+        'muscle_data': muscle_data,
+        'contact_data': contact_data,
+        'marker_data': marker_data,
+        'joints_by_parent_body': dict(joints_by_parent_body),
+        'inconsistent_frame_joints': inconsistent_frame_joints,
+        'renamed_frames': renamed_frames,
+    }
@@ -0,0 +1,246 @@
+import numpy as np
+import json
+import os
+
+# Append-only, on-disk store for long pose sampling runs.
+# The pose grid is split into fixed-size chunks of consecutive (flat) pose indices. Each completed chunk is written
+# to its own .npz file, and a manifest (manifest.json) records the grid definition and which chunks are complete.
+# A rerun with the same grid definition only evaluates the missing chunks, and the results of a running analysis
+# can be loaded at any time with load_results.
+
+# Once a run is complete (or whenever you want to look at the results), the chunks are consolidated into one compact
+# .npy file per column (pose, viability, soft tissue constraint lengths, landmark position) that is opened memory-mapped, see open_results.
+# Which chunks the columns contain is recorded in the columns folder (consolidated.json). Only write_chunk writes the manifest,
+# so consolidating while a run is still going can't undo the run's own updates.
+# This replaces keyframing every pose, so million-sample runs stay cheap to save and load. Individual poses can be
+# shown in the scene on demand with pose_sampling_geometry_func.apply_pose_sample.
+
+# Files are written to a temporary name first and then renamed, so a crash never leaves a half-written chunk or manifest behind.
+# This file doesn't import bpy and doesn't use relative imports, so it can be used from the 'MuSkeMo utilities' scripts.
+
+situation_names = ["viable", "soft_tissue_non_viable", "skeletally_non_viable"] #stored as integer codes (index in this list)
+
+manifest_filename = 'manifest.json'
+columns_folder_name = 'columns' #consolidated column files
+consolidated_filename = 'consolidated.json' #in the columns folder, the chunks that were consolidated
+
+#compact storage types of the consolidated columns. Other columns keep their original type
+column_dtypes = {
+    'index': np.int64,
+    'pose': np.float64,
+    'situation': np.uint8,
+    'soft_tissue_lengths': np.float32,
+    'landmark': np.float32,
+}
+
+
+def grid_shape(grid_definition):
+
+    return tuple(len(values) for values in grid_definition['axis_values'])
+
+
+def grid_size(grid_definition):
+
+    return int(np.prod(grid_shape(grid_definition)))
+
+
+def poses_from_flat_indices(grid_definition, indices):
+
+    #Converts flat pose indices to pose vectors (n x n_axes). The first axis varies slowest, as in nested for loops.
+
+    axis_values = [np.asarray(values, dtype = float) for values in grid_definition['axis_values']]
+    subscripts = np.unravel_index(np.asarray(indices, dtype = np.int64), grid_shape(grid_definition))
+
+    return np.column_stack([values[sub] for values, sub in zip(axis_values, subscripts)])
+
+
+def chunk_indices(manifest, chunk_id):
+
+    #flat pose indices that belong to a chunk
+
+    start = chunk_id * manifest['chunk_size']
+    stop = min(start + manifest['chunk_size'], manifest['n_poses'])
+
+    return np.arange(start, stop)
+
+
+def _write_json_atomic(path, data):
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as file:
+        json.dump(data, file, indent = 1)
+    os.replace(tmp_path, path)
+
+
+def open_pose_sample_store(directory, grid_definition, chunk_size = 1000):
+
+    '''
+    Opens (or creates) a pose sample store.
+
+    Inputs:
+    - directory (string). Folder that holds the manifest and chunk files. Created if it doesn't exist.
+    - grid_definition (dict). Must contain 'axis_names' (list of strings) and 'axis_values' (list of lists of floats, one per axis).
+      Any other JSON-serializable settings that affect the results (joint name, thresholds, etc.) can be added,
+      and a store is only resumed if its grid definition matches exactly.
+    - chunk_size (int). Number of poses per chunk.
+
+    Output: the manifest (dict). If the existing store has a different grid definition, a ValueError is raised.
+    '''
+
+    os.makedirs(directory, exist_ok = True)
+    manifest_path = os.path.join(directory, manifest_filename)
+
+    #round trip through JSON, so the comparison with an existing manifest is not affected by tuples vs lists, numpy floats, etc.
+    grid_definition = json.loads(json.dumps(grid_definition, default = float))
+
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as file:
+            manifest = json.load(file)
+
+        if manifest['grid_definition'] != grid_definition or manifest['chunk_size'] != chunk_size:
+            raise ValueError(f"The pose sample store in '{directory}' was created with different settings. Use a different output folder, or delete the existing one to start over.")
+
+        return manifest
+
+    manifest = {
+        'grid_definition': grid_definition,
+        'chunk_size': chunk_size,
+        'n_poses': grid_size(grid_definition),
+        'n_chunks': int(np.ceil(grid_size(grid_definition) / chunk_size)),
+        'completed_chunks': [],
+        'situation_names': situation_names,
+    }
+
+    _write_json_atomic(manifest_path, manifest)
+
+    return manifest
+
+
+def pending_chunks(manifest):
+
+    completed = set(manifest['completed_chunks'])
+
+    return [chunk_id for chunk_id in range(manifest['n_chunks']) if chunk_id not in completed]
+
+
+def write_chunk(directory, manifest, chunk_id, columns):
+
+    '''
+    Writes the results of one completed chunk, and marks it as complete in the manifest.
+
+    Inputs:
+    - columns (dict of arrays with one row per pose in the chunk). Typically 'pose', 'situation' (int codes, see situation_names),
+      'soft_tissue_lengths' (n x number of constraints) and 'landmark' (n x 3). The flat pose indices are added as 'index'.
+    '''
+
+    indices = chunk_indices(manifest, chunk_id)
+
+    columns = {name: np.asarray(values) for name, values in columns.items()}
+    for name, values in columns.items():
+        if len(values) != len(indices):
+            raise ValueError(f"Column '{name}' has {len(values)} rows, but chunk {chunk_id} has {len(indices)} poses")
+
+    chunk_path = os.path.join(directory, f'chunk_{chunk_id:06d}.npz')
+    tmp_path = chunk_path + '.tmp.npz'
+    np.savez(tmp_path, index = indices, **columns)
+    os.replace(tmp_path, chunk_path)
+
+    if chunk_id not in manifest['completed_chunks']:
+        manifest['completed_chunks'].append(chunk_id)
+        manifest['completed_chunks'].sort()
+
+    _write_json_atomic(os.path.join(directory, manifest_filename), manifest)
+
+
+def load_results(directory):
+
+    '''
+    Loads all completed chunks of a store (also while the sampling run is still going).
+
+    Output: dict of concatenated columns, sorted by pose index, and the manifest
+    '''
+
+    with open(os.path.join(directory, manifest_filename)) as file:
+        manifest = json.load(file)
+
+    columns = {}
+
+    for chunk_id in manifest['completed_chunks']:
+        with np.load(os.path.join(directory, f'chunk_{chunk_id:06d}.npz')) as chunk:
+            for name in chunk.files:
+                columns.setdefault(name, []).append(chunk[name])
+
+    columns = {name: np.concatenate(values) for name, values in columns.items()}
+
+    if 'index' in columns:
+        order = np.argsort(columns['index'], kind = 'stable')
+        columns = {name: values[order] for name, values in columns.items()}
+
+    return columns, manifest
+
+
+def consolidate_results(directory):
+
+    #Writes all completed chunks to one .npy file per column, and records which chunks were consolidated. Returns those chunks
+
+    columns, manifest = load_results(directory)
+
+    columns_folder = os.path.join(directory, columns_folder_name)
+    os.makedirs(columns_folder, exist_ok = True)
+
+    for name, values in columns.items():
+        column_path = os.path.join(columns_folder, name + '.npy')
+        tmp_path = column_path + '.tmp.npy'
+        np.save(tmp_path, values.astype(column_dtypes.get(name, values.dtype)))
+        os.replace(tmp_path, column_path)
+
+    chunks = list(manifest['completed_chunks'])
+    _write_json_atomic(os.path.join(columns_folder, consolidated_filename), {'consolidated_chunks': chunks})
+
+    return chunks
+
+
+def consolidated_chunks(directory):
+
+    #chunks that are in the consolidated columns, or None if the store was never consolidated
+
+    try:
+        with open(os.path.join(directory, columns_folder_name, consolidated_filename)) as file:
+            return json.load(file)['consolidated_chunks']
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def open_results(directory):
+
+    '''
+    Opens the results of a store as memory-mapped column arrays. If chunks were completed since the last consolidation
+    (or the store was never consolidated), the columns are consolidated first.
+    To look at the results of a run that is still going, use load_results, which doesn't write anything.
+
+    Output: dict of read-only memory-mapped arrays, sorted by pose index, and the manifest
+    '''
+
+    with open(os.path.join(directory, manifest_filename)) as file:
+        manifest = json.load(file)
+
+    if consolidated_chunks(directory) != manifest['completed_chunks']:
+        consolidate_results(directory)
+
+    columns_folder = os.path.join(directory, columns_folder_name)
+    columns = {os.path.splitext(filename)[0]: np.load(os.path.join(columns_folder, filename), mmap_mode = 'r')
+               for filename in os.listdir(columns_folder) if filename.endswith('.npy') and not filename.endswith('.tmp.npy')}
+
+    return columns, manifest
+
+
+def find_sample(columns, pose_index):
+
+    #row of a (flat) pose index in the result columns, or None if that pose has not been evaluated (yet)
+
+    row = int(np.searchsorted(columns['index'], pose_index))
+
+    if row < len(columns['index']) and columns['index'][row] == pose_index:
+        return row
+
+    return None
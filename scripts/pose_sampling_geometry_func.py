@@ -0,0 +1,313 @@
+import bpy
+import numpy as np
+from mathutils import Matrix
+
+from two_object_intersection_func import collision_object
+from collision_proxy_func import world_mesh_arrays
+
+# Blender side of the NumPy pose sampling backend (see pose_sampling_workers.py).
+# Exports the geometry of a joint's parent and child bodies as NumPy arrays, and turns sampled landmark positions
+# back into the endpoint marker meshes that the pose sampling scripts in 'MuSkeMo utilities' create.
+# Also shows individual samples from a pose sample store in the scene on demand (apply_pose_sample), instead of keyframing every pose.
+# No relative imports, so the utility scripts can import this file after appending the scripts folder to sys.path.
+
+
+def mesh_arrays_from_object(obj, depsgraph):
+
+    #returns the evaluated mesh of obj as (n x 3) vertex positions in global coordinates, and (m x 3) triangle vertex indices.
+    #If obj has a collision proxy (see collision_proxy_func.py), the proxy is used instead.
+
+    obj = collision_object(obj)
+
+    if obj.get('collision_proxy_source'): #proxies have their decimation applied already
+        vertices, triangles = world_mesh_arrays(obj.data, obj.matrix_world)
+        return vertices, triangles.astype(np.int64)
+
+    obj_ev = obj.evaluated_get(depsgraph)
+    mesh = obj_ev.to_mesh()
+
+    vertices, triangles = world_mesh_arrays(mesh, obj_ev.matrix_world)
+    obj_ev.to_mesh_clear()
+
+    return vertices, triangles.astype(np.int64)
+
+
+def merged_mesh_arrays(object_names, depsgraph):
+
+    #merges the meshes of several objects into one set of arrays, in global coordinates
+
+    vertices = []
+    triangles = []
+    offset = 0
+
+    for name in object_names:
+        v, t = mesh_arrays_from_object(bpy.data.objects[name], depsgraph)
+        vertices.append(v)
+        triangles.append(t + offset)
+        offset += len(v)
+
+    if not vertices:
+        return np.zeros((0, 3)), np.zeros((0, 3), dtype = np.int64)
+
+    return np.vstack(vertices), np.vstack(triangles)
+
+
+def export_joint_sampling_geometry(joint_obj, parent_geometry_names, child_geometry_names, landmark_name,
+                                   depsgraph, pose_relative_to_base = True, soft_tissue_constraints = None):
+
+    '''
+    Exports everything the pose sampling workers need, for the joint in its current (base) pose.
+
+    Inputs:
+    - joint_obj: the MuSkeMo JOINT that will be moved
+    - parent_geometry_names, child_geometry_names: lists of GEOMETRY object names attached to the parent and child body
+    - landmark_name: name of the landmark whose position is sampled (it has to move with the child body)
+    - depsgraph: an up-to-date dependency graph
+    - pose_relative_to_base: see pose_sampling_workers.pose_transforms
+    - soft_tissue_constraints (optional): dict of MUSCLE name: maximum length (meters), see export_soft_tissue_constraint
+
+    Output: dict of NumPy arrays. Parent geometry is in global coordinates, child geometry and landmark are in the joint's base frame.
+    '''
+
+    joint_base_matrix = np.array(joint_obj.matrix_world)
+    R0 = joint_base_matrix[:3, :3]
+    t0 = joint_base_matrix[:3, 3]
+
+    parent_vertices, parent_triangles = merged_mesh_arrays(parent_geometry_names, depsgraph)
+    child_vertices, child_triangles = merged_mesh_arrays(child_geometry_names, depsgraph)
+
+    landmark_global = np.array(bpy.data.objects[landmark_name].matrix_world.translation)
+
+    #express the child geometry in the joint frame, so it can be moved with a rigid transform per pose
+    child_vertices = (child_vertices - t0) @ R0
+    landmark_local = (landmark_global - t0) @ R0
+
+    return {
+        'parent_vertices': parent_vertices,
+        'parent_triangles': parent_triangles,
+        'child_vertices': child_vertices,
+        'child_triangles': child_triangles,
+        'joint_base_matrix': joint_base_matrix,
+        'landmark_local': landmark_local,
+        'pose_relative_to_base': pose_relative_to_base,
+        'soft_tissue_constraints': [export_soft_tissue_constraint(bpy.data.objects[name], joint_obj, depsgraph, max_length = max_length)
+                                    for name, max_length in (soft_tissue_constraints or {}).items()],
+    }
+
+
+def moves_with_joint(obj, joint_obj):
+
+    #True if obj is (indirectly) parented to the joint, so it moves when the joint is moved
+
+    while obj is not None:
+        if obj == joint_obj:
+            return True
+        obj = obj.parent
+
+    return False
+
+
+def export_soft_tissue_constraint(muscle_obj, joint_obj, depsgraph, max_length = None, min_length = None):
+
+    '''
+    Exports a MuSkeMo MUSCLE (e.g. a ligament) as a soft tissue constraint, for the joint in its current (base) pose.
+    See soft_tissue_constraints.py.
+
+    Inputs:
+    - muscle_obj: the MUSCLE curve
+    - joint_obj: the JOINT that will be moved during pose sampling
+    - depsgraph: an up-to-date dependency graph
+    - max_length, min_length (floats, optional): the pose is not viable if the path length is longer than max_length or shorter than min_length
+
+    Output: dict with the constraint name, path points, moves_with_child and the thresholds
+    '''
+
+    joint_base_matrix = np.array(joint_obj.matrix_world)
+    R0 = joint_base_matrix[:3, :3]
+    t0 = joint_base_matrix[:3, 3]
+
+    #current point positions, with the hook modifiers applied (same approach as the muscle export)
+    curve_ev = muscle_obj.to_curve(depsgraph, apply_modifiers=True)
+    wm = np.array(muscle_obj.matrix_world)
+    points = np.array([list(point.co)[:3] for point in curve_ev.splines[0].points]) @ wm[:3, :3].T + wm[:3, 3]
+    muscle_obj.to_curve_clear()
+
+    #find which body each point is hooked to
+    moves_with_child = np.zeros(len(points), dtype = bool)
+
+    for modifier in muscle_obj.modifiers:
+        if modifier.type == 'HOOK' and modifier.object is not None:
+            for index in modifier.vertex_indices:
+                moves_with_child[index] = moves_with_joint(modifier.object, joint_obj)
+
+    #points that move with the joint are expressed in the joint's base frame
+    points[moves_with_child] = (points[moves_with_child] - t0) @ R0
+
+    return {
+        'name': muscle_obj.name,
+        'points': points,
+        'moves_with_child': moves_with_child,
+        'max_length': max_length,
+        'min_length': min_length,
+    }
+
+
+def endpoint_marker_node_group(node_group_name = "CustomInstanceGroup"):
+
+    #Node group that instances small spheres on the points of a mesh. Same node group as the pose sampling scripts create.
+
+    node_group = bpy.data.node_groups.get(node_group_name)
+
+    if node_group is not None:
+        return node_group
+
+    geo_group = bpy.data.node_groups.new(node_group_name, 'GeometryNodeTree')
+
+    group_input = geo_group.nodes.new('NodeGroupInput')
+    group_input.location = (-600, 0)
+    group_output = geo_group.nodes.new('NodeGroupOutput')
+    group_output.location = (600, 0)
+
+    geo_group.interface.new_socket(name='Points', in_out='INPUT', socket_type='NodeSocketGeometry')
+    geo_group.interface.new_socket(name='Radius', in_out='INPUT', socket_type='NodeSocketFloat')
+    geo_group.interface.new_socket(name='Material', in_out='INPUT', socket_type='NodeSocketMaterial')
+    geo_group.interface.new_socket(name='Geometry', in_out='OUTPUT', socket_type='NodeSocketGeometry')
+
+    ico_sphere = geo_group.nodes.new('GeometryNodeMeshIcoSphere')
+    ico_sphere.location = (-200, 0)
+
+    instance_node = geo_group.nodes.new('GeometryNodeInstanceOnPoints')
+    instance_node.location = (0, 0)
+
+    set_material = geo_group.nodes.new('GeometryNodeSetMaterial')
+    set_material.location = (300, 0)
+
+    geo_group.links.new(group_input.outputs['Points'], instance_node.inputs['Points'])
+    geo_group.links.new(ico_sphere.outputs['Mesh'], instance_node.inputs['Instance'])
+    geo_group.links.new(group_input.outputs['Radius'], ico_sphere.inputs['Radius'])
+    geo_group.links.new(instance_node.outputs['Instances'], set_material.inputs['Geometry'])
+    geo_group.links.new(group_input.outputs['Material'], set_material.inputs['Material'])
+    geo_group.links.new(set_material.outputs['Geometry'], group_output.inputs['Geometry'])
+
+    return geo_group
+
+
+situation_names = ["viable", "soft_tissue_non_viable", "skeletally_non_viable"]
+situation_colors = [(0, 0, 1, 1),    # blue
+                    (1, 0.5, 0, 1),  # orange
+                    (1, 0, 0, 1)]    # red
+
+
+def create_endpoint_marker_meshes(positions_by_situation, marker_radius, collection_name = "endpoint_markers"):
+
+    '''
+    Creates one point cloud object per pose viability situation ("viable", "soft_tissue_non_viable", "skeletally_non_viable"),
+    with spheres instanced on the points, in the 'endpoint_markers' collection.
+
+    Inputs:
+    - positions_by_situation: dict of situation name: (n x 3) array of landmark positions
+    - marker_radius: radius of the spheres (meters)
+    '''
+
+    parent_coll = bpy.data.collections.get(collection_name)
+    if parent_coll is None:
+        parent_coll = bpy.data.collections.new(collection_name)
+        bpy.context.scene.collection.children.link(parent_coll)
+
+    node_group = endpoint_marker_node_group()
+
+    for situation, col in zip(situation_names, situation_colors):
+
+        points = np.asarray(positions_by_situation.get(situation, []), dtype = np.float32).reshape(-1, 3)
+        if len(points) == 0:
+            continue
+
+        # Get existing material or create new
+        mat = bpy.data.materials.get(situation)
+        if mat is None:
+            mat = bpy.data.materials.new(name=situation)
+
+        if mat.node_tree is None: #blender <5 safe
+            mat.use_nodes = True  # creates the node tree
+
+        bsdf = mat.node_tree.nodes.get("Principled BSDF")
+        if bsdf:
+            bsdf.inputs['Base Color'].default_value = col
+
+        mat.diffuse_color = col
+
+        #point cloud mesh, filled in one go
+        mesh = bpy.data.meshes.new(f"{situation}_endpoint_mesh")
+        mesh.vertices.add(len(points))
+        mesh.vertices.foreach_set('co', points.ravel())
+        mesh.update()
+
+        obj = bpy.data.objects.new(f"{situation}_endpoint_markers", mesh)
+        parent_coll.objects.link(obj)
+        obj.data.materials.append(mat)
+
+        mod = obj.modifiers.new(name="EndpointInstancer", type='NODES')
+        mod.node_group = node_group
+
+        for item in mod.node_group.interface.items_tree:
+            if item.item_type == 'SOCKET':
+                if item.name == 'Radius':
+                    mod[item.identifier] = marker_radius
+                elif item.name == 'Material':
+                    mod[item.identifier] = mat
+
+
+def apply_pose_sample(store_path, pose_index, joint_name = None):
+
+    '''
+    Moves the joint to a pose from a pose sample store (see pose_sample_store.py), without keyframing anything.
+
+    Inputs:
+    - store_path (string). Folder of the pose sample store.
+    - pose_index (int). Flat index of the pose in the sampled grid (the 'index' column).
+    - joint_name (string, optional). Defaults to the target joint that was recorded in the store.
+
+    The store's grid definition has to contain 'joint_base_matrix' and 'pose_relative_to_base', and the pose axes are found by name:
+    "X (rad)", "Y (rad)", "Z (rad)" and optionally "X pos (m)", "Y pos (m)", "Z pos (m)".
+
+    Output: dict with the stored results of this pose (situation, soft tissue constraint lengths, landmark position), or None if the pose wasn't evaluated.
+    '''
+
+    from pose_sample_store import (open_results, find_sample, situation_names)
+    from pose_sampling_workers import pose_transforms
+
+    columns, manifest = open_results(store_path)
+    grid_definition = manifest['grid_definition']
+
+    if not columns:
+        return None
+
+    row = find_sample(columns, pose_index)
+    if row is None:
+        return None
+
+    axis_names = grid_definition['axis_names']
+    pose = columns['pose'][row]
+
+    #reorder to euler angles first, then (optional) translations
+    pose_vector = [pose[axis_names.index(name)] for name in ["X (rad)", "Y (rad)", "Z (rad)"]]
+    if "X pos (m)" in axis_names:
+        pose_vector += [pose[axis_names.index(name)] for name in ["X pos (m)", "Y pos (m)", "Z pos (m)"]]
+
+    R, t = pose_transforms([pose_vector], grid_definition['joint_base_matrix'], grid_definition['pose_relative_to_base'])
+
+    world_matrix = np.eye(4)
+    world_matrix[:3, :3] = R[0]
+    world_matrix[:3, 3] = t[0]
+
+    joint = bpy.data.objects[joint_name or grid_definition['target_joint_name']]
+    joint.matrix_world = Matrix(world_matrix.tolist())
+
+    sample = {'pose': np.array(pose), 'situation': situation_names[int(columns['situation'][row])]}
+
+    if 'soft_tissue_lengths' in columns: #one column per soft tissue constraint, in the order of the grid definition
+        sample['soft_tissue_lengths'] = dict(zip(grid_definition.get('soft_tissue_constraints', {}).keys(), columns['soft_tissue_lengths'][row].tolist()))
+    if 'landmark' in columns:
+        sample['landmark'] = np.array(columns['landmark'][row])
+
+    return sample
@@ -0,0 +1,168 @@
+import numpy as np
+import multiprocessing
+import sys
+from concurrent.futures import (ProcessPoolExecutor, as_completed)
+from contextlib import contextmanager
+
+from mesh_intersection_numpy import (build_triangle_grid, mesh_intersects_grid)
+from soft_tissue_constraints import evaluate_constraints
+
+# Pose sampling backend that does not need bpy or mathutils.
+# The parent and child geometry of a joint are exported once as NumPy arrays (see pose_sampling_geometry_func.py),
+# and batches of poses are distributed over a pool of worker processes. Each worker checks for skeletal intersections,
+# evaluates the soft tissue constraints and computes the landmark position for every pose in its batch, and the results are streamed back as they finish.
+
+# This file does not use relative imports, because worker processes import it as a top-level module from the scripts folder.
+
+
+def matrices_from_euler_XYZbody(angles):
+
+    #Batched, NumPy-only version of euler_XYZ_body.matrix_from_euler_XYZbody
+    #input: (n x 3) array of euler angles (phi_x, phi_y, phi_z)
+    #output: (n x 3 x 3) array of rotation matrices gRb = Rx @ Ry @ Rz
+
+    angles = np.atleast_2d(angles)
+    cx, cy, cz = np.cos(angles[:, 0]), np.cos(angles[:, 1]), np.cos(angles[:, 2])
+    sx, sy, sz = np.sin(angles[:, 0]), np.sin(angles[:, 1]), np.sin(angles[:, 2])
+
+    gRb = np.empty((len(angles), 3, 3))
+    gRb[:, 0, 0] = cy*cz
+    gRb[:, 0, 1] = -cy*sz
+    gRb[:, 0, 2] = sy
+    gRb[:, 1, 0] = cx*sz + sx*sy*cz
+    gRb[:, 1, 1] = cx*cz - sx*sy*sz
+    gRb[:, 1, 2] = -sx*cy
+    gRb[:, 2, 0] = sx*sz - cx*sy*cz
+    gRb[:, 2, 1] = sx*cz + cx*sy*sz
+    gRb[:, 2, 2] = cx*cy
+
+    return gRb
+
+
+def pose_transforms(poses, joint_base_matrix, pose_relative_to_base = True):
+
+    '''
+    Rigid transforms of the joint frame for a batch of poses.
+
+    Inputs:
+    - poses: (n x 3) euler angles (XYZ body-fixed, radians), or (n x 6) euler angles followed by translations (meters).
+    - joint_base_matrix: 4x4 world matrix of the joint in its base pose.
+    - pose_relative_to_base: if True, the rotation and translation are applied in the joint's base frame (as in 6DOFPoseSampleTest.py).
+      If False, the euler angles are the joint's global orientation (as in PoseSampleExample.py), and translations are global offsets.
+
+    Output: rotations (n x 3 x 3) and translations (n x 3) so that world = R @ v_joint + t
+    '''
+
+    poses = np.atleast_2d(np.asarray(poses, dtype = float))
+    base = np.asarray(joint_base_matrix, dtype = float)
+    R0 = base[:3, :3]
+    t0 = base[:3, 3]
+
+    R = matrices_from_euler_XYZbody(poses[:, :3])
+    offset = poses[:, 3:6] if poses.shape[1] >= 6 else np.zeros((len(poses), 3))
+
+    if pose_relative_to_base:
+        R = R0 @ R
+        t = t0 + offset @ R0.T
+    else:
+        t = t0 + offset
+
+    return R, t
+
+
+### worker state. Every worker process receives the geometry once (via the pool initializer) and builds its broadphase grid once.
+_worker_state = {}
+
+
+def init_worker(geometry):
+
+    _worker_state['geometry'] = geometry
+    _worker_state['parent_grid'] = build_triangle_grid(geometry['parent_vertices'], geometry['parent_triangles'])
+
+
+def evaluate_pose_batch(start_index, poses):
+
+    '''
+    Evaluates a batch of poses in the current worker.
+
+    Output: (start_index, skeletal_intersection (bool array), landmark_positions (n x 3 array in global coordinates),
+             soft_tissue_lengths (n x number of constraints), soft_tissue_violated (n x number of constraints, bool))
+    '''
+
+    geometry = _worker_state['geometry']
+    grid = _worker_state['parent_grid']
+
+    R, t = pose_transforms(poses, geometry['joint_base_matrix'], geometry['pose_relative_to_base'])
+
+    child_vertices = geometry['child_vertices']
+    child_triangles = geometry['child_triangles']
+
+    intersects = np.zeros(len(R), dtype = bool)
+
+    for i in range(len(R)):
+        intersects[i] = mesh_intersects_grid(grid, child_vertices @ R[i].T + t[i], child_triangles)
+
+    landmark_positions = np.einsum('nij,j->ni', R, geometry['landmark_local']) + t
+
+    soft_tissue_lengths, soft_tissue_violated = evaluate_constraints(geometry.get('soft_tissue_constraints', []), R, t)
+
+    return start_index, intersects, landmark_positions, soft_tissue_lengths, soft_tissue_violated
+
+
+@contextmanager
+def _spawn_safe_main_module():
+
+    #The 'spawn' start method re-imports the __main__ module in every worker, if it has a file on disk.
+    #Scripts that run inside Blender's text editor don't, so we temporarily hide __file__ of __main__ while the pool is running.
+
+    main_module = sys.modules.get('__main__')
+    main_file = getattr(main_module, '__file__', None)
+
+    if main_file is not None:
+        del main_module.__file__
+
+    try:
+        yield
+
+    finally:
+        if main_file is not None:
+            main_module.__file__ = main_file
+
+
+def sample_poses_in_pool(geometry, poses, n_workers = None, batch_size = 256, python_executable = None):
+
+    '''
+    Distributes pose batches to a process pool, and yields the results as the batches complete (not necessarily in order).
+
+    Inputs:
+    - geometry: dict with NumPy arrays, see pose_sampling_geometry_func.export_joint_sampling_geometry
+    - poses: (n x 3) or (n x 6) array, see pose_transforms
+    - n_workers (int, optional). Number of worker processes. Defaults to the number of CPU cores. 0 evaluates everything in the current process.
+    - batch_size (int). Number of poses per batch.
+    - python_executable (string, optional). Python interpreter used to start the workers.
+      Inside Blender, sys.executable is Blender's bundled Python interpreter, which is used by default.
+
+    Yields: (start_index, skeletal_intersection, landmark_positions, soft_tissue_lengths, soft_tissue_violated) per batch
+    '''
+
+    poses = np.atleast_2d(np.asarray(poses, dtype = float))
+    starts = range(0, len(poses), batch_size)
+
+    if n_workers == 0:
+        init_worker(geometry)
+        for start in starts:
+            yield evaluate_pose_batch(start, poses[start:start + batch_size])
+        return
+
+    ctx = multiprocessing.get_context('spawn') #fork is not safe inside Blender
+    if python_executable is not None:
+        ctx.set_executable(python_executable)
+
+    with _spawn_safe_main_module():
+        with ProcessPoolExecutor(max_workers = n_workers, mp_context = ctx,
+                                 initializer = init_worker, initargs = (geometry,)) as pool:
+
+            futures = [pool.submit(evaluate_pose_batch, start, poses[start:start + batch_size]) for start in starts]
+
+            for future in as_completed(futures):
+                yield future.result()
@@ -0,0 +1,61 @@
+import numpy as np
+
+# Analytic soft tissue constraints for pose sampling.
+# A ligament (or any other soft tissue) is modelled as a MuSkeMo MUSCLE, a piecewise linear path through points that are hooked to bodies.
+# When a joint moves, the points hooked to the child body (or bodies further down the chain) move rigidly with the joint,
+# and all other points stay in place. The path length of every constraint can therefore be computed directly from the
+# joint's rigid transforms, for a whole batch of poses at once, without updating the depsgraph or evaluating the muscle geometry nodes.
+# Muscle wrapping is not taken into account, the path is the straight line segments between the points.
+
+# The constraints are exported from the scene with pose_sampling_geometry_func.export_soft_tissue_constraint.
+# This file doesn't import bpy and doesn't use relative imports, so it can be used in worker processes and the 'MuSkeMo utilities' scripts.
+
+
+def path_lengths(points, moves_with_child, R, t):
+
+    '''
+    Path length of one constraint for a batch of poses.
+
+    Inputs:
+    - points: (m x 3) path points. Points that move with the child are expressed in the joint's base frame, other points in global coordinates.
+    - moves_with_child: boolean array of length m
+    - R, t: (n x 3 x 3) rotations and (n x 3) translations of the joint frame, see pose_sampling_workers.pose_transforms
+
+    Output: array of n path lengths
+    '''
+
+    points = np.asarray(points, dtype = float)
+    moves_with_child = np.asarray(moves_with_child, dtype = bool)
+
+    world = np.broadcast_to(points, (len(R),) + points.shape).copy() #n x m x 3
+    world[:, moves_with_child] = np.einsum('nij,mj->nmi', R, points[moves_with_child]) + t[:, None, :]
+
+    return np.linalg.norm(np.diff(world, axis = 1), axis = 2).sum(axis = 1)
+
+
+def evaluate_constraints(constraints, R, t):
+
+    '''
+    Evaluates a list of soft tissue constraints for a batch of poses.
+
+    Inputs:
+    - constraints: list of dicts with 'points', 'moves_with_child', and the thresholds 'max_length' and/or 'min_length' (None if not used)
+    - R, t: rigid transforms of the joint frame for n poses
+
+    Output: lengths (n x k), and violated (n x k boolean), one column per constraint
+    '''
+
+    n = len(R)
+    lengths = np.zeros((n, len(constraints)))
+    violated = np.zeros((n, len(constraints)), dtype = bool)
+
+    for k, constraint in enumerate(constraints):
+        lengths[:, k] = path_lengths(constraint['points'], constraint['moves_with_child'], R, t)
+
+        if constraint.get('max_length') is not None:
+            violated[:, k] |= lengths[:, k] > constraint['max_length']
+
+        if constraint.get('min_length') is not None:
+            violated[:, k] |= lengths[:, k] < constraint['min_length']
+
+    return lengths, violated
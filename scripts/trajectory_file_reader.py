@@ -0,0 +1,129 @@
+import numpy as np
+import json
+import os
+
+# Fast reader for trajectory files (OpenSim .sto/.mot, and custom delimited text files such as SCONE or Hyfydy outputs).
+# The header is scanned line by line, and the numeric block is then read in a single np.loadtxt call.
+# Rows with a different number of values than there are column labels raise a ValueError, instead of giving a ragged array.
+# The parsed array is cached as a .npy file next to the source file (with a .json sidecar that records the source file's size,
+# modification time and the parse settings), so re-importing a large trajectory file only has to load the binary array.
+# This file doesn't import bpy and doesn't use relative imports, so it can also be used from the 'MuSkeMo utilities' scripts.
+
+
+def scan_header(filepath, opensim_format = True, delimiter = ',', column_label_row_number = 1):
+
+    '''
+    Reads the header of a trajectory file.
+
+    Inputs:
+    - opensim_format (bool). If True, the header ends at 'endheader', and the column labels are the first line after it (whitespace separated).
+      If False, the column labels are on line column_label_row_number (1-based), separated by delimiter.
+
+    Output: dict with 'column_headers', 'header_lines', 'data_start_line' (0-based line index of the first data row),
+    and 'in_degrees' (True, False, or None if the header doesn't specify it)
+    '''
+
+    header_lines = []
+    in_degrees = None
+
+    with open(filepath, mode='r') as file:
+        for line_num, line in enumerate(file):
+            stripped = line.strip()
+
+            if opensim_format:
+                if not stripped:
+                    continue
+
+                if 'indegrees' in stripped.lower():
+                    if 'no' in stripped.lower():
+                        in_degrees = False
+                    elif 'yes' in stripped.lower():
+                        in_degrees = True
+
+                header_lines.append(stripped)
+
+                if 'endheader' in stripped.lower():
+                    for label_num, label_line in enumerate(file, line_num + 1): #first non-empty line after endheader
+                        if label_line.strip():
+                            return {'column_headers': label_line.split(), 'header_lines': header_lines,
+                                    'data_start_line': label_num + 1, 'in_degrees': in_degrees}
+                    break
+
+            elif line_num + 1 == column_label_row_number:
+                return {'column_headers': stripped.split(delimiter), 'header_lines': header_lines,
+                        'data_start_line': line_num + 1, 'in_degrees': in_degrees}
+
+            else:
+                header_lines.append(stripped)
+
+    raise ValueError(f"Could not find the column labels in '{filepath}'. " +
+                     ("OpenSim files need an 'endheader' line followed by the column labels." if opensim_format else
+                      "Check the column labels row number."))
+
+
+def _cache_paths(filepath):
+
+    return filepath + '.npy', filepath + '.npy.json'
+
+
+def _source_signature(filepath, settings):
+
+    stat = os.stat(filepath)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'settings': settings}
+
+
+def read_trajectory_file(filepath, opensim_format = True, delimiter = ',', column_label_row_number = 1, use_cache = True):
+
+    '''
+    Reads a trajectory file.
+
+    Inputs: see scan_header. use_cache (bool): load the cached .npy array if it is up to date, and write it if it isn't.
+
+    Output: column_headers (list of strings), data (n_rows x n_columns float array), in_degrees (True, False or None).
+    Raises a ValueError if the data block is not a complete numeric table with one value per column label.
+    '''
+
+    settings = {'opensim_format': opensim_format, 'delimiter': delimiter, 'column_label_row_number': column_label_row_number}
+    array_path, sidecar_path = _cache_paths(filepath)
+
+    if use_cache and os.path.exists(array_path) and os.path.exists(sidecar_path):
+        try:
+            with open(sidecar_path) as file:
+                sidecar = json.load(file)
+
+            if sidecar['source'] == _source_signature(filepath, settings):
+                return sidecar['column_headers'], np.load(array_path), sidecar['in_degrees']
+
+        except (OSError, ValueError, KeyError):
+            pass #unreadable cache, parse the text file again
+
+    header = scan_header(filepath, opensim_format, delimiter, column_label_row_number)
+    column_headers = header['column_headers']
+
+    try:
+        data = np.loadtxt(filepath, delimiter = None if opensim_format else delimiter,
+                          skiprows = header['data_start_line'], ndmin = 2, dtype = np.float64)
+
+    except ValueError as e:
+        raise ValueError(f"Could not read the numeric data in '{os.path.basename(filepath)}': {e}") from None
+
+    if data.shape[1] != len(column_headers):
+        raise ValueError(f"'{os.path.basename(filepath)}' has {len(column_headers)} column labels, but {data.shape[1]} data columns")
+
+    if not len(data):
+        raise ValueError(f"'{os.path.basename(filepath)}' does not contain any data rows")
+
+    if use_cache:
+        try:
+            tmp_path = array_path + '.tmp.npy'
+            np.save(tmp_path, data)
+            os.replace(tmp_path, array_path)
+
+            with open(sidecar_path, 'w') as file:
+                json.dump({'source': _source_signature(filepath, settings), 'column_headers': column_headers,
+                           'in_degrees': header['in_degrees']}, file)
+
+        except OSError: #e.g. a read-only folder. The cache is optional
+            pass
+
+    return column_headers, data, header['in_degrees']
@@ -0,0 +1,239 @@
+import bpy
+from bpy.types import Operator
+from mathutils import (Matrix, Vector)
+
+import numpy as np
+import os
+
+# Muscle analysis along an imported trajectory: MTU lengths, lengthening speeds and moment arms of all muscles, for every frame.
+# Each frame is evaluated once (frame_set), and the lengths of all muscles are read from the evaluated muscle geometry
+# with a single depsgraph update (see compute_curve_length.py). Lengthening speeds are the time derivatives of the lengths.
+# Moment arms are r = -dL/dq, computed with central differences: each rotational coordinate is perturbed by +-moment_arm_step,
+# and the lengths of all muscles are read for both perturbations (two depsgraph updates per coordinate per frame).
+# Coordinates without transform axes are perturbed by adding to the euler angle (as in ImportTrajectory). For joints with
+# OpenSim transform axes, the joint orientation is gRj*R1(q1)*R2(q2)*R3(q3) (see trajectory_pose_func.joint_poses), and the
+# joint is rotated about the current global direction of the perturbed coordinate's axis, i.e. at its place in that chain.
+# The coordinate values are not stored, so the middle axis of three-axis joints is reconstructed from the first and last axes
+# (see transform_axis_in_global).
+# The results are written to a single wide .sto (or .csv) file, with OpenSim-style column names (/forceset/muscle/length etc.).
+
+moment_arm_step = np.deg2rad(0.5) #coordinate perturbation for the moment arms. Smaller steps are dominated by single precision round-off in the lengths
+moment_arm_threshold = 1e-5 #in m. Muscle-coordinate pairs with smaller moment arms in all frames are considered not to cross the joint, and are not written
+
+
+def rotational_coordinates(joints):
+
+    #returns a list of (joint, coordinate name, euler index or None, (transform axes, index in the rotation chain) or None) for the rotational coordinates of the joints
+
+    coordinates = []
+
+    for joint in joints:
+        transform_axes = joint['transform_axes'].to_dict() if 'transform_axes' in joint else None
+        joint_coordinates = [(index, c, joint.get('coordinate_R' + c)) for index, c in enumerate('xyz') if joint.get('coordinate_R' + c)]
+
+        if transform_axes is None:
+            coordinates += [(joint, coordinate_name, index, None) for index, c, coordinate_name in joint_coordinates]
+            continue
+
+        chain = [Vector(transform_axes['transform_axis_R' + c]).normalized() for index, c, coordinate_name in joint_coordinates]
+        coordinates += [(joint, coordinate_name, None, (chain, k)) for k, (index, c, coordinate_name) in enumerate(joint_coordinates)]
+
+    return coordinates
+
+
+def transform_axis_in_global(joint, chain, k):
+
+    '''
+    Returns the current global direction of the k-th rotation axis in chain (the unit transform axes of the joint's rotational coordinates, in order).
+    The joint orientation is gRj*R1(q1)*R2(q2)*R3(q3), so the k-th axis is rotated by gRj and the rotations before it.
+    The first axis is fixed in the parent (gRj), and the last axis is fixed in the joint (the current orientation).
+    The middle axis of three has known angles with both of them. Of the two directions that satisfy this, the one that belongs to
+    the middle angle closest to zero is used. That is the right one for orthogonal axes with the middle angle within +-90 degrees.
+    '''
+
+    from .euler_XYZ_body import matrix_from_euler_XYZbody
+    from .axis_angle import matrix_from_axis_angle
+
+    gRj = matrix_from_euler_XYZbody(joint['or_in_global_XYZeuler'])[0] #orientation without coordinates (see compile_joint_channels)
+    gRt = joint.rotation_euler.to_matrix()
+
+    if k == 0:
+        return gRj @ chain[0]
+
+    if k == len(chain) - 1:
+        return gRt @ chain[-1]
+
+    a1, a2, a3 = chain
+    w1 = gRj @ a1
+    w3 = gRt @ a3
+
+    d = w1.dot(w3) #equals a1 . R2(q2) a3
+    det = 1 - d**2
+
+    if det < 1e-12: #gimbal lock, the middle axis is not defined. Use its direction for q3 = 0
+        return gRt @ a2
+
+    #middle angle. a1 . R2(q2) a3 = A*cos(q2) + B*sin(q2) + C (Rodrigues' rotation formula)
+    A = a1.dot(a3) - a1.dot(a2) * a2.dot(a3)
+    B = a1.dot(a2.cross(a3))
+    C = a1.dot(a2) * a2.dot(a3)
+
+    phi = np.arctan2(B, A)
+    dq = np.arccos(np.clip((d - C) / np.hypot(A, B), -1, 1))
+    q2 = min(phi + dq, phi - dq, key = lambda x: abs(np.arctan2(np.sin(x), np.cos(x))))
+
+    #w2 = alpha*w1 + beta*w3 + gamma*(w1 x w3), with w2 . w1 = a2 . a1, w2 . w3 = a2 . a3, and |w2| = 1
+    alpha = (a2.dot(a1) - a2.dot(a3) * d) / det
+    beta = (a2.dot(a3) - a2.dot(a1) * d) / det
+    gamma = np.sqrt(max(0, 1 - alpha**2 - beta**2 - 2 * alpha * beta * d) / det)
+
+    if a2.dot(a1.cross(matrix_from_axis_angle(a2, q2) @ a3)) < 0: #the sign of w2 . (w1 x w3) for this middle angle
+        gamma = -gamma
+
+    return (alpha * w1 + beta * w3 + gamma * w1.cross(w3)).normalized()
+
+
+def perturb_coordinate(joint, index, axes, delta):
+
+    if axes is None:
+        joint.rotation_euler[index] += delta
+    else:
+        axis = transform_axis_in_global(joint, *axes)
+        joint.rotation_euler = (Matrix.Rotation(delta, 3, axis) @ joint.rotation_euler.to_matrix()).to_euler(joint.rotation_euler.order, joint.rotation_euler)
+
+
+def muscle_analysis(scene, muscles, frames, coordinates = ()):
+
+    '''
+    Inputs:
+    - muscles: list of MuSkeMo MUSCLE objects
+    - frames: frame numbers to evaluate
+    - coordinates: output of rotational_coordinates (empty to skip the moment arms)
+
+    Output: time (n_frames), lengths (n_frames x n_muscles), moment_arms (n_frames x n_coordinates x n_muscles).
+    The time is the trajectory time if the scene has an imported trajectory, and frame/fps otherwise.
+    '''
+
+    from .compute_curve_length import compute_curve_lengths
+
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    muscle_names = [x.name for x in muscles]
+
+    time = np.zeros(len(frames))
+    lengths = np.zeros((len(frames), len(muscles)))
+    moment_arms = np.zeros((len(frames), len(coordinates), len(muscles)))
+
+    frame_current = scene.frame_current
+
+    for frame_ind, frame in enumerate(frames):
+        scene.frame_set(frame) #evaluates the animation (or the streamed trajectory) once per frame
+
+        timebase = scene.get('trajectory_timebase', np.nan)
+        time[frame_ind] = frame / scene.render.fps if np.isnan(timebase) else timebase
+
+        lengths[frame_ind] = compute_curve_lengths(muscle_names, depsgraph)
+
+        for coordinate_ind, (joint, coordinate_name, index, axes) in enumerate(coordinates):
+            rotation = joint.rotation_euler.copy()
+
+            perturb_coordinate(joint, index, axes, moment_arm_step)
+            lengths_plus = np.array(compute_curve_lengths(muscle_names, depsgraph))
+
+            joint.rotation_euler = rotation
+            perturb_coordinate(joint, index, axes, -moment_arm_step)
+            lengths_minus = np.array(compute_curve_lengths(muscle_names, depsgraph))
+
+            joint.rotation_euler = rotation
+
+            moment_arms[frame_ind, coordinate_ind] = -(lengths_plus - lengths_minus) / (2 * moment_arm_step)
+
+    scene.frame_set(frame_current) #also restores the animated joint rotations
+
+    return time, lengths, moment_arms
+
+
+def write_muscle_analysis(filepath, column_headers, data, delimiter = ','):
+
+    #writes an OpenSim storage file (.sto, tab separated), or a delimited text file for other extensions
+
+    with open(filepath, 'w', newline='') as file:
+        if filepath.lower().endswith('.sto'):
+            delimiter = '\t'
+            file.write('MuSkeMo muscle analysis\nversion=1\n')
+            file.write(f'nRows={data.shape[0]}\nnColumns={data.shape[1]}\ninDegrees=no\nendheader\n')
+
+        file.write(delimiter.join(column_headers) + '\n')
+        np.savetxt(file, data, delimiter = delimiter, fmt = '%.8g')
+
+
+class MuscleAnalysisOperator(Operator):
+    bl_description = "Compute the muscle lengths, lengthening speeds and moment arms of all muscles, for all frames of the imported trajectory (frame 1 until the end frame). The results are written to a single .sto or .csv file"
+    bl_idname = "visualization.muscle_analysis"
+    bl_label = "Muscle analysis along the imported trajectory"
+
+    filepath: bpy.props.StringProperty(name="File Path",description="Filepath used for exporting the muscle analysis", maxlen=1024, subtype='FILE_PATH',)
+    filter_glob: bpy.props.StringProperty(default="*.sto;*.csv", options={'HIDDEN'}, maxlen=255)
+
+    def execute(self, context):
+
+        scene = context.scene
+        muskemo = scene.muskemo
+
+        muscle_col = bpy.data.collections.get(muskemo.muscle_collection)
+        muscles = [x for x in muscle_col.objects if 'MuSkeMo_type' in x and x['MuSkeMo_type']=='MUSCLE'] if muscle_col else []
+
+        if not muscles:
+            self.report({'ERROR'}, "No muscles found in the '" + muskemo.muscle_collection + "' collection.")
+            return {'FINISHED'}
+
+        if muskemo.muscle_analysis_moment_arms:
+            joint_col = bpy.data.collections.get(muskemo.joint_collection)
+            joints = [x for x in joint_col.objects if 'MuSkeMo_type' in x and x['MuSkeMo_type']=='JOINT'] if joint_col else []
+            coordinates = rotational_coordinates(joints)
+        else:
+            coordinates = []
+
+        frames = list(range(max(scene.frame_start, 1), scene.frame_end + 1)) #frame 0 is the rest pose of imported trajectories
+
+        if len(frames) < 2:
+            self.report({'ERROR'}, "The muscle analysis needs at least 2 frames, to compute the lengthening speeds.")
+            return {'FINISHED'}
+
+        time, lengths, moment_arms = muscle_analysis(scene, muscles, frames, coordinates)
+        speeds = np.gradient(lengths, time, axis = 0)
+
+        ## assemble the columns
+        column_headers = ['time']
+        columns = [time[:, np.newaxis]]
+
+        column_headers += ['/forceset/' + x.name + '/length' for x in muscles]
+        columns.append(lengths)
+
+        column_headers += ['/forceset/' + x.name + '/lengthening_speed' for x in muscles]
+        columns.append(speeds)
+
+        for coordinate_ind, (joint, coordinate_name, index, axes) in enumerate(coordinates):
+            crossing = np.flatnonzero(np.abs(moment_arms[:, coordinate_ind]).max(axis = 0) > moment_arm_threshold)
+            column_headers += ['/forceset/' + muscles[i].name + '/moment_arm_' + coordinate_name for i in crossing]
+            columns.append(moment_arms[:, coordinate_ind, crossing])
+
+        filepath = self.filepath if self.filepath.lower().endswith(('.sto', '.csv')) else bpy.path.ensure_ext(self.filepath, '.sto')
+        delimiter = muskemo.delimiter if muskemo.delimiter else ','
+
+        write_muscle_analysis(filepath, column_headers, np.hstack(columns), delimiter)
+
+        self.report({'INFO'}, f"Muscle analysis of {len(muscles)} muscles and {len(frames)} frames written to {filepath}.")
+        return {'FINISHED'}
+
+    def invoke(self, context, event):
+
+        model_export_dir = bpy.context.scene.muskemo.model_export_directory
+        default_filename = "muscle_analysis.sto"
+
+        if model_export_dir:
+            self.filepath = os.path.join(os.path.split(model_export_dir)[0], default_filename)
+        else:
+            self.filepath = default_filename
+
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
@@ -0,0 +1,178 @@
+import bpy
+from bpy.types import Operator
+from bpy.app.handlers import persistent
+
+import numpy as np
+import json
+import os
+
+from .muscle_activation_coloring import activation_property_name
+
+# Streaming playback of imported trajectories, without baking keyframes.
+# ImportTrajectory (in 'Stream' mode) writes the per-frame joint poses and muscle activations to .npy files
+# in a folder next to the trajectory file, and stores the layout (folder, joint and muscle names) in the scene as a JSON string.
+# A frame_change_pre handler opens the arrays memory-mapped, and poses the joints and sets the muscle activations of the current frame
+# (the muscle colours follow from the activations, see muscle_activation_coloring.py).
+# The .blend file stays small, and only the frames that are shown are read from disk.
+# For final rendering (or to share the .blend file without the playback folder), the trajectory can be baked to keyframes.
+
+playback_property_name = 'trajectory_playback' #scene custom property with the layout
+
+_open_stores = {} #memory-mapped arrays per playback folder
+
+
+def write_playback_store(folder, time, joint_locations, joint_rotations, activations):
+
+    '''
+    Writes a playback store. All arrays have the frames as the first axis (frame 0 is the rest pose).
+
+    Inputs:
+    - time: (n_frames) trajectory time, nan for the rest pose
+    - joint_locations, joint_rotations: (n_frames x n_joints x 3)
+    - activations: (n_frames x n_muscles)
+    '''
+
+    os.makedirs(folder, exist_ok = True)
+    _open_stores.pop(folder, None) #close the previous memory maps, if any
+
+    arrays = {'time': time, 'joint_locations': joint_locations, 'joint_rotations': joint_rotations,
+              'activations': activations}
+
+    for name, values in arrays.items():
+        path = os.path.join(folder, name + '.npy')
+        tmp_path = path + '.tmp.npy'
+        np.save(tmp_path, np.ascontiguousarray(values, dtype = np.float32 if name != 'time' else np.float64))
+        os.replace(tmp_path, path)
+
+
+def set_playback_layout(scene, folder, joint_names, muscle_names):
+
+    scene[playback_property_name] = json.dumps({'folder': folder, 'joints': joint_names, 'muscles': muscle_names})
+
+
+def get_playback_layout(scene):
+
+    layout = scene.get(playback_property_name)
+    return json.loads(layout) if layout else None
+
+
+def open_playback_store(folder):
+
+    if folder not in _open_stores:
+        _open_stores[folder] = {name: np.load(os.path.join(folder, name + '.npy'), mmap_mode = 'r')
+                                for name in ['time', 'joint_locations', 'joint_rotations', 'activations']}
+
+    return _open_stores[folder]
+
+
+def clear_playback(scene):
+
+    layout = get_playback_layout(scene)
+    if layout:
+        _open_stores.pop(layout['folder'], None)
+        del scene[playback_property_name]
+
+
+@persistent
+def trajectory_playback_handler(scene, *args):
+
+    #poses the model for the current frame, from the playback store of the scene (if it has one)
+
+    layout = get_playback_layout(scene)
+    if layout is None:
+        return
+
+    try:
+        store = open_playback_store(layout['folder'])
+    except OSError: #the playback folder was moved or deleted
+        return
+
+    frame = min(max(scene.frame_current, 0), len(store['time']) - 1)
+
+    if not np.isnan(store['time'][frame]):
+        scene['trajectory_timebase'] = float(store['time'][frame])
+
+    locations = store['joint_locations'][frame]
+    rotations = store['joint_rotations'][frame]
+
+    for joint_ind, joint_name in enumerate(layout['joints']):
+        joint = bpy.data.objects.get(joint_name)
+        if joint is not None:
+            joint.location = locations[joint_ind]
+            joint.rotation_euler = rotations[joint_ind]
+
+    activations = store['activations'][frame]
+
+    for muscle_ind, muscle_name in enumerate(layout['muscles']):
+        muscle = bpy.data.objects.get(muscle_name)
+        if muscle is not None:
+            muscle[activation_property_name] = float(activations[muscle_ind])
+            muscle.update_tag() #custom properties don't tag the depsgraph themselves, and the material drivers and shader depend on it
+
+
+def register_playback_handler():
+
+    if trajectory_playback_handler not in bpy.app.handlers.frame_change_pre:
+        bpy.app.handlers.frame_change_pre.append(trajectory_playback_handler)
+
+
+def unregister_playback_handler():
+
+    if trajectory_playback_handler in bpy.app.handlers.frame_change_pre:
+        bpy.app.handlers.frame_change_pre.remove(trajectory_playback_handler)
+
+
+class BakeTrajectoryPlaybackOperator(Operator):
+    bl_description = "Bake the streamed trajectory to keyframes (e.g. for final rendering). The .blend file will grow with the trajectory length"
+    bl_idname = "visualization.bake_trajectory_playback"
+    bl_label = "Bake the streamed trajectory to keyframes"
+    bl_options = {"UNDO"} #enable undoing
+
+    def execute(self, context):
+
+        scene = context.scene
+        layout = get_playback_layout(scene)
+
+        if layout is None:
+            self.report({'ERROR'}, "The scene does not have a streamed trajectory. Import a trajectory in 'Stream' playback mode first.")
+            return {'FINISHED'}
+
+        try:
+            store = open_playback_store(layout['folder'])
+        except OSError:
+            self.report({'ERROR'}, "Playback folder '" + layout['folder'] + "' not found. Import the trajectory again.")
+            return {'FINISHED'}
+
+        from .bulk_keyframes_func import (write_fcurve, write_vector_fcurves)
+
+        frames = np.arange(len(store['time']))
+
+        write_fcurve(scene, '["trajectory_timebase"]', 0, frames[1:], store['time'][1:])
+
+        for joint_ind, joint_name in enumerate(layout['joints']):
+            joint = bpy.data.objects.get(joint_name)
+            if joint is not None:
+                write_vector_fcurves(joint, 'location', frames, store['joint_locations'][:, joint_ind])
+                write_vector_fcurves(joint, 'rotation_euler', frames, store['joint_rotations'][:, joint_ind])
+
+        for muscle_ind, muscle_name in enumerate(layout['muscles']):
+            muscle = bpy.data.objects.get(muscle_name)
+            if muscle is not None:
+                write_fcurve(muscle, f'["{activation_property_name}"]', 0, frames, store['activations'][:, muscle_ind])
+
+        clear_playback(scene) #the keyframes take over from the playback handler
+
+        return {'FINISHED'}
+
+
+class StopTrajectoryPlaybackOperator(Operator):
+    bl_description = "Stop streaming the trajectory. The model stays in the pose of the current frame, and the playback folder is not deleted"
+    bl_idname = "visualization.stop_trajectory_playback"
+    bl_label = "Stop streaming the trajectory"
+    bl_options = {"UNDO"} #enable undoing
+
+    def execute(self, context):
+
+        clear_playback(context.scene)
+
+        return {'FINISHED'}
@@ -0,0 +1,94 @@
+import numpy as np
+
+from .axis_angle import matrices_from_axis_angles
+from .euler_XYZ_body import (matrix_from_euler_XYZbody, euler_XYZbody_from_matrices)
+
+# Joint poses (location and XYZ body-fixed euler angles) from trajectory coordinates, for all frames at once.
+# compile_joint_channels maps the trajectory columns to the coordinates of each joint once, and joint_poses then computes
+# all frames as batched NumPy operations, including OpenSim joints with custom transform axes.
+
+
+def compile_joint_channels(joints, traj_joints, traj_model_coordinate_types):
+
+    '''
+    Inputs:
+    - joints: list of the unique MuSkeMo JOINTs in the trajectory
+    - traj_joints, traj_model_coordinate_types: per trajectory coordinate column, the joint that owns it and the coordinate type (e.g. 'coordinate_Rz')
+
+    Output: list of dicts (one per joint), with 'columns' (coordinate type: column index in the coordinate trajectories),
+    'transform_axes' (dict, or None for joints without OpenSim transform axes), 'base_position' and 'base_orientation' (global, 3 arrays)
+    '''
+
+    channels = []
+
+    for joint in joints:
+        columns = {traj_model_coordinate_types[i]: i for i, x in enumerate(traj_joints) if x == joint}
+
+        channels.append({
+            'columns': columns,
+            'transform_axes': joint['transform_axes'].to_dict() if 'transform_axes' in joint else None,
+            'base_position': np.array(joint['pos_in_global'], dtype = float),
+            'base_orientation': np.array(joint['or_in_global_XYZeuler'], dtype = float),
+        })
+
+    return channels
+
+
+def joint_poses(channels, coordinates, in_degrees):
+
+    '''
+    Inputs:
+    - channels: output of compile_joint_channels
+    - coordinates: (n_frames x n_coordinates) array of coordinate trajectories
+    - in_degrees (bool): rotational coordinates are in degrees
+
+    Output: locations and rotations (euler angles), both (n_joints x n_frames x 3) arrays
+    '''
+
+    coordinates = np.atleast_2d(np.asarray(coordinates, dtype = float))
+    n_frames = len(coordinates)
+
+    locations = np.zeros((len(channels), n_frames, 3))
+    rotations = np.zeros((len(channels), n_frames, 3))
+
+    def column(channel, coordinate_type, rotational):
+        #coordinate values for all frames, zero if the joint doesn't have this coordinate in the trajectory
+        idx = channel['columns'].get(coordinate_type)
+        if idx is None:
+            return np.zeros(n_frames)
+        values = coordinates[:, idx]
+        return np.deg2rad(values) if (rotational and in_degrees) else values
+
+    for joint_ind, channel in enumerate(channels):
+
+        translation = np.column_stack([column(channel, 'coordinate_T' + c, False) for c in 'xyz']) #n_frames x 3
+        angles = np.column_stack([column(channel, 'coordinate_R' + c, True) for c in 'xyz'])
+
+        transform_axes = channel['transform_axes']
+
+        if transform_axes is None: #the coordinates are added to the base position and orientation
+            locations[joint_ind] = translation + channel['base_position']
+            rotations[joint_ind] = angles + channel['base_orientation']
+            continue
+
+        #translations along, and rotations about the transform axes
+        translation = np.zeros((n_frames, 3))
+        jRta = np.broadcast_to(np.eye(3), (n_frames, 3, 3))
+
+        for c in 'xyz':
+            if 'coordinate_T' + c in channel['columns']:
+                translation = translation + np.outer(column(channel, 'coordinate_T' + c, False), transform_axes['transform_axis_T' + c])
+
+        for c in 'xyz': # X Y Z, maybe this should be flipped
+            if 'coordinate_R' + c in channel['columns']:
+                jRta = jRta @ matrices_from_axis_angles(transform_axes['transform_axis_R' + c], column(channel, 'coordinate_R' + c, True))
+
+        gRj = np.array(matrix_from_euler_XYZbody(channel['base_orientation'])[0])
+
+        # rotate the joint, and decompose into euler angles
+        rotations[joint_ind] = euler_XYZbody_from_matrices(gRj @ jRta)
+
+        ## Rotate the translations. We only rotate about base orientation, which means the translation is assumed to be with respect to the parent frame.
+        locations[joint_ind] = translation @ gRj.T + channel['base_position']
+
+    return locations, rotations
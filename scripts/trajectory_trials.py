@@ -0,0 +1,160 @@
+import bpy
+from bpy.types import Operator
+from bpy.props import StringProperty
+
+import json
+
+# Trials: several imported trajectories (e.g. simulated gaits) of the same model, kept side by side in the .blend file.
+# Each trial gets its own action. With the slotted actions of Blender 4.4 and later, this is a single action per trial
+# with one slot per animated ID (scene, joints, muscles). Older versions need one action per trial per ID.
+# The trial actions are either pushed onto NLA tracks named after the trial (one track per trial on every animated ID),
+# or kept as separate actions. Switching trials unmutes the trial's NLA tracks, or assigns the trial's actions.
+# The trials (with their frame range and actions) are stored in the scene as a JSON string.
+
+trials_property_name = 'trajectory_trials' #scene custom property with the trials
+
+
+def get_trials(scene):
+
+    trials = scene.get(trials_property_name)
+    return json.loads(trials) if trials else {}
+
+
+def trial_action_name(trial_name, id_data):
+
+    if hasattr(bpy.types.Action, 'slots'): #slotted actions, one action for the whole trial
+        return trial_name
+
+    return trial_name + '|' + id_data.name
+
+
+def assign_trial_actions(ids, trial_name):
+
+    #gives each ID a new, empty action for this trial, replacing the actions of a previous import of the same trial.
+    #The F-curves are then written with bulk_keyframes_func.py as usual
+
+    for id_data in ids:
+        action = bpy.data.actions.get(trial_action_name(trial_name, id_data))
+        if action is not None:
+            bpy.data.actions.remove(action)
+
+    for id_data in ids:
+        anim_data = id_data.animation_data or id_data.animation_data_create()
+
+        for track in [x for x in anim_data.nla_tracks if x.name == trial_name]: #previous import of the same trial
+            anim_data.nla_tracks.remove(track)
+
+        name = trial_action_name(trial_name, id_data)
+        anim_data.action = bpy.data.actions.get(name) or bpy.data.actions.new(name = name)
+        anim_data.action.use_fake_user = True #keep the actions of inactive trials when the file is saved
+
+
+def store_trial(scene, ids, trial_name, frame_end, trial_mode):
+
+    '''
+    Registers a trial after its keyframes were written into the actions from assign_trial_actions.
+
+    Inputs:
+    - ids: the animated IDs (scene, joints, muscles)
+    - frame_end: last frame of the trial
+    - trial_mode: 'NLA' (push the actions onto NLA tracks named after the trial) or 'Actions' (keep them as separate actions)
+    '''
+
+    channels = {}
+
+    for id_data in ids:
+        anim_data = id_data.animation_data
+        action = anim_data.action
+        slot = getattr(anim_data, 'action_slot', None)
+
+        channels[id_data.name] = [action.name, slot.handle if slot is not None else None]
+
+        if trial_mode == 'NLA':
+            track = anim_data.nla_tracks.new()
+            track.name = trial_name
+            strip = track.strips.new(trial_name, 0, action)
+            if slot is not None:
+                strip.action_slot = slot
+
+            anim_data.action = None #the NLA tracks take over
+
+    trials = get_trials(scene)
+    trials[trial_name] = {'frame_end': frame_end, 'mode': trial_mode, 'channels': channels}
+    scene[trials_property_name] = json.dumps(trials)
+
+
+def _trial_id(scene, name):
+
+    return scene if name == scene.name else bpy.data.objects.get(name)
+
+
+def switch_trial(scene, trial_name):
+
+    #makes trial_name the active trial. Returns the names of the IDs that could not be found (e.g. deleted objects)
+
+    trials = get_trials(scene)
+    trial = trials[trial_name]
+    missing = []
+
+    #mute or clear the other trials first, in case they animate IDs that this trial doesn't
+    for other_name, other in trials.items():
+        for id_name in other['channels']:
+            id_data = _trial_id(scene, id_name)
+            if id_data is None or id_data.animation_data is None:
+                continue
+
+            for track in id_data.animation_data.nla_tracks:
+                if track.name in trials:
+                    track.mute = track.name != trial_name
+
+            if other_name != trial_name and other['mode'] == 'Actions':
+                id_data.animation_data.action = None
+
+    if trial['mode'] == 'Actions':
+        for id_name, (action_name, slot_handle) in trial['channels'].items():
+            id_data = _trial_id(scene, id_name)
+            action = bpy.data.actions.get(action_name)
+            if id_data is None or action is None:
+                missing.append(id_name)
+                continue
+
+            anim_data = id_data.animation_data or id_data.animation_data_create()
+            anim_data.action = action
+            if slot_handle is not None:
+                anim_data.action_slot = next(x for x in action.slots if x.handle == slot_handle)
+
+    else: #an active action (e.g. from a single trajectory import) would be evaluated on top of the NLA tracks
+        for id_name in trial['channels']:
+            id_data = _trial_id(scene, id_name)
+            if id_data is None:
+                missing.append(id_name)
+            elif id_data.animation_data is not None:
+                id_data.animation_data.action = None
+
+    scene.frame_end = trial['frame_end']
+    scene['active_trajectory_trial'] = trial_name
+    scene.frame_set(scene.frame_current) #re-evaluate the animation
+
+    return missing
+
+
+class SwitchTrajectoryTrialOperator(Operator):
+    bl_description = "Show this trial (imported trajectory)"
+    bl_idname = "visualization.switch_trajectory_trial"
+    bl_label = "Switch trajectory trial"
+    bl_options = {"UNDO"} #enable undoing
+
+    trial_name: StringProperty()
+
+    def execute(self, context):
+
+        if self.trial_name not in get_trials(context.scene):
+            self.report({'ERROR'}, "Trial '" + self.trial_name + "' was not found in the scene.")
+            return {'FINISHED'}
+
+        missing = switch_trial(context.scene, self.trial_name)
+
+        if missing:
+            self.report({'WARNING'}, "Object(s) '" + ', '.join(missing) + "' of trial '" + self.trial_name + "' were not found, and are not animated.")
+
+        return {'FINISHED'}
@@ -1,28 +1,77 @@
 import bpy
+import numpy as np
 from mathutils.bvhtree import BVHTree
 
 
-def check_bvh_intersection(obj_1_name, obj_2_name, depsgraph):
+def collision_object(obj, use_collision_proxies = None):
+
+    #returns the collision proxy of obj (a decimated copy, see collision_proxy_func.py) if it has one, and otherwise obj itself.
+    #use_collision_proxies: True, False, or None to follow the 'Use collision proxies' setting in the Mesh tools panel
+
+    if use_collision_proxies is None:
+        use_collision_proxies = getattr(bpy.context.scene.muskemo, 'use_collision_proxies', True)
+
+    if use_collision_proxies:
+        proxy = bpy.data.objects.get(obj.get('collision_proxy', ''))
+        if proxy is not None and proxy.type == 'MESH':
+            return proxy
+
+    return obj
+
+
+def bvh_from_object_world(obj, depsgraph):
+
+    #BVH tree of the evaluated mesh of obj in global coordinates.
+    #The evaluated mesh (owned by the depsgraph, not the object's own mesh) is temporarily transformed to global coordinates,
+    #so that BVHTree.FromObject can build the tree without copying the mesh to Python
+
+    obj_ev = depsgraph.objects.get(obj.name)
+
+    if obj_ev is None: #not evaluated in this depsgraph (e.g. a collision proxy in a hidden collection). Build the tree from the mesh arrays
+        return bvh_from_mesh_world(obj.data, obj.matrix_world)
+
+    obj_ev.data.transform(obj.matrix_world)
+
+    try:
+        return BVHTree.FromObject(obj, depsgraph)
+    finally:
+        obj_ev.data.transform(obj.matrix_world.inverted())
+
+
+def bvh_from_mesh_world(mesh, matrix_world):
+
+    mesh.calc_loop_triangles()
+
+    vertices = np.empty(len(mesh.vertices) * 3, dtype = np.float32)
+    mesh.vertices.foreach_get('co', vertices)
+
+    triangles = np.empty(len(mesh.loop_triangles) * 3, dtype = np.int32)
+    mesh.loop_triangles.foreach_get('vertices', triangles)
+
+    wm = np.array(matrix_world)
+    vertices = vertices.reshape(-1, 3).astype(np.float64) @ wm[:3, :3].T + wm[:3, 3]
+
+    return BVHTree.FromPolygons(vertices.tolist(), triangles.reshape(-1, 3).tolist())
+
+
+def check_bvh_intersection(obj_1_name, obj_2_name, depsgraph, use_collision_proxies = None):
 
     #check the number of intersections between two objects using Blender's BVHTree module (bounding volume hierarchy tree)
     #inputs: obj_1_name (string, name of object 1 in the blender scene)
     # obj_2_name (string, name of object 2 in the blender scene)
-    # depsgraph (Blender dependency graph). 
+    # depsgraph (Blender dependency graph).
     # When scripting joint ROMs,
     # you should give an updated version of the depsgraph each time you change the position/orientation of an object in the scene
     # You can do that using depsgraph.update() (unless it is a fresh copy of the despgraph)
+    # use_collision_proxies (optional). If an object has a collision proxy (see collision_proxy_func.py), the proxy is checked instead of the full resolution mesh.
+    # Defaults to the 'Use collision proxies' setting in the Mesh tools panel.
+
+    #Output: pairs of polygons that intersect.
+
+    obj_1 = collision_object(bpy.data.objects[obj_1_name], use_collision_proxies)
+    obj_2 = collision_object(bpy.data.objects[obj_2_name], use_collision_proxies)
+
+    bvh1 = bvh_from_object_world(obj_1, depsgraph)
+    bvh2 = bvh_from_object_world(obj_2, depsgraph)
 
-    #Output: pairs of polygons that intersect. 
-    
-    obj_1 = bpy.data.objects[obj_1_name]
-    obj_2 = bpy.data.objects[obj_2_name]
-    
-    for obj in [obj_1, obj_2]:
-        depsgraph.objects[obj.name].data.transform(obj.matrix_world)
-
-    bvh1 = BVHTree.FromObject(obj_1, depsgraph)
-    bvh2 = BVHTree.FromObject(obj_2, depsgraph)
-    
-    for obj in [obj_1, obj_2]:
-       depsgraph.objects[obj.name].data.transform(obj.matrix_world.inverted())
-    return bvh1.overlap(bvh2)
\ No newline at end of file
+    return bvh1.overlap(bvh2)
@@ -288,7 +288,10 @@ class ConvertMusclesToSimpleViz(Operator):
 
 from .. import VIEW3D_PT_MuSkeMo  #the super class in which all panels will be placed
 
-from .import_trajectory import ImportTrajectory
+from .import_trajectory import (ImportTrajectory, BatchImportTrajectories)
+from .trajectory_playback import (BakeTrajectoryPlaybackOperator, StopTrajectoryPlaybackOperator)
+from .trajectory_trials import SwitchTrajectoryTrialOperator
+from .trajectory_muscle_analysis import MuscleAnalysisOperator
 
 ### The panels
 
@@ -437,9 +440,49 @@ class VIEW3D_PT_import_trajectory_subpanel(VIEW3D_PT_MuSkeMo, Panel):  # class n
         row = layout.row()
         row.prop(muskemo, "in_degrees")
 
+        row = layout.row()
+        split = row.split(factor = 1/2)
+        split.label(text = "Playback mode:")
+        split.prop(muskemo, "trajectory_playback_mode", text = '')
+
+        if muskemo.trajectory_playback_mode == 'Keyframes':
+            row = layout.row()
+            row.prop(muskemo, "reduce_keyframes")
+
+            if muskemo.reduce_keyframes:
+                row = layout.row()
+                row.prop(muskemo, "keyframe_reduction_tolerance_translation")
+                row = layout.row()
+                row.prop(muskemo, "keyframe_reduction_tolerance_rotation")
+
         row = layout.row()
         row.operator("visualization.import_trajectory",text = 'Import trajectory')    
 
+        row = layout.row()
+        split = row.split(factor = 1/2)
+        split.operator("visualization.batch_import_trajectories",text = 'Import trials')
+        split.prop(muskemo, "trajectory_trial_mode", text = '')
+
+        if 'trajectory_trials' in scene: #one button per trial, the active trial is highlighted
+            from .trajectory_trials import get_trials
+
+            box = layout.box()
+            box.label(text = "Trials:")
+            flow = box.grid_flow(columns = 2, even_columns = True)
+            for trial_name in get_trials(scene):
+                flow.operator("visualization.switch_trajectory_trial", text = trial_name,
+                              depress = scene.get('active_trajectory_trial') == trial_name).trial_name = trial_name
+
+        if 'trajectory_playback' in scene: #a streamed trajectory is active
+            row = layout.row()
+            row.operator("visualization.bake_trajectory_playback",text = 'Bake to keyframes')
+            row.operator("visualization.stop_trajectory_playback",text = 'Stop streaming')
+
+        row = layout.row()
+        split = row.split(factor = 1/2)
+        split.operator("visualization.muscle_analysis",text = 'Muscle analysis')
+        split.prop(muskemo, "muscle_analysis_moment_arms")
+
         layout.separator()
        
         box = layout.box()
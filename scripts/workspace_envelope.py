@@ -0,0 +1,239 @@
+import bpy
+import bmesh
+import numpy as np
+
+# Quantitative summary of a ROM workspace: the envelope of a sampled landmark point cloud (e.g. the viable endpoint markers
+# of the pose sampling scripts), with its volume and surface area.
+# Two envelopes are available, and both can be updated as new samples stream in:
+# - ConvexHullEnvelope: the convex hull. Points inside the current hull are discarded with a vectorized plane test,
+#   and the hull is only recomputed (with bmesh) from the current hull vertices and the new points outside of it.
+# - VoxelEnvelope: the occupied voxels of a regular grid. This also captures non-convex workspaces.
+#   Volume and surface area follow from the number of occupied voxels and exposed voxel faces.
+# No relative imports, so the utility scripts can import this file after appending the scripts folder to sys.path.
+
+
+def triangle_mesh_volume_area(vertices, triangles):
+
+    #volume (divergence theorem, requires a closed and consistently oriented mesh) and surface area of a triangle mesh
+
+    if not len(triangles):
+        return 0.0, 0.0
+
+    v0, v1, v2 = (vertices[triangles[:, i]] for i in range(3))
+    cross = np.cross(v1 - v0, v2 - v0)
+
+    volume = abs(np.einsum('ij,ij->i', v0, cross).sum()) / 6
+    area = np.linalg.norm(cross, axis = 1).sum() / 2
+
+    return float(volume), float(area)
+
+
+def convex_hull_arrays(points):
+
+    '''
+    Convex hull of a point cloud, using bmesh.
+
+    Output: (k x 3) hull vertices and (m x 3) triangles with outward normals. No triangles if the points are (nearly) coplanar.
+    '''
+
+    points = np.asarray(points, dtype = np.float64).reshape(-1, 3)
+    if len(points) < 4:
+        return points, np.zeros((0, 3), dtype = np.int64)
+
+    #temporary mesh, filled in one go, so large point clouds don't need a python loop
+    mesh = bpy.data.meshes.new('workspace_hull_tmp')
+    mesh.vertices.add(len(points))
+    mesh.vertices.foreach_set('co', points.astype(np.float32).ravel())
+
+    bm = bmesh.new()
+    bm.from_mesh(mesh)
+    bpy.data.meshes.remove(mesh)
+
+    ch = bmesh.ops.convex_hull(bm, input=bm.verts, use_existing_faces=False)
+    bmesh.ops.delete(bm, geom=ch["geom_interior"] + ch["geom_unused"], context='VERTS')
+    bmesh.ops.triangulate(bm, faces=bm.faces[:])
+    bmesh.ops.recalc_face_normals(bm, faces=bm.faces[:])
+
+    bm.verts.index_update()
+    vertices = np.array([v.co for v in bm.verts], dtype = np.float64).reshape(-1, 3)
+    triangles = np.array([[v.index for v in f.verts] for f in bm.faces], dtype = np.int64).reshape(-1, 3)
+    bm.free()
+
+    return vertices, triangles
+
+
+class ConvexHullEnvelope:
+
+    #incrementally updated convex hull of a point cloud
+
+    def __init__(self):
+
+        self.vertices = np.zeros((0, 3))
+        self.triangles = np.zeros((0, 3), dtype = np.int64)
+        self.normals = np.zeros((0, 3))
+        self.offsets = np.zeros(0)
+        self.n_points = 0
+
+    def outside(self, points):
+
+        #boolean mask of the points that are outside of the current hull
+
+        if not len(self.triangles):
+            return np.ones(len(points), dtype = bool)
+
+        extent = np.ptp(self.vertices, axis = 0).max()
+        return (points @ self.normals.T - self.offsets > 1e-9 * extent).any(axis = 1)
+
+    def add(self, points):
+
+        '''
+        Adds points to the envelope. Returns True if the hull changed.
+        '''
+
+        points = np.asarray(points, dtype = np.float64).reshape(-1, 3)
+        self.n_points += len(points)
+
+        points = points[self.outside(points)]
+        if not len(points):
+            return False
+
+        self.vertices, self.triangles = convex_hull_arrays(np.vstack([self.vertices, points]))
+
+        if len(self.triangles):
+            v0, v1, v2 = (self.vertices[self.triangles[:, i]] for i in range(3))
+            normals = np.cross(v1 - v0, v2 - v0)
+            self.normals = normals / np.linalg.norm(normals, axis = 1, keepdims = True).clip(1e-300)
+            self.offsets = np.einsum('ij,ij->i', self.normals, v0)
+
+        return True
+
+    @property
+    def volume(self):
+        return triangle_mesh_volume_area(self.vertices, self.triangles)[0]
+
+    @property
+    def surface_area(self):
+        return triangle_mesh_volume_area(self.vertices, self.triangles)[1]
+
+
+class VoxelEnvelope:
+
+    '''
+    Incrementally updated voxel occupancy envelope of a point cloud.
+
+    Inputs:
+    - voxel_size (float). Edge length of the voxels (meters). The grid is aligned with the global axes, with a voxel corner at the origin.
+    '''
+
+    _bits = 21 #bits per axis in the voxel keys
+    _bias = 2 ** 20
+
+    def __init__(self, voxel_size):
+
+        if voxel_size <= 0:
+            raise ValueError("voxel_size must be positive")
+
+        self.voxel_size = float(voxel_size)
+        self.keys = np.zeros(0, dtype = np.int64) #sorted, unique
+        self.n_points = 0
+
+    def _encode(self, ijk):
+
+        ijk = ijk + self._bias
+        if ijk.size and (ijk.min() < 0 or ijk.max() >= 2 ** self._bits):
+            raise ValueError("Points are too far from the origin for this voxel size. Use a larger voxel size.")
+
+        return (ijk[:, 0] << (2 * self._bits)) | (ijk[:, 1] << self._bits) | ijk[:, 2]
+
+    def _decode(self, keys):
+
+        mask = 2 ** self._bits - 1
+        return np.column_stack([keys >> (2 * self._bits), (keys >> self._bits) & mask, keys & mask]) - self._bias
+
+    def add(self, points):
+
+        #adds points to the envelope. Returns the number of newly occupied voxels
+
+        points = np.asarray(points, dtype = np.float64).reshape(-1, 3)
+        self.n_points += len(points)
+
+        n_before = len(self.keys)
+        new_keys = self._encode(np.floor(points / self.voxel_size).astype(np.int64))
+        self.keys = np.union1d(self.keys, new_keys)
+
+        return len(self.keys) - n_before
+
+    def _occupied(self, keys):
+
+        idx = np.searchsorted(self.keys, keys).clip(0, max(len(self.keys) - 1, 0))
+        return self.keys[idx] == keys if len(self.keys) else np.zeros(len(keys), dtype = bool)
+
+    def exposed_faces(self):
+
+        #number of voxel faces that don't have an occupied neighbour
+
+        if not len(self.keys):
+            return 0
+
+        ijk = self._decode(self.keys)
+        n_exposed = 0
+
+        for axis in range(3):
+            for direction in (-1, 1):
+                neighbours = ijk.copy()
+                neighbours[:, axis] += direction
+                n_exposed += int((~self._occupied(self._encode(neighbours))).sum())
+
+        return n_exposed
+
+    def voxel_centers(self):
+
+        return (self._decode(self.keys) + 0.5) * self.voxel_size
+
+    @property
+    def volume(self):
+        return len(self.keys) * self.voxel_size ** 3
+
+    @property
+    def surface_area(self):
+        return self.exposed_faces() * self.voxel_size ** 2
+
+
+class WorkspaceEnvelope:
+
+    #convex hull and voxel envelope, updated together. Use summary() for the volumes and surface areas
+
+    def __init__(self, voxel_size):
+
+        self.hull = ConvexHullEnvelope()
+        self.voxels = VoxelEnvelope(voxel_size)
+
+    def add(self, points):
+
+        self.hull.add(points)
+        self.voxels.add(points)
+
+    def summary(self):
+
+        return {
+            'n_points': self.voxels.n_points,
+            'convex_hull_volume': self.hull.volume,
+            'convex_hull_area': self.hull.surface_area,
+            'voxel_volume': self.voxels.volume,
+            'voxel_area': self.voxels.surface_area,
+            'voxel_size': self.voxels.voxel_size,
+        }
+
+
+def create_hull_object(name, vertices, triangles, collection = None):
+
+    #creates a mesh object of a hull (or any triangle mesh) from NumPy arrays
+
+    mesh = bpy.data.meshes.new(name)
+    mesh.from_pydata(vertices.tolist(), [], triangles.tolist())
+    mesh.update()
+
+    obj = bpy.data.objects.new(name, mesh)
+    (collection or bpy.context.scene.collection).objects.link(obj)
+
+    return obj
@@ -0,0 +1,48 @@
+import os
+import sys
+
+# geometry_cache.py and mesh_file_readers.py don't import bpy, so they can be tested outside of Blender.
+# Run from this folder (python -m pytest -q), otherwise pytest imports the addon __init__.py, which needs bpy.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+from geometry_cache import GeometryCache
+from mesh_file_readers import read_mesh_files
+
+
+def test_identical_files_are_all_preloaded(tmp_path):
+
+    #identical files in different folders (e.g. left and right sides) have the same content hash, and are cached by several threads at once
+
+    n = 100 #grid of n x n vertices, large enough that the threads write their cache entries at the same time
+    contents = ''.join(f'v {i % n} {i // n} 0\n' for i in range(n * n))
+    contents += ''.join(f'f {i + 1} {i + 2} {i + n + 1}\n' for i in range(n * (n - 1)) if (i + 1) % n)
+
+    filepaths = []
+    for i in range(8):
+        folder = tmp_path / ('side_' + str(i))
+        folder.mkdir()
+        filepath = folder / 'bone.obj'
+        filepath.write_text(contents)
+        filepaths.append(str(filepath))
+
+    for run in range(5):
+        cache = GeometryCache(str(tmp_path / ('cache_' + str(run))))
+        preloaded = read_mesh_files(filepaths, 8, cache)
+
+        assert sorted(preloaded) == sorted(filepaths)
+        assert not [x for x in os.listdir(cache.directory) if x.endswith('.tmp')]
+
+
+def test_clear_keeps_other_files(tmp_path):
+
+    cache = GeometryCache(str(tmp_path))
+    filepath = tmp_path / 'bone.obj'
+    filepath.write_text('v 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 3\n')
+    cache.read(str(filepath), lambda x: read_mesh_files([x])[x])
+
+    for name in ['notes.json', 'mine.npy', 'a.tmp']:
+        (tmp_path / name).write_text('')
+
+    cache.clear()
+
+    assert sorted(os.listdir(tmp_path)) == ['a.tmp', 'bone.obj', 'mine.npy', 'notes.json']
@@ -0,0 +1,37 @@
+import os
+import sys
+
+import numpy as np
+
+# keyframe_reduction_func.py doesn't import bpy, so it can be tested outside of Blender.
+# Run from this folder (python -m pytest -q), otherwise pytest imports the addon __init__.py, which needs bpy.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+from keyframe_reduction_func import rdp_keep_mask
+
+
+def test_reduced_curve_stays_within_tolerance():
+
+    frames = np.arange(200)
+    values = np.vstack([np.sin(frames / 20), np.linspace(0, 1, 200)])
+
+    keep = rdp_keep_mask(values, 0.01)
+
+    assert keep[:, [0, -1]].all()
+    assert keep[1].sum() == 2 #a straight line only needs its end points
+
+    reduced = np.interp(frames, frames[keep[0]], values[0, keep[0]])
+    assert np.abs(reduced - values[0]).max() <= 0.01
+
+
+def test_nan_channel_terminates():
+
+    frames = np.arange(100)
+    values = np.vstack([np.sin(frames / 10), np.full(100, np.nan), np.sin(frames / 10)])
+    values[2, 40:45] = np.nan #missing samples
+
+    keep = rdp_keep_mask(values, 0.01)
+
+    assert keep.shape == values.shape
+    assert keep[:, [0, -1]].all()
+    assert keep[1].sum() == 2
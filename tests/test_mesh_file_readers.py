@@ -0,0 +1,68 @@
+import base64
+import os
+import sys
+import zlib
+
+import numpy as np
+import pytest
+
+# mesh_file_readers.py doesn't import bpy, so it can be tested outside of Blender.
+# Run from this folder (python -m pytest -q), otherwise pytest imports the addon __init__.py, which needs bpy.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+from mesh_file_readers import read_vtp
+
+vertices = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1]], dtype = np.float32)
+connectivity = np.array([0, 1, 2, 0, 1, 3, 0, 2, 3, 1, 2, 3], dtype = np.int32)
+offsets = np.array([3, 6, 9, 12], dtype = np.int32)
+
+
+def compressed_base64(values, header_type, single_stream, block_size = 16):
+
+    #zlib compressed VTK binary data, with the header and blocks encoded either as one base64 stream or separately
+
+    raw = values.tobytes()
+    blocks = [zlib.compress(raw[i:i + block_size]) for i in range(0, len(raw), block_size)]
+    last_block_size = len(raw) - block_size * (len(blocks) - 1)
+    header = np.array([len(blocks), block_size, last_block_size] + [len(x) for x in blocks], dtype = header_type).tobytes()
+
+    if single_stream:
+        return base64.b64encode(header + b''.join(blocks)).decode()
+
+    return base64.b64encode(header).decode() + base64.b64encode(b''.join(blocks)).decode()
+
+
+@pytest.mark.parametrize('header_type', ['UInt32', 'UInt64'])
+@pytest.mark.parametrize('single_stream', [True, False])
+@pytest.mark.parametrize('appended', [True, False])
+def test_compressed_base64_vtp(tmp_path, header_type, single_stream, appended):
+
+    arrays = [('Points', None, 'Float32', vertices), ('connectivity', 'connectivity', 'Int32', connectivity), ('offsets', 'offsets', 'Int32', offsets)]
+    encoded = [compressed_base64(values, header_type.lower(), single_stream) for *_, values in arrays]
+
+    elements = []
+    offset = 0
+    for (tag, name, vtk_type, values), data in zip(arrays, encoded):
+        name_attribute = f' Name="{name}"' if name else ' NumberOfComponents="3"'
+        if appended:
+            elements.append(f'<DataArray type="{vtk_type}"{name_attribute} format="appended" offset="{offset}"/>')
+            offset += len(data)
+        else:
+            elements.append(f'<DataArray type="{vtk_type}"{name_attribute} format="binary">{data}</DataArray>')
+
+    appended_data = '<AppendedData encoding="base64">_' + ''.join(encoded) + '</AppendedData>' if appended else ''
+
+    filepath = tmp_path / 'tetrahedron.vtp'
+    filepath.write_text(f'''<VTKFile type="PolyData" version="1.0" byte_order="LittleEndian" header_type="{header_type}" compressor="vtkZLibDataCompressor">
+<PolyData><Piece NumberOfPoints="4" NumberOfPolys="4">
+<Points>{elements[0]}</Points>
+<Polys>{elements[1]}{elements[2]}</Polys>
+</Piece></PolyData>
+{appended_data}
+</VTKFile>''')
+
+    result = read_vtp(str(filepath))
+
+    assert np.array_equal(result[0], vertices)
+    assert np.array_equal(result[1], connectivity)
+    assert np.array_equal(result[2], offsets)